@@ -38,7 +38,9 @@ setup(
     license='Copyright (C) GROWx/Growy - All Rights Reserved',
     entry_points={
         'console_scripts': [
-            "start-robot=command.bot:main"
+            "start-robot=command.bot:main",
+            "simulate-firmware=simulator.firmware:main",
+            "benchmark-throughput=simulator.benchmark:main"
         ]
     }
 )
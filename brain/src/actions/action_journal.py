@@ -0,0 +1,70 @@
+import json
+from typing import Dict, List, Optional
+
+from actions.instruction_compiler import WATER
+from common.types import Command, Instruction
+
+AUTO_REFILL = 20
+# The water pumped before a reboot is unknown, running these commands again could flood the plants or the tank
+NON_REPEATABLE_CODES = {WATER, AUTO_REFILL}
+
+
+class Recovery:
+    """An instruction of the journal that did not end before the reboot"""
+    def __init__(self, instruction: Instruction, plan: List[Command], queued: bool = True) -> None:
+        self.instruction: Instruction = instruction
+        self.plan: List[Command] = plan
+        self.queued: bool = queued
+        self.start: int = 0
+        self.interrupted: bool = False
+        self.position: Optional[Dict[str, int]] = None
+
+    @property
+    def rollback(self) -> bool:
+        """An interrupted command that must not run twice ends the instruction instead of resuming it"""
+        return self.interrupted and self.start < len(self.plan) and \
+            self.plan[self.start].get('opcode') in NON_REPEATABLE_CODES
+
+    def get_remaining(self) -> List[Command]:
+        return self.plan[self.start:]
+
+
+def _start(accepted: Dict[str, Recovery], entry: Dict[str, str]) -> None:
+    for instruction_id in list(accepted):
+        if instruction_id == entry['id']:
+            break
+        if accepted[instruction_id].queued:
+            del accepted[instruction_id]
+    recovery = accepted.get(entry['id'])
+    if recovery is None or int(entry['index']) < 0:
+        return
+    recovery.start, recovery.interrupted = int(entry['index']), True
+    recovery.position = json.loads(entry['position']) if entry.get('position') else None
+
+
+def plan_recovery(entries: List[Dict[str, str]]) -> List[Recovery]:
+    """Replays the journal: the queue runs the instructions in the order they were queued, so the start of a
+        command ends every instruction queued before its own (the ones the route planner still held are not
+        affected). What is left are the interrupted instruction, resumed at the command that ran during the reboot,
+        and the ones that did not start yet, the queued ones first.
+    """
+    accepted: Dict[str, Recovery] = {}
+    for entry in entries:
+        event = entry.get('event')
+        if event == 'instruction':
+            accepted.pop(entry['id'], None)
+            accepted[entry['id']] = Recovery(json.loads(entry['instruction']), json.loads(entry['commands']),
+                                             entry.get('queued', '1') != '0')
+        elif event == 'queued' and entry['id'] in accepted:
+            recovery = accepted.pop(entry['id'])
+            recovery.queued = True
+            accepted[entry['id']] = recovery
+        elif event == 'start':
+            _start(accepted, entry)
+        elif event == 'end':
+            accepted.pop(entry['id'], None)
+        elif event == 'cancel':
+            accepted.clear()
+    recoveries = [recovery for recovery in accepted.values() if recovery.get_remaining()]
+    return [recovery for recovery in recoveries if recovery.queued] + \
+        [recovery for recovery in recoveries if not recovery.queued]
@@ -1,10 +1,9 @@
 import json
 import logging
 import threading
-import time
-from collections import deque
-from typing import (Any, Callable, Deque, Dict, List, Tuple, cast)
+from typing import (Any, Callable, Dict, List, Optional, Tuple)
 
+from actions.action_journal import Recovery, plan_recovery
 from actions.commands.auto_refill import AutoRefillCommand
 from actions.commands.get_gripsense import GetGripsenseCommand
 from actions.commands.get_position import GetPositionCommand
@@ -26,7 +25,12 @@ from actions.commands.weight import WeightCommand
 from actions.errors.error_handler import ErrorHandler
 from actions.feedback.feedback_manager import FeedbackManager
 from actions.feedback.idle_handler import IdleHandler
+from actions.feedback.upload_tracker import UploadTracker
 from actions.memory import Memory
+from actions.instruction_compiler import InstructionCompileError, InstructionCompiler, compile_command
+from actions.refill_reorderer import RefillReorderer
+from actions.route_planner import RoutePlanner, travel_cost
+from actions.warm_start import WarmStart
 from common.Interval import Interval
 from common.config import Config
 from common.enums import State
@@ -35,7 +39,14 @@ from common.mqtt_client import MQTT
 from common.redis_client import Redis
 from common.serial_manager import SerialManagerAbstract
 from common.types import Command, Instruction, ErrorHandlerFactoryFunc
-from util import Try
+from common.work_queue import WorkQueue
+from model.position import Position
+from util import Success, Try, Try_
+
+# Commands that may move the robot or change the tank level. Moves and homing read the new position themselves,
+# so the snapshot is invalidated before a command runs and whatever the command read stays fresh.
+CHANGES_POSITION = {0, 7, 8, 13, 20}
+CHANGES_TANK_LEVEL = {2, 13, 20, 21}
 
 
 class ActionManager:
@@ -46,13 +57,20 @@ class ActionManager:
         self._serial: SerialManagerAbstract = serial
         self._mqtt: MQTT = mqtt
         self._redis: Redis = redis
-        self._memory: Memory = Memory()
+        self._memory: Memory = Memory(config.telemetry_ttl_sec)
         self._feedback_manager: FeedbackManager = FeedbackManager(self._memory, mqtt, serial, redis, config, logger)
         self._error_handler: ErrorHandler = ErrorHandler(self._memory, self._feedback_manager, self._serial, redis,
                                                          config, logger, self.cancel_all_actions)
         self._debug_only: bool = config.debug_only_serialless
 
-        self._queue: Deque[Tuple[Instruction, Command]] = deque()
+        self._queue: WorkQueue[Tuple[Instruction, Command]] = WorkQueue()
+        # With batch planning the instructions wait in the planner until the queue ran empty
+        cost = travel_cost(config.serial_speed_x, config.serial_speed_y)
+        self._planner: Optional[RoutePlanner] = \
+            RoutePlanner(config.batch_types, cost, config.batch_urgent_sec, config.batch_max_stops,
+                         refills=RefillReorderer(self._memory, config, cost)) if config.batch_planning else None
+        self._release_lock: threading.Lock = threading.Lock()
+        self._busy: bool = False
 
         self._resolver: Dict[int,
                              Callable[[Instruction,
@@ -93,6 +111,8 @@ class ActionManager:
                 255: self.cancel_all_actions
         }
 
+        self._compiler: InstructionCompiler = InstructionCompiler(self._resolver.keys())
+
         self._dependencies: List[Any] = [
             self._feedback_manager,
             self._memory,
@@ -103,57 +123,133 @@ class ActionManager:
         ]
 
         state: State = self._redis.get_current_state()
+        # Not gated on the state: finishing an instruction clears HANDLING_INSTRUCTION while others may still wait
+        recoveries: List[Recovery] = plan_recovery(self._redis.get_journal())
 
         logger.create_event(f'Startup fresh {self._config.robot_id}', robot_id=self._config.robot_id)
-        HomeCommand.run({}, {'val': [7, 1, 0, 0, 0, 0, 0, 80]}, self._error_handler.get_handler,
-                        *self._dependencies, fatal=True)
-        HomeCommand.run({}, {'val': [7, 1, 0, 0, 0, 0, 0, 20]}, self._error_handler.get_handler,
-                        *self._dependencies, fatal=True)
-        HomeCommand.run({}, {'val': [7, 0, 0, 0, 0, 1, 0, 20]}, self._error_handler.get_handler,
-                        *self._dependencies, fatal=True)
-        HomeCommand.run({}, {'val': [7, 0, 0, 2, 0, 0, 0, 80]}, self._error_handler.get_handler,
-                        *self._dependencies, fatal=True)
-        HomeCommand.run({}, {'val': [7, 0, 0, 2, 0, 0, 0, 20]}, self._error_handler.get_handler,
-                        *self._dependencies, fatal=True)
+        if any(recovery.rollback for recovery in recoveries):
+            # The pumps may still run the water of the interrupted command
+            SetPumpsCommand.run({}, compile_command({'val': [2, 0, 0, 0, 0, 0, 0]}), self._error_handler.get_handler,
+                                *self._dependencies, fatal_recovery=True)
+        # After a restart of an idle robot the position redis kept is checked instead of homing again
+        position: Optional[Position] = None if recoveries else \
+            WarmStart(self._serial, self._redis, self._config, self._logger).get_trusted_position(state)
+        if position is not None:
+            self._memory.telemetry.update_position(position)
+        else:
+            HomeCommand.run({}, compile_command({'val': [7, 1, 0, 0, 0, 0, 0, 80]}), self._error_handler.get_handler,
+                            *self._dependencies, fatal=True)
+            HomeCommand.run({}, compile_command({'val': [7, 1, 0, 0, 0, 0, 0, 20]}), self._error_handler.get_handler,
+                            *self._dependencies, fatal=True)
+            HomeCommand.run({}, compile_command({'val': [7, 0, 0, 0, 0, 1, 0, 20]}), self._error_handler.get_handler,
+                            *self._dependencies, fatal=True)
+            HomeCommand.run({}, compile_command({'val': [7, 0, 0, 2, 0, 0, 0, 80]}), self._error_handler.get_handler,
+                            *self._dependencies, fatal=True)
+            HomeCommand.run({}, compile_command({'val': [7, 0, 0, 2, 0, 0, 0, 20]}), self._error_handler.get_handler,
+                            *self._dependencies, fatal=True)
         logger.send_event(logging.INFO)
 
         if State.has_state(state, State.HANDLING_INSTRUCTION):
             if not self._redis.get_log_item_state(logger):
                 logger.create_event('Unknown', robot_id=self._config.robot_id)
-            instruction, command = self._redis.get_current_action()
-            details = {
-                'statusCode': 'HorizontalBotRebootError',
-                'message': 'Horizontal Robot rebooted while busy'
-            }
-            logger.log_system(logging.ERROR, details['message'])
-            logger.add_to_event(statusCode=details['statusCode'], error_message=details['message'])
-            logger.send_event(logging.ERROR)
-            self._feedback_manager.send_to_gateway(instruction, command, self._memory, details)
+            if not recoveries:
+                logger.log_system(logging.WARNING, 'Rebooted while busy, the journal has no unfinished instruction')
+                logger.send_event(logging.WARNING)
         self._redis.set_state(State.IDLE)
+        for recovery in recoveries:
+            self.recover_instruction(recovery)
 
-        TopCam.setup(self._mqtt, self._logger, self._config)
-        SideCam.setup(self._mqtt, self._logger, self._config)
+        # With asynchronous capture a photo only blocks the queue until it is exposed, not until it is uploaded
+        self._upload_tracker: Optional[UploadTracker] = \
+            UploadTracker(self._feedback_manager, self._memory, self._logger, config.camera_upload_timeout_sec) \
+            if config.camera_async_capture else None
+        TopCam.setup(self._mqtt, self._logger, self._config, self._upload_tracker)
+        SideCam.setup(self._mqtt, self._logger, self._config, self._upload_tracker)
 
         threading.Thread(target=self.handle_action_queue, daemon=True).start()
 
     def start_handling_instructions(self) -> None:
         def handle_instruction(topic: str, payload: str, **kwargs: str) -> None:
-            self._redis.update_state(State.add_state, State.HANDLING_INSTRUCTION)
-
-            self._logger.log_system(logging.INFO, 'Received: ' + json.dumps(json.loads(payload), indent=4))
             actions = json.loads(payload)
+            self._logger.log_system(logging.INFO, 'Received: ' + json.dumps(actions, indent=4))
+            try:
+                # All commands are checked and decoded before the first one is queued
+                instruction, plan = self._compiler.compile(actions)
+            except InstructionCompileError as e:
+                self.reject_instruction(actions, e)
+                return
 
+            self._redis.update_state(State.add_state, State.HANDLING_INSTRUCTION)
+            self._redis.journal_instruction(instruction, plan, queued=self._planner is None)
             self._logger.create_event('start handling instruction', robot_id=self._config.robot_id,
-                                      id=actions['Instruction']['instructionId'], type=actions['Instruction']['type'])
+                                      id=instruction['instructionId'], type=instruction['type'])
 
-            for command in actions['Commands']:
-                command['val'] = cast(str, command['Str']).split(' ')
-                self.parse_and_handle_action(actions['Instruction'], command)
+            if self._planner is not None:
+                self._planner.add(instruction, plan)
+                self.release_instruction()
+                return
+            for command in plan:
+                self.parse_and_handle_action(instruction, command)
 
         self._mqtt.subscribe(f'rc/{self._config.stage}/robots/{self._config.robot_id}/cmds', handle_instruction)
 
+    def reject_instruction(self, actions: Dict[str, Any], error: InstructionCompileError) -> None:
+        details = {
+            'statusCode': 'HorizontalBotInvalidInstructionError',
+            'message': f'Horizontal Robot rejected the instruction: {error}'
+        }
+        self._logger.log_system(logging.ERROR, details['message'])
+        instruction = actions.get('Instruction') if isinstance(actions, dict) else None
+        if isinstance(instruction, dict):
+            self._feedback_manager.send_to_gateway(instruction, error.command or {}, self._memory, details,
+                                                   finish_instruction=False)
+
+    def recover_instruction(self, recovery: Recovery) -> None:
+        """Rolls back an instruction that was interrupted by a reboot in a command that must not run twice,
+            queues the remaining commands of any other instruction of the journal again
+        """
+        instruction = recovery.instruction
+        id = instruction.get('instructionId', 'No instruction id')
+        if recovery.rollback:
+            details = {
+                'statusCode': 'HorizontalBotRebootError',
+                'message': f'Horizontal Robot rebooted while busy, rolled back after {recovery.start} of '
+                           f'{len(recovery.plan)} commands'
+            }
+            self._logger.log_system(logging.ERROR, f"{details['message']} of instruction {id} at {recovery.position}")
+            self._logger.add_to_event(statusCode=details['statusCode'], error_message=details['message'])
+            self._logger.send_event(logging.ERROR)
+            self._redis.journal_end(instruction)
+            self._feedback_manager.send_to_gateway(instruction, recovery.plan[recovery.start], self._memory, details)
+            return
+
+        self._logger.log_system(logging.WARNING, f'Resume instruction {id} at command {recovery.start + 1} of '
+                                                 f'{len(recovery.plan)} after a reboot at {recovery.position}')
+        self._redis.update_state(State.add_state, State.HANDLING_INSTRUCTION)
+        self._redis.journal_instruction(instruction, recovery.plan)
+        for command in recovery.get_remaining():
+            self.parse_and_handle_action(instruction, command)
+
     def parse_and_handle_action(self, instruction: Instruction, action: Command) -> None:
-        self._queue.appendleft((instruction, action))
+        self._queue.put((instruction, action))
+
+    def release_instruction(self) -> None:
+        """Queues the next instruction on the route of the planner once the queue ran empty"""
+        if self._planner is None:
+            return
+        with self._release_lock:
+            if self._busy or len(self._queue):
+                return
+            position = self._redis.get_position()
+            released = self._planner.next((position[0], position[1]) if position is not None else None)
+            if released is None:
+                return
+            instruction, plan = released
+            self._logger.log_system(logging.INFO, f"Next on the route: [{instruction.get('type')}|"
+                                                  f"{instruction.get('instructionId')}], {len(self._planner)} wait")
+            self._redis.journal_queued(instruction)
+            for command in plan:
+                self.parse_and_handle_action(instruction, command)
 
     # Todo: look over it again
     def handle_action_queue(self) -> None:
@@ -163,34 +259,91 @@ class ActionManager:
         water_level_command = GetWaterLevelCommand(self._serial)
         get_position_command = GetPositionCommand(self._serial)
 
-        interval = Interval(self._config.idle_time_sec, idle_handler.send_message,
-                            lambda: (self._redis.get_current_action(), Try(water_level_command.get_water_level),
-                                     Try(get_position_command.get_position)))
+        def idle_arguments() -> Tuple[Tuple[Instruction, Command], Try_[int], Try_[Position]]:
+            return (self._redis.get_current_action(),
+                    *self.read_idle_telemetry(water_level_command, get_position_command))
+
+        interval = Interval(self._config.idle_time_sec, idle_handler.send_message, idle_arguments)
         while True:
-            if len(self._queue) == 0:
-                time.sleep(2)
-                continue
-            instruction, current_action = self._queue[-1]
+            instruction, current_action = self.take_action()
+            redis_before = self._redis.get_metrics()
             self._redis.set_current_action(instruction, current_action)
-            self._queue.pop()
             id = instruction.get('instructionId', 'No instruction id')
             instruction_type = instruction.get('type', 'No instruction type')
             self._logger.log_system(
-                logging.INFO, f'Current Action [{instruction_type}|{id}]:\n{json.dumps(current_action, indent=4)}')
-            current_action_type = int(current_action['val'][0])
+                logging.INFO, f'Current Action [{instruction_type}|{id}] queued for '
+                              f'{self._queue.latency.last * 1000:.0f} ms:\n{json.dumps(current_action, indent=4)}')
+            current_action_type = current_action['opcode']
             if current_action_type not in self._resolver:
                 self._logger.log_system(logging.ERROR, f'ActionType {current_action_type} not implemented -> skip!')
+                with self._release_lock:
+                    self._busy = False
                 continue
+            self._memory.telemetry.invalidate(position=current_action_type in CHANGES_POSITION,
+                                              tank_level=current_action_type in CHANGES_TANK_LEVEL)
             if current_action and self._resolver[current_action_type](instruction, current_action,
                                                                       self._error_handler.get_handler,
                                                                       *self._dependencies):
                 self._logger.log_system(logging.INFO, 'Ready for next Action')
             else:
                 self._logger.log_system(logging.ERROR, 'Error of command, deleting actions.')
+            if current_action.get('last'):
+                self._redis.journal_end(instruction)
+                if self._upload_tracker is not None:
+                    self._upload_tracker.end_instruction(instruction)
+            # Lets a reboot in the middle of an instruction report the log event collected so far
+            self._redis.set_log_item_state(self._logger)
+            with self._release_lock:
+                self._busy = False
+            self.release_instruction()
+            if not len(self._queue):
+                # The queued instructions are done
+                self._redis.checkpoint()
+            redis_after = self._redis.get_metrics()
+            self._logger.log_system(
+                logging.DEBUG, f"Redis for [{instruction_type}|{id}]: {redis_after['total'] - redis_before['total']} "
+                               f"commands in {redis_after['round_trips'] - redis_before['round_trips']} round trips")
 
             if self._redis.get_current_state() != State.IDLE:
                 interval.reset()
 
+    def take_action(self) -> Tuple[Instruction, Command]:
+        """Waits for the next command and marks the queue busy in the same step, so the route planner cannot
+            release an instruction between the two
+        """
+        while True:
+            with self._release_lock:
+                action = self._queue.get(timeout=0)
+                if action is not None:
+                    self._busy = True
+                    return action
+            self._queue.wait()
+
+    def read_idle_telemetry(self, water_level_command: GetWaterLevelCommand,
+                            get_position_command: GetPositionCommand) -> Tuple[Try_[int], Try_[Position]]:
+        """Values read since the last command are still valid, only the stale ones are probed"""
+        telemetry = self._memory.telemetry
+        cached_water_level, cached_position = telemetry.get_tank_level(), telemetry.get_position()
+        probes = ([GetWaterLevelCommand.SERIAL_MESSAGES] if cached_water_level is None else []) + \
+            ([GetPositionCommand.SERIAL_MESSAGES] if cached_position is None else [])
+        if not probes:
+            self._logger.log_system(logging.INFO, f'Idle telemetry from snapshot read {telemetry.get_age():.0f} s ago')
+            return Success(cached_water_level), Success(cached_position)
+
+        # Both probes are read-only, so they go out as one pipelined exchange
+        answers = iter(self._serial.request_many(probes))
+        water_level: Try_[int] = Success(cached_water_level)
+        if cached_water_level is None:
+            water_level = Try(water_level_command.parse_water_level, *next(answers))
+            if water_level.isSuccess:
+                telemetry.update_tank_level(water_level.get())
+        position: Try_[Position] = Success(cached_position)
+        if cached_position is None:
+            position = Try(get_position_command.parse_position, *next(answers))
+            if position.isSuccess:
+                telemetry.update_position(position.get())
+        return water_level, position
+
     def cancel_all_actions(self,
                            instruction: Instruction,
                            action: Command,
@@ -204,4 +357,7 @@ class ActionManager:
                            fatal: bool = False,
                            fatal_recovery: bool = False) -> bool:
         self._queue.clear()
+        if self._planner is not None:
+            self._planner.clear()
+        self._redis.journal_cancel()
         return True
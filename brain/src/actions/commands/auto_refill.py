@@ -1,4 +1,3 @@
-from typing import List
 import logging
 
 from common.enums import State
@@ -11,6 +10,8 @@ from actions.memory import Memory
 from actions.feedback.feedback_manager import FeedbackManager
 from actions.commands.get_water_level import GetWaterLevelCommand
 from actions.commands.move import MoveCommand
+from actions.instruction_compiler import compile_command
+from actions.refill_reorderer import get_station_index
 
 
 class AutoRefillCommand:
@@ -36,8 +37,8 @@ class AutoRefillCommand:
 
         redis.update_state(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION)
 
-        if not GetWaterLevelCommand.run(instruction, {'val': ['16']}, error_handler_factory, feedback_manager,
-                                        memory, redis, serial, config, logger, fatal, fatal_recovery):
+        if not GetWaterLevelCommand.run(instruction, compile_command({'val': ['16']}), error_handler_factory,
+                                        feedback_manager, memory, redis, serial, config, logger, fatal, fatal_recovery):
             logger.log_system(logging.FATAL, 'Failed to read water level!')
             logger.log_system(logging.FATAL,
                               'Fatal error detected shutdown Bot script.\n\rHuman knowledge is needed.')
@@ -52,22 +53,20 @@ class AutoRefillCommand:
             remove_state_and_send_feedback()
             return True
 
-        if 'workingStations' in instruction and instruction['type'] == "AUTOREFILL":
-            station_locations = [int(y) for y in instruction['workingStations']]
-
+        stations = get_station_index(memory, config, instruction) if instruction.get('type') == "AUTOREFILL" else None
+        if stations:
             # Get_Pos
             x_pos, y_pos, _ = redis.get_position()
 
             # Calculate nearest station
-            if y_pos not in station_locations:
-                diff: List[int] = [abs(y_pos - loc) for loc in station_locations]
-                y_target: int = station_locations[diff.index(min(diff))]
+            if y_pos not in stations:
+                y_target: int = stations.nearest(y_pos)
 
                 # Move to the nearest station
                 move_command = [0, int(x_pos % 256), int(x_pos / 256), int(y_target % 256), int(y_target / 256),
                                 0, 0, 50]
-                if not MoveCommand.run(instruction, {'val': move_command}, error_handler_factory, feedback_manager,
-                                       memory, redis, serial, config, logger, fatal, fatal_recovery):
+                if not MoveCommand.run(instruction, compile_command({'val': move_command}), error_handler_factory,
+                                       feedback_manager, memory, redis, serial, config, logger, fatal, fatal_recovery):
                     logger.log_system(logging.FATAL, 'Failed to move to the watering station as {y_target}!')
                     logger.log_system(logging.FATAL,
                                       'Fatal error detected shutdown Bot script.\n\rHuman knowledge is needed.')
@@ -81,7 +80,7 @@ class AutoRefillCommand:
             logger.log_system(logging.INFO, f'Auto Refill -- Refilling at station Y-{y_pos}')
             logger.add_to_event(refill_message=f'Refilling at station Y-{y_pos}')
 
-        serial.send([int(x) for x in action['val']])
+        serial.send(action['args'])
         (left_answer, right_answer) = serial.receive()
 
         if not serial.is_ok(left_answer, right_answer):
@@ -97,8 +96,8 @@ class AutoRefillCommand:
             exit(-8)
 
         answer = {}
-        answer['Left'] = [x.decode('utf-8') for x in left_answer]
-        answer['Right'] = [x.decode('utf-8') for x in right_answer]
+        answer['Left'] = left_answer.get_texts()
+        answer['Right'] = right_answer.get_texts()
 
         remove_state_and_send_feedback()
 
@@ -10,6 +10,7 @@ from common.config import Config
 from common.types import Instruction, Command, ErrorHandlerFactoryFunc
 from actions.memory import Memory
 from actions.feedback.feedback_manager import FeedbackManager
+from model.firmware_reply import FirmwareReply
 from model.position import Position
 
 
@@ -37,7 +38,7 @@ class GetPositionCommand:
         standard_error_handler = error_handler_factory(ErrorHandlerCode.STANDARD)
         reset_z_error_handler = error_handler_factory(ErrorHandlerCode.RESET_Z)
 
-        serial.send([int(x) for x in action['val']])
+        serial.send(action['args'])
         (left_answer, right_answer) = serial.receive()
 
         if not serial.is_ok(left_answer, right_answer):
@@ -60,15 +61,15 @@ class GetPositionCommand:
             return False
 
         answer = {}
-        answer['Left'] = [x.decode('utf-8') for x in left_answer]
-        answer['Right'] = [x.decode('utf-8') for x in right_answer]
+        answer['Left'] = left_answer.get_texts()
+        answer['Right'] = right_answer.get_texts()
 
         logger.log_system(logging.INFO, f'Position: {json.dumps(answer)}')
 
-        x = int(right_answer[2])
-        y = int(left_answer[2])
-        z_1 = int(right_answer[3])
-        z_2 = int(left_answer[3])
+        x = right_answer.get_int(2)
+        y = left_answer.get_int(2)
+        z_1 = right_answer.get_int(3)
+        z_2 = left_answer.get_int(3)
 
         if z_1 != z_2:
             details = {
@@ -81,6 +82,8 @@ class GetPositionCommand:
             logger.add_listitem_to_event('warnings')
 
         redis.set_position(x, y, z_1)
+        if z_1 == z_2:
+            memory.telemetry.update_position(Position(x, y, z_1))
 
         redis.update_state(State.remove_state_add_IDLE, State.NON_SENSITIVE_ACTION)
         if action.get('NeedsFeedbackOnSuccess', False):
@@ -91,16 +94,17 @@ class GetPositionCommand:
 
     def get_position(self) -> Position:
         self._serial.send(GetPositionCommand.SERIAL_MESSAGES)
-        (left_answer, right_answer) = self._serial.receive()
+        return self.parse_position(*self._serial.receive())
 
+    def parse_position(self, left_answer: FirmwareReply, right_answer: FirmwareReply) -> Position:
         if not self._serial.is_ok(left_answer, right_answer):
             raise RuntimeError('Serial Communication is not ok')
         # TODO the serial communication is common to every command. We should add an abstract method
 
-        x = int(right_answer[2])
-        y = int(left_answer[2])
-        z_1 = int(right_answer[3])
-        z_2 = int(left_answer[3])
+        x = right_answer.get_int(2)
+        y = left_answer.get_int(2)
+        z_1 = right_answer.get_int(3)
+        z_2 = left_answer.get_int(3)
         if z_1 != z_2:
             raise RuntimeError('The 2 grippers are not aligned')
 
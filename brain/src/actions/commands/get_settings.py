@@ -28,7 +28,7 @@ class GetSettingsCommand:
         redis.update_state(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION)
         standard_error_handler = error_handler_factory(ErrorHandlerCode.STANDARD)
 
-        serial.send([int(x) for x in action['val']])
+        serial.send(action['args'])
         (left_answer, right_answer) = serial.receive()
 
         if not serial.is_ok(left_answer, right_answer):
@@ -51,8 +51,8 @@ class GetSettingsCommand:
             return False
 
         answer = {}
-        answer['Left'] = [x.decode('utf-8') for x in left_answer]
-        answer['Right'] = [x.decode('utf-8') for x in right_answer]
+        answer['Left'] = left_answer.get_texts()
+        answer['Right'] = right_answer.get_texts()
 
         logger.log_system(logging.INFO, f'Setting: {json.dumps(answer)}')
         logger.add_to_event(setting=json.dumps(answer))
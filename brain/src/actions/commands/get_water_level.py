@@ -10,6 +10,7 @@ from common.config import Config
 from common.types import Instruction, Command, ErrorHandlerFactoryFunc
 from actions.memory import Memory
 from actions.feedback.feedback_manager import FeedbackManager
+from model.firmware_reply import FirmwareReply
 
 
 class GetWaterLevelCommand:
@@ -34,7 +35,7 @@ class GetWaterLevelCommand:
         redis.update_state(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION)
         standard_error_handler = error_handler_factory(ErrorHandlerCode.STANDARD)
 
-        serial.send([int(x) for x in action['val']])
+        serial.send(action['args'])
         (left_answer, right_answer) = serial.receive()
 
         if not serial.is_ok(left_answer, right_answer):
@@ -57,11 +58,11 @@ class GetWaterLevelCommand:
             return False
 
         answer = {}
-        answer['Left'] = [x.decode('utf-8') for x in left_answer]
-        answer['Right'] = [x.decode('utf-8') for x in right_answer]
+        answer['Left'] = left_answer.get_texts()
+        answer['Right'] = right_answer.get_texts()
 
         memory.pre_tank_level = memory.post_tank_level
-        memory.post_tank_level = int(answer['Right'][2])
+        memory.post_tank_level = right_answer.get_int(2)
 
         logger.log_system(logging.INFO, f'Water Level: {json.dumps(memory.post_tank_level)}')
         logger.add_to_event(pre_tank_level=memory.pre_tank_level, post_tank_level=memory.post_tank_level)
@@ -77,6 +78,9 @@ class GetWaterLevelCommand:
             feedback_manager.send_to_gateway(instruction, action, memory, details)
             return False
 
+        if memory.pre_tank_level and memory.post_tank_level > memory.pre_tank_level:
+            memory.tank_level_deltas.append(memory.post_tank_level - memory.pre_tank_level)
+        memory.telemetry.update_tank_level(memory.post_tank_level)
         redis.update_state(State.remove_state_add_IDLE, State.NON_SENSITIVE_ACTION)
         if action.get('NeedsFeedbackOnSuccess', False):
             logger.send_event(logging.INFO)
@@ -86,10 +90,9 @@ class GetWaterLevelCommand:
 
     def get_water_level(self) -> int:
         self._serial.send(GetWaterLevelCommand.SERIAL_MESSAGES)
-        (left_answer, right_answer) = self._serial.receive()
+        return self.parse_water_level(*self._serial.receive())
 
+    def parse_water_level(self, left_answer: FirmwareReply, right_answer: FirmwareReply) -> int:
         if not self._serial.is_ok(left_answer, right_answer):
             raise RuntimeError('Serial Communication is not ok')
-        # TODO the serial communication is common to every command. We should add an abstract method
-        answer = {'Right': [x.decode('utf-8') for x in right_answer]}
-        return int(answer['Right'][2])
+        return right_answer.get_int(2)
@@ -10,6 +10,7 @@ from common.types import Instruction, Command, ErrorHandlerFactoryFunc
 from actions.memory import Memory
 from actions.feedback.feedback_manager import FeedbackManager
 from actions.commands.get_position import GetPositionCommand
+from actions.instruction_compiler import compile_command
 
 
 class HomeCommand:
@@ -33,7 +34,7 @@ class HomeCommand:
         else:
             error_handler = error_handler_factory(ErrorHandlerCode.STANDARD)
 
-        command: List[int] = [int(x) for x in action['val']]
+        command: List[int] = action['args']
         if command[CommandSemantics.HOMING_X_POS.value] == 1:
             state = State.HOMING_X
         elif command[CommandSemantics.HOMING_Y_POS.value] == 1:
@@ -64,8 +65,8 @@ class HomeCommand:
             feedback_manager.send_to_gateway(instruction, action, memory, details)
             return False
 
-        if not GetPositionCommand.run(instruction, {'val': ['9']}, error_handler_factory, feedback_manager, memory,
-                                      redis, serial, config, logger, fatal, fatal_recovery):
+        if not GetPositionCommand.run(instruction, compile_command({'val': ['9']}), error_handler_factory,
+                                      feedback_manager, memory, redis, serial, config, logger, fatal, fatal_recovery):
             return False
 
         redis.update_state(State.remove_state_add_IDLE, state)
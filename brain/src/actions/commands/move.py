@@ -1,4 +1,4 @@
-from typing import Callable, List, Optional
+from typing import List, Optional
 import logging
 
 from common.enums import State, ErrorHandlerCode
@@ -10,6 +10,7 @@ from common.types import Instruction, Command, ErrorHandlerFactoryFunc
 from actions.memory import Memory
 from actions.feedback.feedback_manager import FeedbackManager
 from actions.commands.get_position import GetPositionCommand
+from actions.instruction_compiler import compile_command
 
 
 class MoveCommand:
@@ -35,30 +36,26 @@ class MoveCommand:
 
         custom_speed: Optional[int] = memory.custom_speed
 
-        command_str: List[str] = [str(v) for v in action['val']]
+        command: List[int] = list(action['args'])
         if custom_speed:
-            command_str = command_str[:6] + [str(custom_speed)] + command_str[7:]
-        if command_str[1] == '-':
+            command[action['custom_speed_index']] = custom_speed
+        choices: List[int] = action['x_choices']
+        if action['keep_x']:
             state_to_add: State = State.MOVING_Y | State.MOVING_Z_DOWN | State.MOVING_Z_UP
             x = redis.get_axis_position('x')
-            command_str = [command_str[0]] + [str(x % 256), str(int(x / 256))] + command_str[2:]
-        elif command_str[1].startswith('['):
+            command[1:3] = [x % 256, int(x / 256)]
+        elif choices:
             state_to_add = State.MOVING_X
             instruction_id: str = instruction.get('instructionId', '')
-            bytes_str_to_int: Callable[[str, str], int] = lambda a, b: int(a) + int(b) * 256
-            choices = [bytes_str_to_int(*choice.split('_')) for choice in command_str[1][1:-1].split('|')]
             if instruction_id != memory.current_instruction_id:
                 memory.current_instruction_id = instruction_id
                 current_x = redis.get_axis_position('x')
                 memory.current_choice = 0 if abs(choices[0] - current_x) < abs(choices[1] - current_x) else 1
-            command_str = [command_str[0]] + [str(choices[memory.current_choice] % 256),
-                                              str(int(choices[memory.current_choice] / 256))] + command_str[2:]
+            command[1:3] = [choices[memory.current_choice] % 256, int(choices[memory.current_choice] / 256)]
         else:
             state_to_add = State.MOVING_X | State.MOVING_Y | State.MOVING_Z_DOWN | State.MOVING_Z_UP
         redis.update_state(State.add_state_remove_IDLE, state_to_add)
 
-        command = [int(x) for x in command_str]
-
         serial.send(command)
         (left_answer, right_answer) = serial.receive()
 
@@ -83,8 +80,8 @@ class MoveCommand:
 
         logger.log_system(logging.INFO, f'Left: {left_answer}\n\tRight: {right_answer}')
 
-        if not GetPositionCommand.run(instruction, {'val': ['9']}, error_handler_factory, feedback_manager, memory,
-                                      redis, serial, config, logger, fatal, fatal_recovery):
+        if not GetPositionCommand.run(instruction, compile_command({'val': ['9']}), error_handler_factory,
+                                      feedback_manager, memory, redis, serial, config, logger, fatal, fatal_recovery):
             return False
 
         redis.update_state(State.remove_state_add_IDLE, state_to_add)
@@ -30,7 +30,7 @@ class PauseCommand:
         else:
             error_handler = error_handler_factory(ErrorHandlerCode.STANDARD)
 
-        serial.send([int(x) for x in action['val']])
+        serial.send(action['args'])
         (left_answer, right_answer) = serial.receive()
 
         if not serial.is_ok(left_answer, right_answer):
@@ -48,7 +48,7 @@ class ScanRFIDCommand:
 
         redis.update_state(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION)
 
-        serial.send([int(x) for x in action['val']])
+        serial.send(action['args'])
         (left_answer, right_answer) = serial.receive()
 
         if not serial.is_ok(left_answer, right_answer):
@@ -62,7 +62,7 @@ class ScanRFIDCommand:
             return False
 
         try:
-            memory.current_rfid = bytes(left_answer[2]).decode('utf-8').strip()
+            memory.current_rfid = left_answer.get_text(2)
             memory.current_rfid = memory.current_rfid if memory.current_rfid != '0' else 'invalid_rfid'
         except Exception:
             memory.current_rfid = 'invalid_rfid'
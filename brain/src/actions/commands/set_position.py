@@ -27,7 +27,7 @@ class SetPositionCommand:
         redis.update_state(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION)
         standard_error_handler = error_handler_factory(ErrorHandlerCode.STANDARD)
 
-        serial.send([int(x) for x in action['val']])
+        serial.send(action['args'])
         (left_answer, right_answer) = serial.receive()
 
         if not serial.is_ok(left_answer, right_answer):
@@ -27,12 +27,12 @@ class SetPumpsCommand:
 
         standard_error_handler = error_handler_factory(ErrorHandlerCode.STANDARD)
 
-        if int(action['val'][3]) == 0 and int(action['val'][5]) == 0:
+        if action['args'][3] == 0 and action['args'][5] == 0:
             redis.update_state(State.remove_state, State.TOGGLE_PUMPS_ON | State.IDLE)
         else:
             redis.update_state(State.add_state_remove_IDLE, State.TOGGLE_PUMPS_ON)
 
-        serial.send([int(x) for x in action['val']])
+        serial.send(action['args'])
         (left_answer, right_answer) = serial.receive()
 
         if not serial.is_ok(left_answer, right_answer):
@@ -55,8 +55,8 @@ class SetPumpsCommand:
             return False
 
         answer = {}
-        answer['Left'] = [x.decode('utf-8') for x in left_answer]
-        answer['Right'] = [x.decode('utf-8') for x in right_answer]
+        answer['Left'] = left_answer.get_texts()
+        answer['Right'] = right_answer.get_texts()
 
         logger.log_system(logging.INFO, f'Set Pumps {json.dumps(answer)}')
         logger.add_to_event(pumps=json.dumps(answer))
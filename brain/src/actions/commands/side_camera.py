@@ -1,5 +1,4 @@
 from typing import Dict
-import json
 import time
 import logging
 
@@ -9,9 +8,11 @@ from common.serial_manager import SerialManager
 from common.log_event import Logger
 from common.config import Config
 from common.mqtt_client import MQTT
+from common.camera_rpc import CameraRPC, CAPTURED_STATUS
 from common.types import Instruction, Command, ErrorHandlerFactoryFunc
 from actions.memory import Memory
 from actions.feedback.feedback_manager import FeedbackManager
+from actions.feedback.upload_tracker import UploadTracker
 
 
 def sidecam_error_handler(instruction: Instruction,
@@ -31,21 +32,15 @@ def sidecam_error_handler(instruction: Instruction,
 
 
 class SideCam:
-    mqtt: MQTT = None
+    rpc: CameraRPC = None
+    upload_tracker: UploadTracker = None  # set for asynchronous capture
     cam_feedback = None
     feedback_timeout: int = 60  # seconds
 
     @staticmethod
-    def setup(mqtt: MQTT, logger: Logger, config: Config):
-
-        SideCam.mqtt = mqtt
-
-        def sidecam_feedback_callback(topic: str, payload: str, **kwargs: str) -> None:
-            logger.log_system(logging.INFO, 'Received from SideCam: ' + json.dumps(json.loads(payload), indent=4))
-            SideCam.cam_feedback = json.loads(payload)
-
-        SideCam.mqtt.subscribe(f"rc/{config.stage}/robots/{config.robot_id}/cameras/side/feedback",
-                               sidecam_feedback_callback)
+    def setup(mqtt: MQTT, logger: Logger, config: Config, upload_tracker: UploadTracker = None):
+        SideCam.upload_tracker = upload_tracker
+        SideCam.rpc = CameraRPC(mqtt, logger, config, 'side', 'SideCam')
 
     @staticmethod
     def open(instruction: Instruction,
@@ -61,15 +56,9 @@ class SideCam:
              fatal_recovery: bool = False) -> bool:
         redis.update_state(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION)
 
-        SideCam.cam_feedback = None
-        cam_command = {'instructionId': instruction['instructionId'],
-                       'Str': 'open_cam'}
-        logger.prepare_listitem_for_event(camera_in=cam_command['Str'])
-        SideCam.mqtt.send(f"rc/{config.stage}/robots/{config.robot_id}/cameras/side/cmds", json.dumps(cam_command))
-        trys: int = 0
-        while trys < SideCam.feedback_timeout and not SideCam.cam_feedback:
-            trys += 1
-            time.sleep(1)
+        logger.prepare_listitem_for_event(camera_in='open_cam')
+        SideCam.cam_feedback = SideCam.rpc.call(instruction['instructionId'], 'open_cam',
+                                                timeout=SideCam.feedback_timeout)
 
         if not SideCam.cam_feedback:
             logger.log_system(logging.ERROR, "No response from SideCam")
@@ -121,16 +110,15 @@ class SideCam:
                   'view': 'side',
                   'robot': config.robot_id,
                   'x': x, 'y': y, 'z': z}
-        SideCam.cam_feedback = None
-        cam_command = {'instructionId': instruction['instructionId'],
-                       'Str': 'take_image',
-                       'Metadata': params}
-        logger.prepare_listitem_for_event(camera_in=cam_command['Str'])
-        SideCam.mqtt.send(f"rc/{config.stage}/robots/{config.robot_id}/cameras/side/cmds", json.dumps(cam_command))
-        trys: int = 0
-        while trys < SideCam.feedback_timeout and not SideCam.cam_feedback:
-            trys += 1
-            time.sleep(1)
+        logger.prepare_listitem_for_event(camera_in='take_image')
+        request = None
+        if SideCam.upload_tracker is not None:
+            # Only wait until the image is exposed, the upload is confirmed later through the tracker
+            request = SideCam.rpc.send(instruction['instructionId'], 'take_image', params, ackOnCapture=True)
+            SideCam.cam_feedback = SideCam.rpc.wait_for_ack(request, SideCam.feedback_timeout)
+        else:
+            SideCam.cam_feedback = SideCam.rpc.call(instruction['instructionId'], 'take_image', params,
+                                                    timeout=SideCam.feedback_timeout)
 
         if not SideCam.cam_feedback:
             logger.log_system(logging.ERROR, "No response from SideCam")
@@ -152,6 +140,11 @@ class SideCam:
                                   error_handler_factory)
             return False
 
+        if request is not None and SideCam.cam_feedback.get('instructionStatus', '') == CAPTURED_STATUS:
+            SideCam.upload_tracker.track(SideCam.rpc, request, instruction, action,
+                                         'HorizontalBotUploadSideCamError')
+            return True
+
         if action.get('NeedsFeedbackOnSuccess', False):
             logger.send_event(logging.INFO)
             feedback_manager.send_to_gateway(instruction, action, memory)
@@ -171,15 +164,9 @@ class SideCam:
               fatal_recovery: bool = False) -> bool:
         redis.update_state(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION)
 
-        cam_command = {'instructionId': instruction['instructionId'],
-                       'Str': 'close_cam'}
-        SideCam.cam_feedback = None
-        logger.prepare_listitem_for_event(camera_in=cam_command['Str'])
-        SideCam.mqtt.send(f"rc/{config.stage}/robots/{config.robot_id}/cameras/side/cmds", json.dumps(cam_command))
-        trys: int = 0
-        while trys < SideCam.feedback_timeout and not SideCam.cam_feedback:
-            trys += 1
-            time.sleep(1)
+        logger.prepare_listitem_for_event(camera_in='close_cam')
+        SideCam.cam_feedback = SideCam.rpc.call(instruction['instructionId'], 'close_cam',
+                                                timeout=SideCam.feedback_timeout)
 
         if not SideCam.cam_feedback:
             logger.log_system(logging.ERROR, "No response from SideCam")
@@ -1,5 +1,4 @@
 from typing import Dict
-import json
 import time
 import logging
 
@@ -10,8 +9,10 @@ from common.log_event import Logger
 from common.config import Config
 from common.types import Instruction, Command, ErrorHandlerFactoryFunc
 from common.mqtt_client import MQTT
+from common.camera_rpc import CameraRPC, CAPTURED_STATUS
 from actions.memory import Memory
 from actions.feedback.feedback_manager import FeedbackManager
+from actions.feedback.upload_tracker import UploadTracker
 
 
 def topcam_error_handler(instruction: Instruction,
@@ -31,21 +32,15 @@ def topcam_error_handler(instruction: Instruction,
 
 
 class TopCam:
-    mqtt: MQTT = None
+    rpc: CameraRPC = None
+    upload_tracker: UploadTracker = None  # set for asynchronous capture
     cam_feedback = None
     feedback_timeout: int = 60  # seconds
 
     @staticmethod
-    def setup(mqtt: MQTT, logger: Logger, config: Config):
-
-        TopCam.mqtt = mqtt
-
-        def topcam_feedback_callback(topic: str, payload: str, **kwargs: str) -> None:
-            logger.log_system(logging.INFO, 'Received from TopCam: ' + json.dumps(json.loads(payload), indent=4))
-            TopCam.cam_feedback = json.loads(payload)
-
-        TopCam.mqtt.subscribe(f"rc/{config.stage}/robots/{config.robot_id}/cameras/top/feedback",
-                              topcam_feedback_callback)
+    def setup(mqtt: MQTT, logger: Logger, config: Config, upload_tracker: UploadTracker = None):
+        TopCam.upload_tracker = upload_tracker
+        TopCam.rpc = CameraRPC(mqtt, logger, config, 'top', 'TopCam')
 
     @staticmethod
     def open(instruction: Instruction,
@@ -61,15 +56,9 @@ class TopCam:
              fatal_recovery: bool = False) -> bool:
         redis.update_state(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION)
 
-        TopCam.cam_feedback = None
-        cam_command = {'instructionId': instruction['instructionId'],
-                       'Str': 'open_cam'}
-        logger.prepare_listitem_for_event(camera_in=cam_command['Str'])
-        TopCam.mqtt.send(f"rc/{config.stage}/robots/{config.robot_id}/cameras/top/cmds", json.dumps(cam_command))
-        trys: int = 0
-        while trys < TopCam.feedback_timeout and not TopCam.cam_feedback:
-            trys += 1
-            time.sleep(1)
+        logger.prepare_listitem_for_event(camera_in='open_cam')
+        TopCam.cam_feedback = TopCam.rpc.call(instruction['instructionId'], 'open_cam',
+                                              timeout=TopCam.feedback_timeout)
 
         if not TopCam.cam_feedback:
             logger.log_system(logging.ERROR, "No response from TopCam")
@@ -121,16 +110,15 @@ class TopCam:
                   'view': 'top',
                   'robot': config.robot_id,
                   'x': x, 'y': y, 'z': z}
-        TopCam.cam_feedback = None
-        cam_command = {'instructionId': instruction['instructionId'],
-                       'Str': 'take_image',
-                       'Metadata': params}
-        logger.prepare_listitem_for_event(camera_in=cam_command['Str'])
-        TopCam.mqtt.send(f"rc/{config.stage}/robots/{config.robot_id}/cameras/top/cmds", json.dumps(cam_command))
-        trys: int = 0
-        while trys < TopCam.feedback_timeout and not TopCam.cam_feedback:
-            trys += 1
-            time.sleep(1)
+        logger.prepare_listitem_for_event(camera_in='take_image')
+        request = None
+        if TopCam.upload_tracker is not None:
+            # Only wait until the image is exposed, the upload is confirmed later through the tracker
+            request = TopCam.rpc.send(instruction['instructionId'], 'take_image', params, ackOnCapture=True)
+            TopCam.cam_feedback = TopCam.rpc.wait_for_ack(request, TopCam.feedback_timeout)
+        else:
+            TopCam.cam_feedback = TopCam.rpc.call(instruction['instructionId'], 'take_image', params,
+                                                  timeout=TopCam.feedback_timeout)
 
         if not TopCam.cam_feedback:
             logger.log_system(logging.ERROR, "No response from TopCam")
@@ -152,6 +140,10 @@ class TopCam:
                                  error_handler_factory)
             return False
 
+        if request is not None and TopCam.cam_feedback.get('instructionStatus', '') == CAPTURED_STATUS:
+            TopCam.upload_tracker.track(TopCam.rpc, request, instruction, action, 'HorizontalBotUploadTopCamError')
+            return True
+
         if action.get('NeedsFeedbackOnSuccess', False):
             logger.send_event(logging.INFO)
             feedback_manager.send_to_gateway(instruction, action, memory)
@@ -171,15 +163,9 @@ class TopCam:
               fatal_recovery: bool = False) -> bool:
         redis.update_state(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION)
 
-        cam_command = {'instructionId': instruction['instructionId'],
-                       'Str': 'close_cam'}
-        TopCam.cam_feedback = None
-        logger.prepare_listitem_for_event(camera_in=cam_command['Str'])
-        TopCam.mqtt.send(f"rc/{config.stage}/robots/{config.robot_id}/cameras/top/cmds", json.dumps(cam_command))
-        trys: int = 0
-        while trys < TopCam.feedback_timeout and not TopCam.cam_feedback:
-            trys += 1
-            time.sleep(1)
+        logger.prepare_listitem_for_event(camera_in='close_cam')
+        TopCam.cam_feedback = TopCam.rpc.call(instruction['instructionId'], 'close_cam',
+                                              timeout=TopCam.feedback_timeout)
 
         if not TopCam.cam_feedback:
             logger.log_system(logging.ERROR, "No response from TopCam")
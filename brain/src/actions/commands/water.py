@@ -27,13 +27,12 @@ class WaterCommand:
 
         standard_error_handler = error_handler_factory(ErrorHandlerCode.STANDARD)
 
-        command_with_config: List[str] = action['val']
-        command: List[int] = [int(x) for x in command_with_config[:7]]
+        command: List[int] = list(action['args'])
 
-        factor: float = float(command_with_config[7])
-        distance: float = float(command_with_config[8])
-        flow: float = float(command_with_config[9])
-        target_weight: float = float(command_with_config[10])
+        factor: float = action['watering']['factor']
+        distance: float = action['watering']['distance']
+        flow: float = action['watering']['flow']
+        target_weight: float = action['watering']['target_weight']
         diff_weight: float = target_weight - memory.post_weight
 
         logger.add_to_event(
@@ -27,7 +27,7 @@ class WeightCommand:
         redis.update_state(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION)
         standard_error_handler = error_handler_factory(ErrorHandlerCode.STANDARD)
 
-        serial.send([int(x) for x in action['val']])
+        serial.send(action['args'])
         (left_answer, right_answer) = serial.receive()
 
         if not serial.is_ok(left_answer, right_answer):
@@ -50,7 +50,7 @@ class WeightCommand:
             return False
 
         memory.pre_weight = memory.post_weight
-        memory.post_weight = int(float(left_answer[2]) + float(right_answer[2])) + config.weight_offset
+        memory.post_weight = int(left_answer.get_float(2) + right_answer.get_float(2)) + config.weight_offset
 
         logger.add_to_event(pre_weight=memory.pre_weight, post_weight=memory.post_weight)
 
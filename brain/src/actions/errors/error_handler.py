@@ -7,6 +7,7 @@ from actions.commands.pause import PauseCommand
 from actions.commands.set_pumps import SetPumpsCommand
 from actions.feedback.feedback_manager import FeedbackManager
 from actions.memory import Memory
+from actions.instruction_compiler import compile_command
 from common.config import Config
 from common.enums import State, ErrorHandlerCode
 from common.log_event import Logger
@@ -177,40 +178,41 @@ class ErrorHandler:
         pos = self._redis.get_position()
         x, y, _ = [[axis % 256, int(axis / 256)] for axis in (pos if pos else [0, 0, 0])]
         if pos:
-            MoveCommand.run(instruction, {'val': [0] + x + y + [50, 0, 100]}, self.get_handler,
+            MoveCommand.run(instruction, compile_command({'val': [0] + x + y + [50, 0, 100]}), self.get_handler,
                             *self._dependencies, fatal_recovery=True)
-        HomeCommand.run(instruction, {'val': [7, 0, 0, 0, 0, 1, 0, 20]}, self.get_handler,
+        HomeCommand.run(instruction, compile_command({'val': [7, 0, 0, 0, 0, 1, 0, 20]}), self.get_handler,
                         *self._dependencies, fatal_recovery=True)
 
     def standard_error_handler(self, instruction: Instruction, command: Command) -> None:
-        PauseCommand.run(instruction, {'val': [3, 2]}, self.get_handler, *self._dependencies, fatal_recovery=True)
+        PauseCommand.run(instruction, compile_command({'val': [3, 2]}), self.get_handler, *self._dependencies,
+                         fatal_recovery=True)
         state = self._redis.get_current_state()
         if not State.has_state(state, State.HOMING_Y | State.MOVING_Y):
-            HomeCommand.run(instruction, {'val': [7, 0, 0, 0, 0, 1, 0, 20]}, self.get_handler,
+            HomeCommand.run(instruction, compile_command({'val': [7, 0, 0, 0, 0, 1, 0, 20]}), self.get_handler,
                             *self._dependencies, fatal_recovery=True)
         pos = self._redis.get_position()
         x, y, z = [[axis % 256, int(axis / 256)] for axis in (pos if pos else [0, 0, 0])]
         if State.has_state(state, State.TOGGLE_PUMPS_ON):
-            SetPumpsCommand.run(instruction, {'val': [2, 0, 0, 0, 0, 0, 0]}, self.get_handler,
+            SetPumpsCommand.run(instruction, compile_command({'val': [2, 0, 0, 0, 0, 0, 0]}), self.get_handler,
                                 *self._dependencies, fatal_recovery=True)
-            HomeCommand.run(instruction, {'val': [7, 0, 0, 0, 0, 1, 0, 20]}, self.get_handler,
+            HomeCommand.run(instruction, compile_command({'val': [7, 0, 0, 0, 0, 1, 0, 20]}), self.get_handler,
                             *self._dependencies, fatal_recovery=True)
         if State.has_state(state, State.MOVING_X | State.HOMING_X):
             if pos:
-                MoveCommand.run(instruction, {'val': [0, 0, 0] + y + z + [100]}, self.get_handler,
+                MoveCommand.run(instruction, compile_command({'val': [0, 0, 0] + y + z + [100]}), self.get_handler,
                                 *self._dependencies, fatal_recovery=True)
-            HomeCommand.run(instruction, {'val': [7, 1, 0, 0, 0, 0, 0, 20]}, self.get_handler,
+            HomeCommand.run(instruction, compile_command({'val': [7, 1, 0, 0, 0, 0, 0, 20]}), self.get_handler,
                             *self._dependencies, fatal_recovery=True)
         if State.has_state(state, State.MOVING_Z_UP | State.MOVING_Z_DOWN | State.HOMING_Z):
             if pos:
-                MoveCommand.run(instruction, {'val': [0] + x + y + [0, 0, 100]}, self.get_handler,
+                MoveCommand.run(instruction, compile_command({'val': [0] + x + y + [0, 0, 100]}), self.get_handler,
                                 *self._dependencies, fatal_recovery=True)
-            HomeCommand.run(instruction, {'val': [7, 0, 0, 0, 0, 1, 0, 20]}, self.get_handler,
+            HomeCommand.run(instruction, compile_command({'val': [7, 0, 0, 0, 0, 1, 0, 20]}), self.get_handler,
                             *self._dependencies, fatal_recovery=True)
         if State.has_state(state, State.HOMING_Y | State.MOVING_Y):
             if pos:
-                MoveCommand.run(instruction, {'val': [0] + x + [114, 56] + z + [100]}, self.get_handler,
-                                *self._dependencies, fatal_recovery=True)
-            HomeCommand.run(instruction, {'val': [7, 0, 0, 2, 0, 0, 0, 20]}, self.get_handler,
+                MoveCommand.run(instruction, compile_command({'val': [0] + x + [114, 56] + z + [100]}),
+                                self.get_handler, *self._dependencies, fatal_recovery=True)
+            HomeCommand.run(instruction, compile_command({'val': [7, 0, 0, 2, 0, 0, 0, 20]}), self.get_handler,
                             *self._dependencies, fatal_recovery=True)
         self._cancel(instruction, {}, self.get_handler, *self._dependencies)
@@ -25,7 +25,8 @@ class FeedbackManager:
                         instruction: Instruction,
                         action: Command,
                         memory: Memory,
-                        additional_details: Dict[str, Any] = {}) -> None:
+                        additional_details: Dict[str, Any] = {},
+                        finish_instruction: bool = True) -> None:
 
         feedback: Dict[str, Any] = {}
         feedback['Meta'] = {}
@@ -43,7 +44,11 @@ class FeedbackManager:
         self.fill_details(feedback, memory)
 
         self._mqtt.send(f'rc/{self._config.stage}/farms/{self._config.farm_id}/robots/{self._config.robot_id}/feedback',
-                        json.dumps(feedback))
+                        json.dumps(feedback), durable=True)
+        if finish_instruction:
+            self.finish_instruction()
+
+    def finish_instruction(self) -> None:
         self._redis.update_state(State.remove_state, State.HANDLING_INSTRUCTION)
 
     def fill_details_exit_success(self, _: Feedback, memory: Memory) -> None:
@@ -41,4 +41,4 @@ class IdleHandler:
         self.__logger.add_to_event(idleFarmId=self.__farm_id, idleRobotId=self.__robot_id, idleMessage=json_dump)
         self.__logger.send_event(logging.INFO)
         self.__mqtt.send(f'rc/{self.__stage}/farms/{self.__farm_id}/robots/{self.__robot_id}/idle',
-                         json_dump)
+                         json_dump, durable=True)
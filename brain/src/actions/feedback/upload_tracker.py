@@ -0,0 +1,95 @@
+from threading import Lock
+from typing import Any, Dict, Optional, Set, Tuple
+import logging
+
+from common.camera_rpc import CameraRPC, PendingCameraRequest
+from common.log_event import Logger
+from common.scheduler import ScheduledJob, get_scheduler
+from common.types import Instruction, Command
+from actions.memory import Memory
+from actions.feedback.feedback_manager import FeedbackManager
+
+
+class UploadTracker:
+    """Follows photos whose upload goes on in the camera service after the capture was acknowledged.
+        The outcome is reported to the gateway once the camera confirms the upload (or the timeout passes),
+        while the action queue already continues with the next commands. The report of the last pending upload
+        of an instruction whose commands all ran finishes the instruction. When its uploads were all reported
+        before that, the end of the instruction finishes it.
+    """
+    def __init__(self, feedback_manager: FeedbackManager, memory: Memory, logger: Logger,
+                 timeout: float) -> None:
+        self._feedback_manager: FeedbackManager = feedback_manager
+        self._memory: Memory = memory
+        self._logger: Logger = logger
+        self._timeout: float = timeout
+        self.__lock = Lock()
+        self.__uploads: Dict[str, Tuple[Instruction, Command, str, ScheduledJob]] = {}
+        # Instructions whose commands all ran while some of their uploads were still pending
+        self.__ended: Set[str] = set()
+        # Instructions whose last pending upload was reported without finishing them before their commands all ran
+        self.__unfinished: Set[str] = set()
+        self.uploaded: int = 0
+        self.failed: int = 0
+
+    def track(self, rpc: CameraRPC, request: PendingCameraRequest, instruction: Instruction, action: Command,
+              status_code: str) -> None:
+        with self.__lock:
+            timeout = get_scheduler().schedule(self._timeout, rpc.release, request)
+            self.__uploads[request.request_id] = (instruction, action, status_code, timeout)
+        request.on_done = lambda reply: self._complete(rpc.name, request.request_id, reply)
+        if request.done.is_set():
+            self._complete(rpc.name, request.request_id, request.reply)
+
+    def pending(self) -> int:
+        with self.__lock:
+            return len(self.__uploads)
+
+    def end_instruction(self, instruction: Instruction) -> None:
+        """The last command of the instruction ran, its last upload to be confirmed finishes it (or this, when
+            its uploads were all reported already)
+        """
+        instruction_id = instruction.get('instructionId', '')
+        with self.__lock:
+            if self.__pending_for(instruction_id):
+                self.__ended.add(instruction_id)
+                return
+            if instruction_id not in self.__unfinished:
+                return
+            self.__unfinished.discard(instruction_id)
+        self._feedback_manager.finish_instruction()
+
+    def __pending_for(self, instruction_id: str) -> bool:
+        return any(upload[0].get('instructionId', '') == instruction_id for upload in self.__uploads.values())
+
+    def _complete(self, camera: str, request_id: str, reply: Optional[Dict[str, Any]]) -> None:
+        with self.__lock:
+            upload = self.__uploads.pop(request_id, None)
+            if upload is None:
+                return
+            instruction, action, status_code, timeout = upload
+            instruction_id = instruction.get('instructionId', '')
+            last = not self.__pending_for(instruction_id)
+            finish_instruction = last and instruction_id in self.__ended
+            if finish_instruction:
+                self.__ended.discard(instruction_id)
+            failed = reply is None or reply.get('instructionStatus', '') == 'FAILED'
+            if last and not finish_instruction and (failed or action.get('NeedsFeedbackOnSuccess', False)):
+                self.__unfinished.add(instruction_id)
+        timeout.cancel()
+
+        if failed:
+            self.failed += 1
+            message = f"Horizontal Robot - {camera} message: {reply['message']}" if reply \
+                else f'Horizontal Robot - No upload confirmation from {camera}'
+            self._logger.log_system(logging.ERROR, f"{message} [{instruction.get('instructionId', '')}]")
+            self._feedback_manager.send_to_gateway(instruction, action, self._memory,
+                                                   {'statusCode': status_code, 'message': message},
+                                                   finish_instruction=finish_instruction)
+            return
+
+        self.uploaded += 1
+        self._logger.log_system(logging.INFO, f"{camera} upload done [{instruction.get('instructionId', '')}]")
+        if action.get('NeedsFeedbackOnSuccess', False):
+            self._feedback_manager.send_to_gateway(instruction, action, self._memory,
+                                                   finish_instruction=finish_instruction)
@@ -0,0 +1,126 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from common.types import Instruction, Command
+
+MOVE = 0
+WATER = 2
+# Commands handled by the brain itself, they are not sent to the boards
+LOCAL_CODES = {100, 101, 102, 105, 106, 107, 255}
+
+
+class InstructionCompileError(ValueError):
+    def __init__(self, message: str, command: Optional[Command] = None) -> None:
+        super().__init__(message)
+        self.command: Optional[Command] = command
+
+
+def _byte(token: str, command: Command) -> int:
+    try:
+        value = int(token)
+    except ValueError:
+        raise InstructionCompileError(f'{token!r} is not an integer', command)
+    if not 0 <= value <= 255:
+        raise InstructionCompileError(f'{value} does not fit into a byte', command)
+    return value
+
+
+def _bytes(tokens: List[str], command: Command) -> List[int]:
+    return [_byte(token, command) for token in tokens]
+
+
+def _compile_move(tokens: List[str], command: Command) -> None:
+    """A move either has the x bytes, keeps the current x ('-') or picks the closer one of two x ([lo_hi|lo_hi])"""
+    command['keep_x'] = tokens[1] == '-'
+    command['x_choices'] = []
+    if command['keep_x'] or tokens[1].startswith('['):
+        if len(tokens) != 7:
+            raise InstructionCompileError(f'A move without x bytes needs 7 values, got {len(tokens)}', command)
+        if not command['keep_x']:
+            choices = tokens[1][1:-1].split('|')
+            if not tokens[1].endswith(']') or len(choices) != 2 or any(len(c.split('_')) != 2 for c in choices):
+                raise InstructionCompileError(f'{tokens[1]!r} are not two x choices', command)
+            command['x_choices'] = [_byte(lo, command) + _byte(hi, command) * 256
+                                    for lo, hi in (choice.split('_') for choice in choices)]
+        # The x bytes are filled in when the move runs
+        command['args'] = [MOVE, 0, 0] + _bytes(tokens[2:], command)
+        # The custom watering speed replaces the seventh value of the command
+        command['custom_speed_index'] = 7
+    else:
+        if len(tokens) != 8:
+            raise InstructionCompileError(f'A move needs 8 values, got {len(tokens)}', command)
+        command['args'] = _bytes(tokens, command)
+        # Like before the compiler, the custom speed of a literal move replaces its seventh value
+        command['custom_speed_index'] = 6
+
+
+def _compile_water(tokens: List[str], command: Command) -> None:
+    """The pump message, followed by the values the pump speed is calculated from (only a plain pump message
+        when the pumps are switched off by the brain itself)
+    """
+    command['args'] = _bytes(tokens[:7], command)
+    if len(tokens) == 7:
+        return
+    if len(tokens) != 11:
+        raise InstructionCompileError(f'A water command needs 11 values, got {len(tokens)}', command)
+    try:
+        factor, distance, flow, target_weight = (float(token) for token in tokens[7:])
+    except ValueError:
+        raise InstructionCompileError(f'Invalid watering values {tokens[7:]}', command)
+    command['watering'] = {'factor': factor, 'distance': distance, 'flow': flow, 'target_weight': target_weight}
+
+
+def compile_command(command: Command) -> Command:
+    """Decodes a command once: 'opcode' and the message bytes 'args' (plus the values of moves and water commands)
+        are added next to 'val', the string values the command came with.
+    """
+    tokens = command['Str'].split(' ') if 'Str' in command else [str(value) for value in command['val']]
+    command['val'] = tokens
+    if not tokens or not tokens[0]:
+        raise InstructionCompileError('Empty command', command)
+    try:
+        command['opcode'] = int(tokens[0])
+    except ValueError:
+        raise InstructionCompileError(f'{tokens[0]!r} is not a command code', command)
+
+    if command['opcode'] == MOVE:
+        _compile_move(tokens, command)
+    elif command['opcode'] == WATER:
+        _compile_water(tokens, command)
+    elif command['opcode'] in LOCAL_CODES:
+        command['args'] = [command['opcode']]
+    else:
+        command['args'] = _bytes(tokens, command)
+    return command
+
+
+class InstructionCompiler:
+    """Turns a received instruction into a plan of decoded commands. A malformed command rejects the whole
+        instruction before any of its commands runs.
+    """
+    def __init__(self, opcodes: Iterable[int]) -> None:
+        self._opcodes: Set[int] = set(opcodes)
+
+    def compile(self, payload: Dict[str, Any]) -> Tuple[Instruction, List[Command]]:
+        instruction = payload.get('Instruction')
+        commands = payload.get('Commands')
+        if not isinstance(instruction, dict) or not isinstance(commands, list):
+            raise InstructionCompileError('An instruction needs an Instruction and a list of Commands')
+        if not commands:
+            raise InstructionCompileError('The instruction has no commands')
+        if 'instructionId' not in instruction or 'type' not in instruction:
+            raise InstructionCompileError('The instruction has no instructionId or type')
+
+        plan = []
+        for index, command in enumerate(commands):
+            if not isinstance(command, dict) or not isinstance(command.get('Str'), str):
+                raise InstructionCompileError(f'{command!r} has no command string')
+            compile_command(command)
+            # The place of the command within its instruction, the journal refers to it
+            command['index'] = index
+            command['last'] = index == len(commands) - 1
+            if command['opcode'] not in self._opcodes:
+                raise InstructionCompileError(f"Command {command['opcode']} is not implemented", command)
+            if command['opcode'] == WATER and 'watering' not in command:
+                raise InstructionCompileError('A water command needs the watering values', command)
+            plan.append(command)
+        return instruction, plan
@@ -1,8 +1,12 @@
-from typing import Optional
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from actions.station_index import StationIndex
+from actions.telemetry_snapshot import TelemetrySnapshot
 
 
 class Memory:
-    def __init__(self):
+    def __init__(self, telemetry_ttl_sec: float = 0):
         self.custom_speed: Optional[int] = None
         self.pre_weight: int = 0
         self.post_weight: int = 0
@@ -14,3 +18,11 @@ class Memory:
 
         self.pre_tank_level: int = 0
         self.post_tank_level: int = 0
+        # How much the tank level rose between two readings (the level rises as the tank empties)
+        self.tank_level_deltas: Deque[int] = deque(maxlen=10)
+
+        # Built once from the stations of the config or of an instruction, rebuilt when they change
+        self.stations: Optional[StationIndex] = None
+        self.stations_key: Tuple[int, ...] = ()
+
+        self.telemetry: TelemetrySnapshot = TelemetrySnapshot(telemetry_ttl_sec)
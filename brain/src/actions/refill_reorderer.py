@@ -0,0 +1,67 @@
+from typing import List, Optional, Tuple
+
+from actions.memory import Memory
+from actions.route_planner import Cost, Stop, arrive
+from actions.station_index import StationIndex
+from common.config import Config
+from common.types import Instruction
+
+WATER = 'WATER'
+# Rises of the tank level up to this are noise of the sensor, not water that was used
+LEVEL_NOISE = 1
+
+
+def get_station_index(memory: Memory, config: Config, instruction: Instruction) -> Optional[StationIndex]:
+    """The stations of the instruction (of the config if it has none), indexed once while they stay the same"""
+    locations = tuple(int(y) for y in instruction.get('workingStations', [])) or tuple(config.watering_stations)
+    if not locations:
+        return None
+    if memory.stations is None or memory.stations_key != locations:
+        memory.stations, memory.stations_key = StationIndex(locations), locations
+    return memory.stations
+
+
+class RefillReorderer:
+    """Reorders the AUTOREFILL instructions the gateway sent, it never creates one. Predicts after how many
+        waterings the tank level reaches refill_level, from the recent rises of the level, and moves a refill among
+        the planned instructions to where the detour to the nearest station is the shortest before the tank runs out
+    """
+    def __init__(self, memory: Memory, config: Config, cost: Cost) -> None:
+        self._memory: Memory = memory
+        self._config: Config = config
+        self._cost: Cost = cost
+
+    def get_waterings_left(self) -> Optional[int]:
+        deltas = [delta for delta in self._memory.tank_level_deltas if delta > LEVEL_NOISE]
+        if not deltas or not self._memory.post_tank_level:
+            return None
+        per_watering = sum(deltas) / len(deltas)
+        return max(0, int((self._config.refill_level - self._memory.post_tank_level) // per_watering))
+
+    def place(self, position: Tuple[int, int], refill: Stop, route: List[Stop]) -> int:
+        """The index of the route the refill goes before (0 when nothing is known about the tank)"""
+        stations = get_station_index(self._memory, self._config, refill.instruction)
+        left = self.get_waterings_left()
+        if stations is None or left is None:
+            return 0
+
+        limit, waterings = len(route), 0
+        for index, stop in enumerate(route):
+            if stop.instruction.get('type') == WATER:
+                waterings += 1
+                if waterings > left:
+                    limit = index
+                    break
+
+        best_index, best_detour = 0, float('inf')
+        for index in range(limit + 1):
+            station = (position[0], stations.nearest(position[1]))
+            detour = self._cost(position, station)
+            if index < len(route) and route[index].point is not None:
+                point = route[index].point
+                detour += self._cost(station, point) - self._cost(position, point)  # type: ignore
+            if detour < best_detour - 1e-9:
+                best_index, best_detour = index, detour
+            if index < len(route):
+                position = arrive(position, route[index])
+        return best_index
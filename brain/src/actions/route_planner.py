@@ -0,0 +1,195 @@
+from __future__ import annotations
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+import time
+
+from actions.instruction_compiler import MOVE
+from common.types import Command, Instruction
+
+if TYPE_CHECKING:
+    from actions.refill_reorderer import RefillReorderer
+
+AUTOREFILL = 'AUTOREFILL'
+
+Point = Tuple[Optional[int], int]
+Cost = Callable[[Tuple[int, int], Point], float]
+
+
+class Stop:
+    """A planned instruction and the slot it goes to: the x and y of its first move (x is None if the move keeps
+        the x, the mean of both choices if it picks the closer one)
+    """
+    def __init__(self, instruction: Instruction, plan: List[Command], sequence: int) -> None:
+        self.instruction: Instruction = instruction
+        self.plan: List[Command] = plan
+        self.sequence: int = sequence
+        self.point: Optional[Point] = get_point(plan)
+        self.slot: Tuple[Any, ...] = tuple(instruction.get(key) for key in ('cellId', 'layerId', 'slotId')) \
+            if 'slotId' in instruction else (self.point,)
+        self.priority: int = _number(instruction.get('priority'), int) or 0
+        self.deadline: Optional[float] = _number(instruction.get('deadline'), float)
+
+
+def _number(value: Any, kind: Callable[[Any], Any]) -> Any:
+    try:
+        return kind(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def get_point(plan: List[Command]) -> Optional[Point]:
+    for command in plan:
+        if command.get('opcode') != MOVE:
+            continue
+        args = command['args']
+        if command.get('keep_x'):
+            x: Optional[int] = None
+        elif command.get('x_choices'):
+            x = sum(command['x_choices']) // len(command['x_choices'])
+        else:
+            x = args[1] + args[2] * 256
+        return x, args[3] + args[4] * 256
+    return None
+
+
+def travel_cost(speed_x: float, speed_y: float) -> Cost:
+    """Both axes move at the same time, so a move takes as long as its slower axis"""
+    def cost(position: Tuple[int, int], point: Point) -> float:
+        x, y = point
+        return max(abs(x - position[0]) / speed_x if x is not None else 0.0, abs(y - position[1]) / speed_y)
+    return cost
+
+
+def arrive(position: Tuple[int, int], stop: Stop) -> Tuple[int, int]:
+    if stop.point is None:
+        return position
+    x, y = stop.point
+    return (position[0] if x is None else x), y
+
+
+def route_cost(start: Tuple[int, int], route: List[Stop], cost: Cost) -> float:
+    total, position = 0.0, start
+    for stop in route:
+        if stop.point is not None:
+            total += cost(position, stop.point)
+        position = arrive(position, stop)
+    return total
+
+
+def _in_order(route: List[Stop]) -> bool:
+    """Instructions for the same slot keep the order they were accepted in"""
+    last: Dict[Tuple[Any, ...], int] = {}
+    for stop in route:
+        if last.get(stop.slot, -1) > stop.sequence:
+            return False
+        last[stop.slot] = stop.sequence
+    return True
+
+
+def nearest_neighbour(start: Tuple[int, int], stops: List[Stop], cost: Cost) -> List[Stop]:
+    route: List[Stop] = []
+    left = sorted(stops, key=lambda stop: stop.sequence)
+    position = start
+    while left:
+        # Only the oldest instruction of every slot can be next
+        firsts = [stop for stop in left if not any(other.slot == stop.slot and other.sequence < stop.sequence
+                                                   for other in left)]
+        stop = min(firsts, key=lambda stop: (cost(position, stop.point) if stop.point is not None else 0.0,
+                                             stop.sequence))
+        left.remove(stop)
+        route.append(stop)
+        position = arrive(position, stop)
+    return route
+
+
+def two_opt(start: Tuple[int, int], route: List[Stop], cost: Cost, max_passes: int = 10) -> List[Stop]:
+    """Reverses parts of the route as long as that makes it shorter (and keeps the order within every slot)"""
+    best = route_cost(start, route, cost)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(len(route) - 1):
+            for j in range(i + 2, len(route) + 1):
+                candidate = route[:i] + route[i:j][::-1] + route[j:]
+                candidate_cost = route_cost(start, candidate, cost)
+                if candidate_cost < best - 1e-9 and _in_order(candidate):
+                    route, best, improved = candidate, candidate_cost, True
+        if not improved:
+            break
+    return route
+
+
+def plan_route(start: Tuple[int, int], stops: List[Stop], cost: Cost) -> List[Stop]:
+    """Higher priorities first, the stops of one priority by nearest neighbour improved by 2-opt"""
+    route: List[Stop] = []
+    position = start
+    for priority in sorted({stop.priority for stop in stops}, reverse=True):
+        segment = two_opt(position, nearest_neighbour(position, [stop for stop in stops
+                                                                 if stop.priority == priority], cost), cost)
+        for stop in segment:
+            position = arrive(position, stop)
+        route += segment
+    return route
+
+
+class RoutePlanner:
+    """Holds the instructions of batch_types while the robot is busy and hands them out one at a time, the next one
+        on a route over the slots of all that are waiting. Instructions of other types are not moved, the ones
+        accepted after them wait until they are handed out. An instruction may have a 'priority' (higher first)
+        and a 'deadline' (epoch seconds), one that is due within urgent_sec goes first.
+        With a refill reorderer, an AUTOREFILL instruction the gateway sent is moved to where it costs the least extra
+        travel (the planner never creates refills).
+    """
+    def __init__(self, batch_types: Iterable[str], cost: Cost, urgent_sec: float = 60.0, max_stops: int = 20,
+                 clock: Callable[[], float] = time.time, refills: Optional[RefillReorderer] = None) -> None:
+        self._batch_types = set(batch_types) | ({AUTOREFILL} if refills is not None else set())
+        self._refills: Optional[RefillReorderer] = refills
+        self._cost: Cost = cost
+        self._urgent_sec: float = urgent_sec
+        self._max_stops: int = max_stops
+        self._clock = clock
+        self._lock = Lock()
+        self._pending: List[Stop] = []
+        self._sequence: int = 0
+
+    def add(self, instruction: Instruction, plan: List[Command]) -> None:
+        with self._lock:
+            self._pending.append(Stop(instruction, plan, self._sequence))
+            self._sequence += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def next(self, position: Optional[Tuple[int, int]]) -> Optional[Tuple[Instruction, List[Command]]]:
+        with self._lock:
+            if not self._pending:
+                return None
+            stop = self._choose(position or (0, 0))
+            self._pending.remove(stop)
+            return stop.instruction, stop.plan
+
+    def _choose(self, position: Tuple[int, int]) -> Stop:
+        stops: List[Stop] = []
+        for stop in self._pending[:self._max_stops]:
+            if stop.instruction.get('type') not in self._batch_types:
+                break
+            stops.append(stop)
+        if not stops:
+            return self._pending[0]
+
+        urgent = [stop for stop in stops if stop.deadline is not None
+                  and stop.deadline - self._clock() <= self._urgent_sec]
+        if urgent:
+            stop = min(urgent, key=lambda stop: stop.deadline or 0.0)
+            # An older instruction for the same slot still goes first
+            return next(other for other in stops if other.slot == stop.slot)
+        refills = [stop for stop in stops if stop.instruction.get('type') == AUTOREFILL] \
+            if self._refills is not None else []
+        route = plan_route(position, [stop for stop in stops if stop not in refills], self._cost)
+        if refills and (not route or self._refills.place(position, refills[0], route) == 0):  # type: ignore
+            return refills[0]
+        return route[0]
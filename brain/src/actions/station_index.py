@@ -0,0 +1,25 @@
+from bisect import bisect_left
+from typing import Iterable, List
+
+
+class StationIndex:
+    """The y positions of the watering stations, sorted once so the nearest one is found by bisection"""
+    def __init__(self, locations: Iterable[int]) -> None:
+        self.locations: List[int] = sorted(set(locations))
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def __contains__(self, y: int) -> bool:
+        index = bisect_left(self.locations, y)
+        return index < len(self.locations) and self.locations[index] == y
+
+    def nearest(self, y: int) -> int:
+        """The nearest station, the lower one of two at the same distance"""
+        index = bisect_left(self.locations, y)
+        if index == 0:
+            return self.locations[0]
+        if index == len(self.locations):
+            return self.locations[-1]
+        below, above = self.locations[index - 1], self.locations[index]
+        return below if y - below <= above - y else above
@@ -0,0 +1,62 @@
+from threading import Lock
+from typing import Callable, Optional
+import time
+
+from model.position import Position
+
+
+class TelemetrySnapshot:
+    """Last position and tank level read from the boards, with the time they were read.
+        A value is served while it is younger than the TTL, afterwards (or after a command that may have changed it)
+        it has to be probed again. A TTL of 0 never serves a value.
+    """
+    def __init__(self, ttl_sec: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.__lock = Lock()
+        self._ttl_sec: float = ttl_sec
+        self._clock = clock
+        self._position: Optional[Position] = None
+        self._position_read_at: float = 0.0
+        self._tank_level: Optional[int] = None
+        self._tank_level_read_at: float = 0.0
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def update_position(self, position: Position) -> None:
+        with self.__lock:
+            self._position, self._position_read_at = position, self._clock()
+
+    def update_tank_level(self, tank_level: int) -> None:
+        with self.__lock:
+            self._tank_level, self._tank_level_read_at = tank_level, self._clock()
+
+    def invalidate(self, position: bool = True, tank_level: bool = True) -> None:
+        with self.__lock:
+            if position:
+                self._position = None
+            if tank_level:
+                self._tank_level = None
+
+    def get_position(self) -> Optional[Position]:
+        """The position if it is fresh, None if it has to be probed"""
+        with self.__lock:
+            return self._fresh(self._position, self._position_read_at)
+
+    def get_tank_level(self) -> Optional[int]:
+        """The tank level if it is fresh, None if it has to be probed"""
+        with self.__lock:
+            return self._fresh(self._tank_level, self._tank_level_read_at)
+
+    def get_age(self) -> Optional[float]:
+        """Seconds since the older of both values was read, None if one is unknown"""
+        with self.__lock:
+            if self._position is None or self._tank_level is None:
+                return None
+            return self._clock() - min(self._position_read_at, self._tank_level_read_at)
+
+    def _fresh(self, value, read_at: float):
+        if value is not None and self._clock() - read_at < self._ttl_sec:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return None
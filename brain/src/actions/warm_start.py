@@ -0,0 +1,76 @@
+from typing import List, Optional, Tuple
+import logging
+
+from actions.commands.get_position import GetPositionCommand
+from common.config import Config
+from common.enums import State
+from common.log_event import Logger
+from common.redis_client import Redis
+from common.serial_manager import SerialManagerAbstract
+from model.position import Position
+
+CHECK_SPEED = 20
+HOMING = State.HOMING_X | State.HOMING_Y | State.HOMING_Z
+
+
+class WarmStart:
+    """Decides whether the position redis kept over a restart can be used instead of homing the robot. It can if
+        the robot was idle, the boards report the same position (a board that was reset does not) and every axis
+        that is not at home moves a short distance towards home and back to where it was.
+    """
+    def __init__(self, serial: SerialManagerAbstract, redis: Redis, config: Config, logger: Logger) -> None:
+        self._serial: SerialManagerAbstract = serial
+        self._redis: Redis = redis
+        self._config: Config = config
+        self._logger: Logger = logger
+
+    def get_trusted_position(self, state: State) -> Optional[Position]:
+        if not self._config.warm_start:
+            return None
+        persisted = self._redis.get_position()
+        if state != State.IDLE or persisted is None:
+            self._logger.log_system(logging.INFO, f'Home the robot, it stopped in state {state!r} at {persisted}')
+            return None
+
+        # A restart during the check leaves the homing states behind, the next start homes the robot
+        self._redis.update_state(State.add_state_remove_IDLE, HOMING)
+        try:
+            trusted = self._check(persisted)
+        except RuntimeError as e:
+            self._logger.log_system(logging.WARNING, f'Home the robot, checking the position failed: {e}')
+            trusted = False
+        finally:
+            self._redis.update_state(State.remove_state_add_IDLE, HOMING)
+        if not trusted:
+            return None
+        self._logger.log_system(logging.INFO, f'Skip homing, the robot is still at {persisted}')
+        return Position(*persisted)
+
+    def _check(self, persisted: Tuple[int, int, int]) -> bool:
+        distance = self._config.warm_start_check_distance
+        reference = (max(0, persisted[0] - distance), max(0, persisted[1] - distance),
+                     max(0, persisted[2] - distance))
+        checks: List[Tuple[int, int, int]] = [persisted]
+        if reference != persisted:
+            checks += [reference, persisted]
+
+        for index, target in enumerate(checks):
+            if index:
+                self._move(target)
+            position = self._get_position()
+            if position != target:
+                self._logger.log_system(logging.WARNING, f'Home the robot, it is at {position} instead of {target}')
+                return False
+        return True
+
+    def _move(self, target: Tuple[int, int, int]) -> None:
+        x, y, z = target
+        self._serial.send([0, x % 256, x // 256, y % 256, y // 256, z % 256, z // 256, CHECK_SPEED])
+        left_answer, right_answer = self._serial.receive()
+        if not self._serial.is_ok(left_answer, right_answer):
+            errors = self._serial.get_firmware_error(left_answer, right_answer)
+            raise RuntimeError(f'The move to {target} failed: {[error.toJson() for error in errors]}')
+
+    def _get_position(self) -> Tuple[int, int, int]:
+        position = GetPositionCommand(self._serial).get_position()  # type: ignore
+        return position.x, position.y, position.z
@@ -5,7 +5,8 @@ import logging
 from actions.feedback.firmware_error_info import FirmwareErrorInfo
 from common.log_event import Logger
 from common.config import Config
-from common.serial_manager import CreateSerialManager, SerialManagerAbstract
+from common.serial_manager import CreateSerialManager
+from common.startup import Startup
 from actions.action_manager import ActionManager
 from common.mqtt_client import MQTT
 from common.redis_client import Redis
@@ -16,15 +17,21 @@ def main():
     stage: str = os.environ.get('STAGE', 'development')
 
     config: Config = Config(root, f'bot_{stage}.config', stage)
-    firmware_error_info: FirmwareErrorInfo = FirmwareErrorInfo(f'{root}/error_codes.txt')
     logger: Logger = Logger(config)
     logger.log_system(logging.INFO, f'Set stage to {stage}')
-    serial: SerialManagerAbstract = CreateSerialManager(config, logger, firmware_error_info)
-    mqtt: MQTT = MQTT(config, logger)
-    redis: Redis = Redis(0, config, logger)
-    action_manager: ActionManager = ActionManager(serial, mqtt, redis, config, logger)
 
-    action_manager.start_handling_instructions()
+    # The boards, redis and the connection to the cloud are set up at the same time
+    startup: Startup = Startup(logger)
+    startup.add('error_codes', lambda: FirmwareErrorInfo(f'{root}/error_codes.txt'))
+    startup.add('serial', lambda firmware_error_info: CreateSerialManager(config, logger, firmware_error_info),
+                requires=['error_codes'])
+    startup.add('redis', lambda: Redis(0, config, logger))
+    startup.add('mqtt', lambda: MQTT(config, logger))
+    startup.add('actions', lambda serial, redis, mqtt: ActionManager(serial, mqtt, redis, config, logger),
+                requires=['serial', 'redis', 'mqtt'])
+    startup.add('instructions', lambda action_manager: action_manager.start_handling_instructions(),
+                requires=['actions'])
+    startup.run()
 
     while True:
         time.sleep(1)
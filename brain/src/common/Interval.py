@@ -1,5 +1,8 @@
-from threading import Timer, Lock
-from typing import Callable, Any
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Any, Dict, Optional
+
+from common.scheduler import ScheduledJob, Scheduler, get_scheduler
 
 
 class Interval:
@@ -18,36 +21,51 @@ class Interval:
 
         every 5 seconds the object my_classes wil be executed with parameters returned by generator().
         The parameters are evaluated every time they are used.
+        The action may block (like reading the idle telemetry from the boards), so it runs on a worker of its own
+        and the thread of the scheduler only triggers it. A reset only moves the job within its queue.
     """
-    def __init__(self, period: int, action: Callable[[Any], Any], parameters_generator: Callable[[], tuple[Any, ...]], autostart=True):
+    def __init__(self, period: int, action: Callable[[Any], Any], parameters_generator: Callable[[], tuple[Any, ...]],
+                 autostart=True, scheduler: Optional[Scheduler] = None):
         self.__lock = Lock()
-        self.__timer = None
+        self.__scheduler = scheduler or get_scheduler()
+        self.__job: Optional[ScheduledJob] = None
         self.__action = action
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='interval')
         self.__period = period
         self._stopped = True
         self.__parameters_generator = parameters_generator
         if autostart:
             self.start()
 
-    def start(self, start_called_by_run=False):
+    def start(self):
         with self.__lock:
-            if start_called_by_run or self._stopped:
-                self._stopped = False
-                self.__timer = Timer(self.__period, self._run)
-                self.__timer.daemon = True
-                self.__timer.start()
+            if self._stopped:
+                self.__schedule()
 
     def _run(self):
-        self.start(start_called_by_run=True)
         args = self.__parameters_generator()
         self.__action(*args)
 
     def stop(self):
         with self.__lock:
             self._stopped = True
-            self.__timer.cancel()
+            if self.__job is not None:
+                self.__job.cancel()
 
     def reset(self):
         """Reset the timer at the specified period"""
-        self.stop()
-        self.start()
\ No newline at end of file
+        with self.__lock:
+            self.__schedule()
+
+    def __schedule(self):
+        self._stopped = False
+        if self.__job is None:
+            self.__job = self.__scheduler.schedule(self.__period, self._run, period=self.__period,
+                                                   name=f'interval-{getattr(self.__action, "__qualname__", "")}',
+                                                   executor=self.__executor)
+        else:
+            self.__job.reset()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Delay of the runs behind their due time (drift) and the time they took"""
+        return self.__job.get_metrics() if self.__job is not None else {}
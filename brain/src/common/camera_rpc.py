@@ -0,0 +1,118 @@
+from itertools import count
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Optional
+import json
+import logging
+
+from common.config import Config
+from common.log_event import Logger
+from common.mqtt_client import MQTT
+
+CAPTURED_STATUS = 'CAPTURED'
+
+
+class PendingCameraRequest:
+    def __init__(self, instruction_id: str, request_id: str, command: str = '') -> None:
+        self.instruction_id: str = instruction_id
+        self.request_id: str = request_id
+        self.command: str = command
+        # set by the first reply, which is either the 'CAPTURED' acknowledge or already the final reply
+        self.acknowledged: Event = Event()
+        self.ack: Optional[Dict[str, Any]] = None
+        # set by the final reply, or with reply None when the request was released before
+        self.done: Event = Event()
+        self.reply: Optional[Dict[str, Any]] = None
+        self.on_done: Optional[Callable[[Optional[Dict[str, Any]]], None]] = None
+
+
+class CameraRPC:
+    """Request/reply over the MQTT topics of one camera.
+        Every request carries the instructionId and a unique requestId. A reply wakes the waiting caller as soon
+        as the MQTT callback fires. Replies echoing the requestId are matched exactly; a reply without it is
+        matched to the pending request of the same instructionId (and command, if the reply echoes its 'Str'),
+        it is dropped if more than one request matches.
+        A camera may acknowledge a request with an intermediate 'CAPTURED' reply before its final reply.
+    """
+    def __init__(self, mqtt: MQTT, logger: Logger, config: Config, view: str, name: str) -> None:
+        self._mqtt: MQTT = mqtt
+        self._logger: Logger = logger
+        self.name: str = name
+        self._cmds_topic: str = f"rc/{config.stage}/robots/{config.robot_id}/cameras/{view}/cmds"
+        self.__lock = Lock()
+        self.__pending: Dict[str, PendingCameraRequest] = {}
+        self.__request_ids = count(1)
+
+        self._mqtt.subscribe(f"rc/{config.stage}/robots/{config.robot_id}/cameras/{view}/feedback",
+                             self._on_feedback)
+
+    def send(self, instruction_id: str, command: str, metadata: Optional[Dict[str, Any]] = None,
+             **extra: Any) -> PendingCameraRequest:
+        """Send a command without waiting; the request stays pending until its final reply or release()"""
+        with self.__lock:
+            request = PendingCameraRequest(instruction_id, f'{self.name}-{next(self.__request_ids)}', command)
+            self.__pending[request.request_id] = request
+
+        cam_command: Dict[str, Any] = {'instructionId': instruction_id,
+                                       'requestId': request.request_id,
+                                       'Str': command,
+                                       **extra}
+        if metadata is not None:
+            cam_command['Metadata'] = metadata
+        self._mqtt.send(self._cmds_topic, json.dumps(cam_command))
+        return request
+
+    def call(self, instruction_id: str, command: str, metadata: Optional[Dict[str, Any]] = None,
+             timeout: float = 60) -> Optional[Dict[str, Any]]:
+        """Send a command to the camera and wait for its final reply; returns None on timeout"""
+        request = self.send(instruction_id, command, metadata)
+        try:
+            request.done.wait(timeout)
+            return request.reply
+        finally:
+            self.release(request)
+
+    def wait_for_ack(self, request: PendingCameraRequest, timeout: float = 60) -> Optional[Dict[str, Any]]:
+        """Wait for the first reply of a request; the request is released if none arrives in time"""
+        if not request.acknowledged.wait(timeout):
+            self.release(request)
+        return request.ack
+
+    def release(self, request: PendingCameraRequest) -> None:
+        """Stop waiting for a request; a request without final reply is completed with reply None"""
+        with self.__lock:
+            if self.__pending.pop(request.request_id, None) is None or request.done.is_set():
+                return
+            request.done.set()
+        if request.on_done is not None:
+            request.on_done(None)
+
+    def _find_request(self, reply: Dict[str, Any]) -> Optional[PendingCameraRequest]:
+        if 'requestId' in reply:
+            return self.__pending.get(reply['requestId'])
+        matches = [request for request in self.__pending.values()
+                   if request.instruction_id == reply.get('instructionId')
+                   and ('Str' not in reply or request.command == reply['Str'])]
+        if len(matches) > 1:
+            self._logger.log_system(logging.WARNING, f'{self.name} reply without requestId matches the requests '
+                                                     f'{[request.request_id for request in matches]}')
+            return None
+        return matches[0] if matches else None
+
+    def _on_feedback(self, topic: str, payload: str, **kwargs: str) -> None:
+        reply: Dict[str, Any] = json.loads(payload)
+        self._logger.log_system(logging.INFO, f'Received from {self.name}: ' + json.dumps(reply, indent=4))
+        with self.__lock:
+            request = self._find_request(reply)
+            if request is None:
+                self._logger.log_system(logging.WARNING, f'Dropped {self.name} reply without pending request')
+                return
+            if request.ack is None:
+                request.ack = reply
+                request.acknowledged.set()
+            if reply.get('instructionStatus', '') == CAPTURED_STATUS:
+                return
+            self.__pending.pop(request.request_id)
+            request.reply = reply
+            request.done.set()
+        if request.on_done is not None:
+            request.on_done(reply)
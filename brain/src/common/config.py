@@ -1,7 +1,7 @@
 import logging
 import os
 import time
-from typing import Dict
+from typing import Dict, List
 
 os.environ['TZ'] = 'Europe/Berlin'
 time.tzset()
@@ -28,10 +28,23 @@ class Config:
         self.log_level_file: int = int(cfg.get("log_level_file", str(logging.DEBUG)).strip())
 
         self.log_rollover_when: str = cfg.get("log_rollover_when", "midnight").strip()
+        self.log_async: bool = cfg.get("log_async", "False").strip() == "True"
+        self.log_queue_size: int = int(cfg.get("log_queue_size", "1000").strip())
+        self.log_queue_backpressure: str = cfg.get("log_queue_backpressure", "drop_oldest").strip()
 
         self.serial_name_pattern: str = cfg["serial_name_pattern"].strip()
         self.serial_timeout_right: int = int(cfg["serial_timeout_right"].strip())
         self.serial_timeout_left: int = int(cfg["serial_timeout_left"].strip())
+        self.serial_timeout_probe_sec: float = float(cfg.get("serial_timeout_probe_sec", "2").strip())
+        self.serial_travel_timeouts: bool = cfg.get("serial_travel_timeouts", "False").strip() == "True"
+        self.serial_timeout_margin: float = float(cfg.get("serial_timeout_margin", "3").strip())
+        self.serial_speed_x: float = float(cfg.get("serial_speed_x", "100").strip())
+        self.serial_speed_y: float = float(cfg.get("serial_speed_y", "100").strip())
+        self.serial_speed_z: float = float(cfg.get("serial_speed_z", "100").strip())
+        self.serial_supervisor_interval_sec: float = float(cfg.get("serial_supervisor_interval_sec", "2").strip())
+        self.serial_reconnect_wait_sec: float = float(cfg.get("serial_reconnect_wait_sec", "30").strip())
+        self.serial_parallel_receive: bool = cfg.get("serial_parallel_receive", "True").strip() == "True"
+        self.serial_pipelining: bool = cfg.get("serial_pipelining", "False").strip() == "True"
 
         self.ignore_y_homing_error: bool = cfg.get("ignore_y_homing_error", "False").strip() == "True"
 
@@ -46,7 +59,32 @@ class Config:
         self.debug_only_serialless: bool = cfg.get("debug_only_serialless", "False").strip() == "True"
         self.disable_pump_weight_safety: bool = cfg.get("disable_pump_weight_safety", "False").strip() == "True"
 
+        self.mqtt_publish_workers: int = int(cfg.get("mqtt_publish_workers", "2").strip())
+        self.mqtt_publish_queue_size: int = int(cfg.get("mqtt_publish_queue_size", "100").strip())
+        self.mqtt_publish_backpressure: str = cfg.get("mqtt_publish_backpressure", "drop_oldest").strip()
+        self.mqtt_outbox: bool = cfg.get("mqtt_outbox", "False").strip() == "True"
+        self.mqtt_outbox_batch_size: int = int(cfg.get("mqtt_outbox_batch_size", "20").strip())
+
+        self.camera_async_capture: bool = cfg.get("camera_async_capture", "False").strip() == "True"
+        self.camera_upload_timeout_sec: int = int(cfg.get("camera_upload_timeout_sec", "300").strip())
+
+        self.redis_durability: str = cfg.get("redis_durability", "bgsave").strip()
+        self.journal_max_len: int = int(cfg.get("journal_max_len", "1000").strip())
+        self.warm_start: bool = cfg.get("warm_start", "False").strip() == "True"
+        self.warm_start_check_distance: int = int(cfg.get("warm_start_check_distance", "50").strip())
+        self.batch_planning: bool = cfg.get("batch_planning", "False").strip() == "True"
+        self.batch_types: List[str] = cfg.get("batch_types", "WATER,PHOTO,VALIDATE").strip().split(",")
+        self.batch_urgent_sec: float = float(cfg.get("batch_urgent_sec", "60").strip())
+        self.batch_max_stops: int = int(cfg.get("batch_max_stops", "20").strip())
+        self.watering_stations: List[int] = [int(y) for y in cfg.get("watering_stations", "").strip().split(",") if y]
+        self.refill_level: int = int(cfg.get("refill_level", "80").strip())
+        self.redis_save_debounce_sec: float = float(cfg.get("redis_save_debounce_sec", "1").strip())
+        self.redis_socket: str = cfg.get("redis_socket", "").strip()
+        self.redis_pool_size: int = int(cfg.get("redis_pool_size", "4").strip())
+        self.redis_pool_timeout_sec: float = float(cfg.get("redis_pool_timeout_sec", "20").strip())
+
         self.weight_offset: int = int(cfg.get("weight_offset", "0").strip())
         self.idle_time_sec: int = int(cfg.get("idle_time_sec", "600").strip())
+        self.telemetry_ttl_sec: int = int(cfg.get("telemetry_ttl_sec", "0").strip())
 
         print('Config Summary:\n' + str(self.__dict__) + '\n-------------------')
@@ -54,6 +54,19 @@ class InstructionType(Enum):
     ONBOARD = "ONBOARD"
 
 
+class BackpressurePolicy(Enum):
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    BLOCK = "block"
+
+
+class DurabilityMode(Enum):
+    SYNC = "sync"  # blocking SAVE after every position change
+    AOF = "aof"  # append only file, fsynced every second by redis
+    BGSAVE = "bgsave"  # BGSAVE once the debounce window after a change passed
+    CHECKPOINT = "checkpoint"  # BGSAVE at the end of the queued instructions
+
+
 class CommandCode(Enum):
     ERROR = 5
 
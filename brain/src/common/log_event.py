@@ -1,41 +1,166 @@
-from typing import Any, Dict
+from logging.handlers import QueueHandler, QueueListener
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+import atexit
 import logging
+import queue
 from datetime import datetime
 import json
 import os
 
 from common.config import Config
+from common.enums import BackpressurePolicy
 
 
 class LogEvent:
+    """Fields are updated in place. Items added through the cached item go to append-only sections,
+        so a persisted event only needs to encode what was appended since (see LogEventSerializer).
+    """
+    __slots__ = ('_fields', '_sections', '_cached_item', 'generation', 'fields_version')
+
     def __init__(self, message: str, **kwargs: Any) -> None:
-        self._dict: Dict[str, Any] = {'message': message, **kwargs}
+        self._fields: Dict[str, Any] = {'message': message, **kwargs}
+        self._sections: Dict[str, List[Dict[str, Any]]] = {}
         self._cached_item: Dict[str, Any] = {}
+        self.generation: int = 0  # changes when sections are replaced or removed
+        self.fields_version: int = 0  # changes with every update of the fields
 
     def set_state(self, state: Dict[str, Any]) -> None:
-        self._dict = state
+        self._fields = dict(state)
+        self._sections = {}
+        self.generation += 1
+        self.fields_version += 1
 
     def get_state(self) -> Dict[str, Any]:
-        return self._dict
+        return {**self._fields, **self._sections}
+
+    def get_fields(self) -> Dict[str, Any]:
+        return self._fields
+
+    def get_sections(self) -> Dict[str, List[Dict[str, Any]]]:
+        return self._sections
+
+    def snapshot(self) -> 'LogEvent':
+        """Copy that stays unchanged while this event goes on, e.g. to serialize it on another thread"""
+        event = LogEvent.__new__(LogEvent)
+        event._fields = dict(self._fields)
+        event._sections = {key: list(section) for key, section in self._sections.items()}
+        event._cached_item = {}
+        event.generation = 0
+        event.fields_version = 0
+        return event
 
     def add(self, **kwargs: Any) -> None:
-        self._dict = {**self._dict, **kwargs}
+        for key in kwargs:
+            if key in self._sections:
+                del self._sections[key]
+                self.generation += 1
+        self._fields.update(kwargs)
+        self.fields_version += 1
 
     def add_to_cached_item(self, **kwargs: Any) -> None:
-        self._cached_item = {**self._cached_item, **kwargs}
+        self._cached_item.update(kwargs)
 
     def add_cached_item_to_key(self, key: str) -> None:
-        if key in self._dict:
-            self._dict[key].append(self._cached_item)
-        else:
-            self._dict[key] = [self._cached_item]
+        section = self._sections.get(key)
+        if section is None:
+            if key in self._fields:
+                # e.g. restored from a state dict, from now on the list only grows
+                self.fields_version += 1
+            section = self._sections[key] = list(self._fields.pop(key, []))
+        section.append(self._cached_item)
         self._cached_item = {}
 
     def send(self, level: int) -> None:
         logging.log(level, self)
 
     def __str__(self) -> str:
-        return json.dumps(self._dict)
+        return json.dumps(self.get_state())
+
+
+class LogEventSerializer:
+    """Remembers which part of an event was already encoded. Every call encodes the fields only if one of them
+        changed and of every section only the items appended since the previous call.
+    """
+    def __init__(self) -> None:
+        self._event: Optional[LogEvent] = None
+        self._generation: int = -1
+        self._fields_version: int = -1
+        self._lengths: Dict[str, int] = {}
+
+    def encode(self, event: LogEvent) -> Tuple[bool, Optional[str], Dict[str, List[str]]]:
+        """Returns whether everything encoded before is outdated, the encoded fields (None if unchanged)
+            and the encoded new items per section
+        """
+        reset = event is not self._event or event.generation != self._generation
+        if reset:
+            self._event, self._generation, self._fields_version, self._lengths = event, event.generation, -1, {}
+
+        fields: Optional[str] = None
+        if event.fields_version != self._fields_version:
+            fields = json.dumps(event.get_fields())
+            self._fields_version = event.fields_version
+
+        appended: Dict[str, List[str]] = {}
+        for key, section in event.get_sections().items():
+            known = self._lengths.get(key, 0)
+            if len(section) > known:
+                appended[key] = [json.dumps(item) for item in section[known:]]
+                self._lengths[key] = len(section)
+        return reset, fields, appended
+
+
+class LogQueueHandler(QueueHandler):
+    """Hands records to a bounded queue; formatting and I/O happen on the writer thread of the QueueListener.
+        When the queue is full the backpressure policy decides whether the oldest record is dropped,
+        the new record is dropped or the caller blocks until there is room again.
+    """
+    def __init__(self, capacity: int, backpressure: str = BackpressurePolicy.DROP_OLDEST.value) -> None:
+        super().__init__(queue.Queue(maxsize=capacity))
+        self._backpressure: BackpressurePolicy = BackpressurePolicy(backpressure)
+        self._put_lock = Lock()
+        self.dropped: int = 0
+        self.dropped_events: int = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The message is formatted by the handlers of the listener, not on the calling thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._backpressure == BackpressurePolicy.BLOCK:
+            self.queue.put(record)
+            return
+
+        with self._put_lock:
+            while True:
+                try:
+                    self.queue.put_nowait(record)
+                    return
+                except queue.Full:
+                    if self._backpressure != BackpressurePolicy.DROP_OLDEST:
+                        dropped = record
+                        break
+                try:
+                    dropped = self.queue.get_nowait()
+                except queue.Empty:
+                    # The writer took the records after the put failed, there is room again
+                    continue
+                self.queue.put_nowait(record)
+                break
+            self.dropped += 1
+            if dropped.name == 'robot.event':
+                self.dropped_events += 1
+
+    def get_metrics(self) -> Dict[str, int]:
+        return {'queue_depth': self.queue.qsize(),
+                'dropped': self.dropped,
+                'dropped_events': self.dropped_events}
+
+
+class LogQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The queue is bounded, wait for room instead of failing on a full queue
+        self.queue.put(self._sentinel)
 
 
 class Logger:
@@ -57,8 +182,21 @@ class Logger:
         sh.setLevel(config.log_level_file)
         sh.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', '%H:%M:%S'))
 
-        self._event_logger.addHandler(fh)
-        self._system_logger.addHandler(sh)
+        self._queue_handler: Optional[LogQueueHandler] = None
+        self._listener: Optional[LogQueueListener] = None
+        if config.log_async:
+            # Control threads only enqueue records, a single writer thread formats and writes them
+            self._queue_handler = LogQueueHandler(config.log_queue_size, config.log_queue_backpressure)
+            fh.addFilter(logging.Filter('robot.event'))
+            sh.addFilter(logging.Filter('robot.system'))
+            self._listener = LogQueueListener(self._queue_handler.queue, fh, sh, respect_handler_level=True)
+            self._event_logger.addHandler(self._queue_handler)
+            self._system_logger.addHandler(self._queue_handler)
+            self._listener.start()
+            atexit.register(self.close)
+        else:
+            self._event_logger.addHandler(fh)
+            self._system_logger.addHandler(sh)
 
     # TODO: Create a util class and use it all over the code, see PM-1720
     def _get_utc_now(self):
@@ -81,13 +219,26 @@ class Logger:
     def send_event(self, level: int) -> None:
         self.add_to_event(level=logging.getLevelName(level),
                           endTime=self._get_utc_now().isoformat(sep='T', timespec='milliseconds') + 'Z')
-        self._event_logger.log(level, self._log_event)
+        # The writer thread serializes the event later, so it gets a copy the commands can't change anymore
+        self._event_logger.log(level, self._log_event if self._queue_handler is None else self._log_event.snapshot())
 
     def log_system(self, level: int, message: str) -> None:
         self._system_logger.log(level, message)
 
+    def get_log_event(self) -> LogEvent:
+        return self._log_event
+
     def get_log_event_state(self) -> Dict[str, Any]:
         return self._log_event.get_state()
 
     def set_log_event_state(self, state: Dict[str, Any]) -> None:
         self._log_event.set_state(state)
+
+    def get_metrics(self) -> Dict[str, int]:
+        return self._queue_handler.get_metrics() if self._queue_handler is not None else {}
+
+    def close(self) -> None:
+        """Write all queued records and stop the writer thread"""
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            listener.stop()
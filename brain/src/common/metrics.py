@@ -0,0 +1,33 @@
+from threading import Lock
+from typing import Dict
+
+
+class LatencyCounter:
+    """Thread safe accumulator for durations in seconds (count, total, max and last observation)."""
+    def __init__(self) -> None:
+        self.__lock = Lock()
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.last: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        with self.__lock:
+            self.count += 1
+            self.total += seconds
+            self.last = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        with self.__lock:
+            return self.total / self.count if self.count else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        with self.__lock:
+            return {'count': self.count,
+                    'total': self.total,
+                    'mean': self.total / self.count if self.count else 0.0,
+                    'max': self.max,
+                    'last': self.last}
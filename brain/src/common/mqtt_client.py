@@ -1,14 +1,94 @@
-from typing import Any, Callable, Dict, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from concurrent.futures import Future
 import os
+import queue
 import threading
 import re
+import time
 import logging
 from awscrt import io, mqtt
 from awsiot import mqtt_connection_builder
 
 from common.log_event import Logger
 from common.config import Config
+from common.enums import BackpressurePolicy
+from common.metrics import LatencyCounter
+from common.outbox import Outbox, OutboxRelay
+
+
+class MqttPublisher:
+    """Fixed number of worker threads draining a bounded outbound queue.
+        When the queue is full the backpressure policy decides whether the oldest message is dropped (the default,
+        telemetry is soon outdated), the new message is dropped or the caller blocks until there is room again.
+        A message submitted with block always waits for room.
+    """
+    PUBLISH_TIMEOUT_SEC: int = 30
+
+    def __init__(self, publish: Callable[[str, str], Future], logger: Logger, workers: int = 2,
+                 queue_size: int = 100, backpressure: str = BackpressurePolicy.DROP_OLDEST.value) -> None:
+        self._publish = publish
+        self._logger: Logger = logger
+        self._backpressure: BackpressurePolicy = BackpressurePolicy(backpressure)
+        self._queue: queue.Queue[Tuple[str, str, float]] = queue.Queue(maxsize=queue_size)
+        self._put_lock = threading.Lock()
+
+        self.publish_latency: LatencyCounter = LatencyCounter()
+        self.dropped: int = 0
+        self.failed: int = 0
+
+        self._workers: List[threading.Thread] = [threading.Thread(target=self._work, daemon=True,
+                                                                  name=f'mqtt-publisher-{i}')
+                                                 for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, topic_name: str, data: str, block: bool = False) -> None:
+        item = (topic_name, data, time.monotonic())
+        if block or self._backpressure == BackpressurePolicy.BLOCK:
+            self._queue.put(item)
+            return
+
+        with self._put_lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    if self._backpressure == BackpressurePolicy.DROP_NEWEST:
+                        dropped_topic = topic_name
+                        break
+                try:
+                    dropped_topic = self._queue.get_nowait()[0]
+                except queue.Empty:
+                    # A worker took the messages after the put failed, there is room again
+                    continue
+                self._queue.task_done()
+                self._queue.put_nowait(item)
+                break
+            self.dropped += 1
+        self._logger.log_system(logging.ERROR, f'MQTT outbound queue full, dropped message for {dropped_topic}')
+
+    def _work(self) -> None:
+        while True:
+            topic_name, data, enqueued_at = self._queue.get()
+            try:
+                self._publish(topic_name, data).result(timeout=MqttPublisher.PUBLISH_TIMEOUT_SEC)
+                self.publish_latency.observe(time.monotonic() - enqueued_at)
+            except Exception as e:
+                self.failed += 1
+                self._logger.log_system(logging.ERROR, f'Publishing to {topic_name} failed: {e}')
+            finally:
+                self._queue.task_done()
+
+    def join(self) -> None:
+        """Wait until every queued message was handed to the broker (or failed)"""
+        self._queue.join()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {'queue_depth': self._queue.qsize(),
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'publish_latency': self.publish_latency.snapshot()}
 
 
 class MQTT:
@@ -55,6 +135,16 @@ class MQTT:
             if i[0] == '':
                 self._logger.log_system(logging.ERROR, f"_____ No IoT {i[1]} found _____")
 
+        self._publisher: MqttPublisher = MqttPublisher(self._publish, self._logger,
+                                                       workers=config.mqtt_publish_workers,
+                                                       queue_size=config.mqtt_publish_queue_size,
+                                                       backpressure=config.mqtt_publish_backpressure)
+        # The connection callbacks may run as soon as connect() is called, the relay starts offline
+        self._outbox_relay: Optional[OutboxRelay] = None
+        if config.mqtt_outbox:
+            self._outbox_relay = OutboxRelay(Outbox(f'{config.root}/mqtt_outbox.db'), self._publish, self._logger,
+                                             batch_size=config.mqtt_outbox_batch_size)
+
         # Spin up resources
         event_loop_group = io.EventLoopGroup(1)
         host_resolver = io.DefaultHostResolver(event_loop_group)
@@ -65,12 +155,27 @@ class MQTT:
             pri_key_filepath=self._path_to_key,
             client_bootstrap=client_bootstrap,
             ca_filepath=self._path_to_root,
-            client_id=self._client_id)
+            client_id=self._client_id,
+            on_connection_interrupted=self._on_connection_interrupted,
+            on_connection_resumed=self._on_connection_resumed)
         # Make the connect() call
         connect_future: Future[Dict[str, Any]] = self._mqtt_connection.connect()  # type: ignore
         # Future.result() waits until a result is available
         connect_future.result()
         self._logger.log_system(logging.INFO, f"Connected to {self._endpoint} with client ID '{self._client_id}'...")
+        if self._outbox_relay is not None:
+            self._outbox_relay.set_online(True)
+
+    def _on_connection_interrupted(self, connection: mqtt.Connection, error: Exception, **kwargs: Any) -> None:
+        self._logger.log_system(logging.ERROR, f'MQTT connection interrupted: {error}')
+        if self._outbox_relay is not None:
+            self._outbox_relay.set_online(False)
+
+    def _on_connection_resumed(self, connection: mqtt.Connection, return_code: mqtt.ConnectReturnCode,
+                               session_present: bool, **kwargs: Any) -> None:
+        self._logger.log_system(logging.INFO, f'MQTT connection resumed: {return_code}')
+        if self._outbox_relay is not None and return_code == mqtt.ConnectReturnCode.ACCEPTED:
+            self._outbox_relay.set_online(True)
 
     def subscribe(self, topic_name: str, callback: Callable[[str, str], None]) -> None:
         # Subscribe and listen to the messages
@@ -85,14 +190,27 @@ class MQTT:
         self._logger.log_system(logging.INFO,
                                 f"Subscribed to topic {topic_name} with {str(mqtt_topic_subscribe_result['qos'])}")
 
-    def send(self, topic_name: str, data: str) -> None:
-        def _send(topic_name: str, data: str):
-            mqtt_topic_publish_return: Tuple[Future[Dict[str, Any]], int] = self._mqtt_connection.publish(
-                # type: ignore
-                topic=topic_name,
-                payload=data,
-                qos=mqtt.QoS.AT_LEAST_ONCE
-            )
-            mqtt_topic_publish_return[0].result()
-
-        threading.Thread(target=_send, args=[topic_name, data], daemon=True).start()
+    def _publish(self, topic_name: str, data: str) -> Future:
+        mqtt_topic_publish_return: Tuple[Future[Dict[str, Any]], int] = self._mqtt_connection.publish(
+            # type: ignore
+            topic=topic_name,
+            payload=data,
+            qos=mqtt.QoS.AT_LEAST_ONCE
+        )
+        return mqtt_topic_publish_return[0]
+
+    def send(self, topic_name: str, data: str, durable: bool = False) -> None:
+        """Publish without waiting. Durable messages go through the persistent outbox (if enabled) and
+            are replayed in order after a connection loss instead of being dropped. Without the outbox they wait
+            for room in the queue whatever the backpressure policy.
+        """
+        if durable and self._outbox_relay is not None:
+            self._outbox_relay.submit(topic_name, data)
+        else:
+            self._publisher.submit(topic_name, data, block=durable)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = self._publisher.get_metrics()
+        if self._outbox_relay is not None:
+            metrics['outbox'] = self._outbox_relay.get_metrics()
+        return metrics
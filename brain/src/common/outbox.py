@@ -0,0 +1,124 @@
+from concurrent.futures import Future
+from threading import Condition, Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Tuple
+import logging
+import sqlite3
+import time
+
+from common.log_event import Logger
+
+
+class Outbox:
+    """Messages waiting for the broker, stored in SQLite so they survive connection losses and restarts.
+        Messages are only appended and removed from the front, so they are always read in the order of sending.
+    """
+    def __init__(self, path: str) -> None:
+        self.__lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL with synchronous=NORMAL keeps an append to a single sequential write without fsync per message
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS outbox '
+                         '(id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, payload TEXT NOT NULL)')
+
+    def append(self, topic_name: str, data: str) -> int:
+        with self.__lock:
+            return self._db.execute('INSERT INTO outbox (topic, payload) VALUES (?, ?)', (topic_name, data)).lastrowid
+
+    def peek(self, limit: int) -> List[Tuple[int, str, str]]:
+        """The oldest messages as (id, topic, payload)"""
+        with self.__lock:
+            return self._db.execute('SELECT id, topic, payload FROM outbox ORDER BY id LIMIT ?', (limit,)).fetchall()
+
+    def remove_until(self, message_id: int) -> None:
+        """Remove all messages up to and including message_id"""
+        with self.__lock:
+            self._db.execute('DELETE FROM outbox WHERE id <= ?', (message_id,))
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self._db.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def close(self) -> None:
+        with self.__lock:
+            self._db.close()
+
+
+class OutboxRelay:
+    """Single thread that publishes the outbox in order, batch by batch, while the connection is up.
+        Senders only append to the outbox and never wait for the broker. A batch that fails (or a lost
+        connection) keeps the unconfirmed messages in the outbox; they are replayed once the connection resumes.
+    """
+    PUBLISH_TIMEOUT_SEC: int = 30
+
+    def __init__(self, outbox: Outbox, publish: Callable[[str, str], Future], logger: Logger,
+                 batch_size: int = 20, retry_sec: float = 5) -> None:
+        self._outbox: Outbox = outbox
+        self._publish = publish
+        self._logger: Logger = logger
+        self._batch_size: int = batch_size
+        self._retry_sec: float = retry_sec
+        self._online: Event = Event()
+        self._wakeup: Condition = Condition()
+        self._pending: bool = len(outbox) > 0  # messages left from before a restart are replayed first
+
+        self.published: int = 0
+        self.failed_batches: int = 0
+
+        self._thread = Thread(target=self._run, daemon=True, name='mqtt-outbox')
+        self._thread.start()
+
+    def submit(self, topic_name: str, data: str) -> None:
+        self._outbox.append(topic_name, data)
+        with self._wakeup:
+            self._pending = True
+            self._wakeup.notify()
+
+    def set_online(self, online: bool) -> None:
+        if online:
+            self._logger.log_system(logging.INFO, f'MQTT connection up, replaying {len(self._outbox)} messages')
+            self._online.set()
+        else:
+            self._online.clear()
+
+    def _run(self) -> None:
+        while True:
+            with self._wakeup:
+                self._wakeup.wait_for(lambda: self._pending)
+            self._online.wait()
+
+            batch = self._outbox.peek(self._batch_size)
+            if not batch:
+                with self._wakeup:
+                    self._pending = len(self._outbox) > 0
+                continue
+
+            if not self._publish_batch(batch):
+                self.failed_batches += 1
+                time.sleep(self._retry_sec)
+
+    def _publish_batch(self, batch: List[Tuple[int, str, str]]) -> bool:
+        """Publish a batch and drop the confirmed messages from the outbox; False if one was not confirmed"""
+        confirmed = None
+        topic_name = batch[0][1]
+        try:
+            # All publishes of a batch are in flight together; the broker connection keeps their order
+            futures = [(message_id, topic_name, self._publish(topic_name, data))
+                       for message_id, topic_name, data in batch]
+            for message_id, topic_name, future in futures:
+                future.result(timeout=OutboxRelay.PUBLISH_TIMEOUT_SEC)
+                confirmed = message_id
+                self.published += 1
+            return True
+        except Exception as e:
+            self._logger.log_system(logging.ERROR, f'Publishing outbox message to {topic_name} failed: {e}')
+            return False
+        finally:
+            if confirmed is not None:
+                self._outbox.remove_until(confirmed)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {'outbox_depth': len(self._outbox),
+                'online': self._online.is_set(),
+                'published': self.published,
+                'failed_batches': self.failed_batches}
@@ -1,24 +1,105 @@
 from __future__ import annotations
-from typing import Any, Callable, Optional, Tuple
+from collections import Counter
+from threading import RLock, Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import json
 import logging
 import redis
 
 from common.config import Config
-from common.enums import State
-from common.log_event import Logger
+from common.enums import DurabilityMode, State
+from common.log_event import Logger, LogEventSerializer
+from common.scheduler import ScheduledJob, get_scheduler
 from common.types import Instruction, Command
 
+JOURNAL = 'journal'
+
+
+class OpCounter:
+    """Commands sent to redis by name and the round trips they took, a pipeline sends all its commands at once"""
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.commands: Counter[str] = Counter()
+        self.round_trips: int = 0
+
+    def count_command(self, name: str) -> None:
+        with self._lock:
+            self.commands[name.upper()] += 1
+
+    def count_round_trip(self) -> None:
+        with self._lock:
+            self.round_trips += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'commands': dict(self.commands), 'total': sum(self.commands.values()),
+                    'round_trips': self.round_trips}
+
+
+class _CountingConnection:
+    def __init__(self, op_counter: OpCounter, **kwargs: Any) -> None:
+        super().__init__(**kwargs)  # type: ignore
+        self._op_counter: OpCounter = op_counter
+
+    def pack_command(self, *args: Any) -> Any:
+        self._op_counter.count_command(str(args[0]))
+        return super().pack_command(*args)  # type: ignore
+
+    def send_packed_command(self, command: Any, check_health: bool = True) -> None:
+        self._op_counter.count_round_trip()
+        super().send_packed_command(command, check_health)  # type: ignore
+
+
+class CountingConnection(_CountingConnection, redis.Connection):
+    pass
+
+
+class CountingUnixDomainSocketConnection(_CountingConnection, redis.UnixDomainSocketConnection):
+    pass
+
+
+def create_connection_pool(db: int, config: Config, op_counter: OpCounter) -> redis.ConnectionPool:
+    """Connects over the unix socket of the redis server if one is configured, over TCP to localhost otherwise.
+        A thread that finds all connections in use waits up to redis_pool_timeout_sec for one to be released.
+    """
+    if config.redis_socket:
+        return redis.BlockingConnectionPool(connection_class=CountingUnixDomainSocketConnection,
+                                            path=config.redis_socket, db=db, decode_responses=True,
+                                            max_connections=config.redis_pool_size,
+                                            timeout=config.redis_pool_timeout_sec, op_counter=op_counter)
+    return redis.BlockingConnectionPool(connection_class=CountingConnection, db=db, decode_responses=True,
+                                        max_connections=config.redis_pool_size,
+                                        timeout=config.redis_pool_timeout_sec, op_counter=op_counter)
+
 
 class Redis:
     def __init__(self, db: int, config: Config, logger: Logger) -> None:
         self._logger: Logger = logger
         self._config: Config = config
         self._logger.log_system(logging.INFO, 'Init redis ...')
-        self._redis: redis.Redis[Any] = redis.StrictRedis(db=db, decode_responses=True)
+        self._ops: OpCounter = OpCounter()
+        self._redis: redis.Redis[Any] = redis.StrictRedis(connection_pool=create_connection_pool(db, config,
+                                                                                                 self._ops))
+
+        # The state is written by this process only, so a local copy is authoritative once loaded
+        self.__state_lock = RLock()
+        self.__state: Optional[State] = None
+        self.__save_lock = Lock()
+        self.__save_job: Optional[ScheduledJob] = None
+        self.__durability: DurabilityMode = DurabilityMode(config.redis_durability)
+        self.__dirty: bool = False
+        self.__log_item_lock = Lock()
+        self.__log_item_serializer = LogEventSerializer()
+        # Written by this process only, like the state, the journal is read after a reboot
+        self.__current_action: Optional[Tuple[Instruction, Command]] = None
+        self.__current_action_loaded: bool = False
+        self.__journal_lock = Lock()
+        self.__journal_added: int = 0
+        self.__position: Optional[Dict[str, int]] = None
 
         if self._redis.ping():
             self._logger.log_system(logging.INFO, 'Successful init redis ...')
+            self.__apply_durability()
         else:
             self._logger.log_system(logging.CRITICAL, 'Something went wrong while init redis ...')
             exit(-2)
@@ -26,32 +107,96 @@ class Redis:
     def get_redis(self) -> redis.Redis[Any]:
         return self._redis
 
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._ops.get_metrics()
+
+    def __apply_durability(self) -> None:
+        """Turns the append only file on for the aof mode. A setting of the server is only ever made more durable,
+            an append only file the server already writes is kept in the other modes.
+        """
+        if self.__durability == DurabilityMode.AOF:
+            try:
+                settings = {**self._redis.config_get('appendonly'), **self._redis.config_get('appendfsync')}
+                if settings.get('appendonly') != 'yes':
+                    self._redis.config_set('appendonly', 'yes')
+                if settings.get('appendfsync') not in ('always', 'everysec'):
+                    self._redis.config_set('appendfsync', 'everysec')
+            except Exception as e:
+                self._logger.log_system(logging.WARNING, f'Could not turn the append only file on: {e}')
+        self._logger.log_system(logging.INFO, f'Redis durability: {self.__durability.value}')
+
     def save(self) -> None:
         try:
             self._redis.save()
         except Exception:
             pass
 
+    def persist(self) -> None:
+        """Makes a mutation durable according to the durability mode"""
+        if self.__durability == DurabilityMode.SYNC:
+            self.save()
+        elif self.__durability == DurabilityMode.BGSAVE:
+            self.schedule_save()
+        elif self.__durability == DurabilityMode.CHECKPOINT:
+            with self.__save_lock:
+                self.__dirty = True
+        # AOF: redis appends the mutation and fsyncs the file every second by itself
+
+    def checkpoint(self) -> None:
+        """Called at instruction boundaries, saves the mutations since the last checkpoint in the checkpoint mode"""
+        with self.__save_lock:
+            if self.__durability != DurabilityMode.CHECKPOINT or not self.__dirty:
+                return
+            self.__dirty = False
+        self._background_save()
+
+    def schedule_save(self) -> None:
+        """Coalesce all mutations of the debounce window into a single non-blocking BGSAVE"""
+        with self.__save_lock:
+            if self.__save_job is not None:
+                return
+            self.__save_job = get_scheduler().schedule(self._config.redis_save_debounce_sec, self._debounced_save)
+
+    def _debounced_save(self) -> None:
+        with self.__save_lock:
+            self.__save_job = None
+        self._background_save()
+
+    def _background_save(self) -> None:
+        try:
+            self._redis.bgsave()
+        except Exception:
+            # A save is already running; the next mutation schedules another one
+            pass
+
     def set_position(self, x: int, y: int, z: int) -> None:
         self._redis.hmset('position', {'x': x, 'y': y, 'z': z})
-        self.save()
+        self.__position = {'x': x, 'y': y, 'z': z}
+        self.persist()
 
     def del_position(self) -> None:
         self._redis.delete('position')
-        self.save()
+        self.__position = None
+        self.persist()
 
     def set_axis_position(self, axis: str, value: int) -> None:
         self._redis.hset('position', axis, value)
-        self.save()
+        if self.__position is not None:
+            self.__position[axis] = value
+        self.persist()
 
     def get_position(self) -> Optional[Tuple[int, int, int]]:
-        if self._redis.exists('position'):
-            position = self._redis.hgetall('position')
+        position = self._redis.hgetall('position')
+        if position:
+            self.__position = {axis: int(position[axis]) for axis in ('x', 'y', 'z')}
             return int(position['x']), int(position['y']), int(position['z'])
         else:
             return None
 
     def get_axis_position(self, axis: str) -> int:
+        position = self.__position
+        if position is not None:
+            return position[axis]
         pos = self._redis.hget('position', axis)
         if pos is not None:
             return int(pos) if pos else 0
@@ -61,42 +206,150 @@ class Redis:
                                     'Fatal error detected shutdown Bot script.\n\rHuman knowledge is needed.')
             exit(-5)
 
+    def _journal(self, entry: Dict[str, Any]) -> None:
+        with self.__journal_lock:
+            self._redis.xadd(JOURNAL, entry)
+            self.__journal_added += 1
+            if self.__journal_added >= self._config.journal_max_len:
+                self.__journal_added = 0
+                self.__trim_journal()
+        self.persist()
+
+    def __trim_journal(self) -> None:
+        """Drops whole finished instructions only: the entries before the oldest instruction that did not end and
+            before the instruction of the last started command (the current action after a reboot)
+        """
+        entries = self._redis.xrange(JOURNAL)
+        accepted: Dict[str, int] = {}
+        unfinished: Dict[str, int] = {}
+        current: Optional[int] = None
+        for index, (_, entry) in enumerate(entries):
+            event = entry.get('event')
+            if event == 'instruction':
+                accepted[entry['id']] = unfinished[entry['id']] = index
+            elif event == 'start' and entry['id'] in accepted:
+                current = accepted[entry['id']]
+            elif event == 'end':
+                unfinished.pop(entry['id'], None)
+            elif event == 'cancel':
+                unfinished.clear()
+        keep = min([*unfinished.values(), *([current] if current is not None else []), len(entries) - 1])
+        if keep <= 0:
+            return
+        try:
+            self._redis.xtrim(JOURNAL, minid=entries[keep][0], approximate=False)
+        except redis.RedisError as e:
+            self._logger.log_system(logging.WARNING, f'Could not trim the journal: {e}')
+
+    def journal_instruction(self, instruction: Instruction, plan: List[Command], queued: bool = True) -> None:
+        """The accepted instruction with all its commands, the commands refer to it by the instruction id.
+            An instruction the route planner holds back is journaled as not queued.
+        """
+        self._journal({'event': 'instruction', 'id': instruction.get('instructionId', ''),
+                       'instruction': json.dumps(instruction), 'commands': json.dumps(plan),
+                       'queued': int(queued)})
+
+    def journal_queued(self, instruction: Instruction) -> None:
+        self._journal({'event': 'queued', 'id': instruction.get('instructionId', '')})
+
+    def journal_end(self, instruction: Instruction) -> None:
+        self._journal({'event': 'end', 'id': instruction.get('instructionId', '')})
+
+    def journal_cancel(self) -> None:
+        """All instructions accepted so far are dropped"""
+        self._journal({'event': 'cancel'})
+
+    def get_journal(self) -> List[Dict[str, str]]:
+        return [entry for _, entry in self._redis.xrange(JOURNAL)]
+
     def set_current_action(self, instruction: Instruction, command: Command) -> None:
-        self._redis.hmset('action', {'instruction': json.dumps(instruction), 'command': json.dumps(command)})
+        """A single XADD: the start of the command is the end of the one before, the position is where the robot
+            was when the command started
+        """
+        self.__current_action = (instruction, command)
+        position = self.__position
+        self._journal({'event': 'start', 'id': instruction.get('instructionId', ''), 'index': command.get('index', -1),
+                       'position': json.dumps(position) if position is not None else ''})
 
-    def get_current_action(self) -> Tuple[Instruction, Command]:
-        action = self._redis.hgetall('action')
-        if len(action) == 0:
-            return None
-        return (json.loads(action['instruction']), json.loads(action['command']))
+    def get_current_action(self) -> Optional[Tuple[Instruction, Command]]:
+        if self.__current_action is None and not self.__current_action_loaded:
+            self.__current_action_loaded = True
+            self.__current_action = self.__load_current_action()
+        return self.__current_action
+
+    def __load_current_action(self) -> Optional[Tuple[Instruction, Command]]:
+        """The command of the last start in the journal"""
+        instructions: Dict[str, Dict[str, str]] = {}
+        current_action: Optional[Tuple[Instruction, Command]] = None
+        for entry in self.get_journal():
+            if entry.get('event') == 'instruction':
+                instructions[entry['id']] = entry
+            elif entry.get('event') == 'start' and entry['id'] in instructions:
+                commands = json.loads(instructions[entry['id']]['commands'])
+                index = int(entry['index'])
+                if 0 <= index < len(commands):
+                    current_action = json.loads(instructions[entry['id']]['instruction']), commands[index]
+        return current_action
 
     def set_initial_state(self) -> None:
-        self._redis.set('state', State.IDLE.value, nx=True)
-        self.save()
+        with self.__state_lock:
+            self._redis.set('state', State.IDLE.value, nx=True)
+            self.__state = None
+        self.persist()
 
     def set_state(self, state: State) -> None:
-        self._redis.set('state', state.value)
-        self.save()
+        with self.__state_lock:
+            self._redis.set('state', state.value)
+            self.__state = state
+        self.persist()
 
     def get_current_state(self) -> State:
-        raw_state = self._redis.get('state')
-        state = State(int(raw_state)) if raw_state else State.UNKNOWN
-        return state
+        with self.__state_lock:
+            if self.__state is None:
+                raw_state = self._redis.get('state')
+                self.__state = State(int(raw_state)) if raw_state else State.UNKNOWN
+            return self.__state
 
     def update_state(self, update_fun: Callable[..., State], *states: State) -> State:
-        current_state = self.get_current_state()
-        new_state = update_fun(current_state, *states)
-        self.set_state(new_state)
-        self.save()
+        with self.__state_lock:
+            new_state = update_fun(self.get_current_state(), *states)
+            self.set_state(new_state)
         return new_state
 
     def get_log_item_state(self, logger: Logger) -> bool:
-        log_item = self._redis.get('log_item')
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.get('log_item')
+        pipe.smembers('log_item:sections')
+        log_item, sections = pipe.execute()
         if log_item:
-            logger.set_log_event_state(json.loads(log_item))
+            state = json.loads(log_item)
+            sections = list(sections)
+            pipe = self._redis.pipeline(transaction=False)
+            for section in sections:
+                pipe.lrange(f'log_item:{section}', 0, -1)
+            for section, items in zip(sections, pipe.execute() if sections else []):
+                state[section] = [json.loads(item) for item in items]
+            logger.set_log_event_state(state)
 
         return log_item is not None
 
     def set_log_item_state(self, logger: Logger) -> None:
-        self._redis.set('log_item', json.dumps(logger.get_log_event_state()))
-        self.save()
+        """Persist the current log event: the fields as one JSON value, every section as a list that only
+            gets the items appended since the previous call
+        """
+        with self.__log_item_lock:
+            reset, fields, appended = self.__log_item_serializer.encode(logger.get_log_event())
+            if not reset and fields is None and not appended:
+                return
+            pipe = self._redis.pipeline(transaction=False)
+            if reset:
+                pipe.delete(*[f'log_item:{section}' for section in self._redis.smembers('log_item:sections')],
+                            'log_item:sections')
+            if fields is not None:
+                pipe.set('log_item', fields)
+            if appended:
+                pipe.sadd('log_item:sections', *appended)
+            for section, items in appended.items():
+                pipe.rpush(f'log_item:{section}', *items)
+            pipe.execute()
+        self.persist()
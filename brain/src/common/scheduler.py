@@ -0,0 +1,189 @@
+from __future__ import annotations
+from concurrent.futures import Executor
+from threading import Condition, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import heapq
+import itertools
+import logging
+import time
+
+
+class ScheduledJob:
+    """Handle of a job of the Scheduler. A periodic job runs every period after its first run.
+        Cancel and reset only mark the job or push a new entry, the entries that became outdated are
+        skipped when they come up, so both cost O(log n) at most.
+        A job with an executor runs there, a run that comes up while the one before still runs is skipped.
+    """
+    def __init__(self, scheduler: Scheduler, action: Callable[..., Any], args: Tuple[Any, ...],
+                 period: Optional[float], delay: float, name: str, executor: Optional[Executor] = None) -> None:
+        self._scheduler: Scheduler = scheduler
+        self.action: Callable[..., Any] = action
+        self.args: Tuple[Any, ...] = args
+        self.period: Optional[float] = period
+        self.delay: float = delay
+        self.name: str = name
+        self.executor: Optional[Executor] = executor
+        self.version: int = 0
+        self.cancelled: bool = False
+        self.running: bool = False
+
+        self.runs: int = 0
+        self.failures: int = 0
+        self.skipped: int = 0
+        self.last_drift: float = 0.0
+        self.max_drift: float = 0.0
+        self.last_runtime: float = 0.0
+        self.max_runtime: float = 0.0
+
+    def cancel(self) -> None:
+        self._scheduler._cancel(self)
+
+    def reset(self, delay: Optional[float] = None) -> None:
+        """Run the job `delay` (by default its initial delay) from now on, also after it was cancelled"""
+        self._scheduler._reschedule(self, self.delay if delay is None else delay)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {'runs': self.runs,
+                'failures': self.failures,
+                'skipped': self.skipped,
+                'last_drift_ms': self.last_drift * 1000,
+                'max_drift_ms': self.max_drift * 1000,
+                'last_runtime_ms': self.last_runtime * 1000,
+                'max_runtime_ms': self.max_runtime * 1000}
+
+
+class Scheduler:
+    """Runs one-shot and periodic jobs in order of their due time on a single thread.
+        Jobs run one after the other, so a job should return quickly and must not wait for another job.
+        A job that blocks (on serial I/O for example) is scheduled with an executor, the thread of the scheduler
+        only hands it over. A stopped scheduler does not take jobs anymore.
+    """
+    def __init__(self, name: str = 'scheduler', clock: Callable[[], float] = time.monotonic) -> None:
+        self._name: str = name
+        self._clock = clock
+        self._wakeup: Condition = Condition()
+        self._heap: List[Tuple[float, int, int, ScheduledJob]] = []
+        self._sequence = itertools.count()  # keeps jobs with the same due time in the order they were scheduled
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._thread: Optional[Thread] = None
+        self._stopped: bool = False
+
+    def schedule(self, delay: float, action: Callable[..., Any], *args: Any, period: Optional[float] = None,
+                 name: str = '', executor: Optional[Executor] = None) -> ScheduledJob:
+        job = ScheduledJob(self, action, args, period, delay, name or getattr(action, '__qualname__', 'job'),
+                           executor)
+        if job.name and period is not None:
+            self._jobs[job.name] = job
+        self._reschedule(job, delay)
+        return job
+
+    def _reschedule(self, job: ScheduledJob, delay: float) -> None:
+        with self._wakeup:
+            if self._stopped:
+                raise RuntimeError(f'Scheduler {self._name} was stopped, {job.name} would never run')
+            job.cancelled = False
+            job.version += 1
+            self._push(job, self._clock() + delay)
+            if self._thread is None:
+                self._thread = Thread(target=self._run, daemon=True, name=self._name)
+                self._thread.start()
+
+    def _push(self, job: ScheduledJob, due: float) -> None:
+        entry = (due, next(self._sequence), job.version, job)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wakeup.notify()
+
+    def _cancel(self, job: ScheduledJob) -> None:
+        with self._wakeup:
+            job.cancelled = True
+            job.version += 1
+
+    def _next_job(self) -> Optional[Tuple[float, ScheduledJob]]:
+        with self._wakeup:
+            while not self._stopped:
+                if not self._heap:
+                    self._wakeup.wait()
+                    continue
+                due, _, version, job = self._heap[0]
+                if version != job.version:
+                    heapq.heappop(self._heap)
+                    continue
+                wait = due - self._clock()
+                if wait > 0:
+                    self._wakeup.wait(wait)
+                    continue
+                heapq.heappop(self._heap)
+                if job.period is not None:
+                    # The next run is due one period after this one was, a run that was missed is skipped
+                    next_due = due + job.period
+                    self._push(job, next_due if next_due > self._clock() else self._clock() + job.period)
+                return due, job
+            return None
+
+    def _run(self) -> None:
+        while True:
+            next_job = self._next_job()
+            if next_job is None:
+                return
+            due, job = next_job
+            if job.executor is None:
+                self._execute(job, due)
+                continue
+            with self._wakeup:
+                if job.running:
+                    job.skipped += 1
+                    continue
+                job.running = True
+            try:
+                job.executor.submit(self._execute, job, due)
+            except RuntimeError:
+                with self._wakeup:
+                    job.running = False
+                logging.getLogger('robot.system').exception(f'Scheduled job {job.name} could not be handed over')
+
+    def _execute(self, job: ScheduledJob, due: float) -> None:
+        start = self._clock()
+        try:
+            job.action(*job.args)
+        except Exception:
+            job.failures += 1
+            logging.getLogger('robot.system').exception(f'Scheduled job {job.name} failed')
+        finally:
+            with self._wakeup:
+                job.running = False
+        job.runs += 1
+        job.last_drift, job.last_runtime = start - due, self._clock() - start
+        job.max_drift = max(job.max_drift, job.last_drift)
+        job.max_runtime = max(job.max_runtime, job.last_runtime)
+
+    def stop(self) -> None:
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify()
+
+    @property
+    def stopped(self) -> bool:
+        with self._wakeup:
+            return self._stopped
+
+    def pending(self) -> int:
+        with self._wakeup:
+            return sum(1 for _, _, version, job in self._heap if version == job.version)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {'pending': self.pending(),
+                'jobs': {name: job.get_metrics() for name, job in self._jobs.items()}}
+
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_lock = Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """The scheduler shared by the timers of the process, a new one once it was stopped"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler.stopped:
+            _scheduler = Scheduler()
+        return _scheduler
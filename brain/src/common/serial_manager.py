@@ -1,8 +1,10 @@
 import random
-from threading import Lock
-from typing import Any, Tuple, List, cast
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Condition, Lock
+from typing import Dict, Optional, Set, Tuple, List, cast
 from serial import Serial  # type: ignore
 import glob
+import os
 import time
 import logging
 
@@ -10,23 +12,52 @@ from actions.feedback.firmware_error_info import FirmwareErrorInfo
 from common.log_event import Logger
 from common.config import Config
 from common.enums import CommandCode
-from model.firmware_error import FirmwareError
+from common.serial_supervisor import SerialSupervisor
+from common.serial_timeouts import SerialTimeouts
+from model.firmware_error import FirmwareError, SerialTimeoutError
+from model.firmware_reply import FirmwareReply
 from util import strip_new_line
 
 
+# Commands that only read sensors (weight, RFID, position, gripsense, water level) and may be pipelined
+PIPELINABLE_CODES = {1, 6, 9, 15, 16}
+# A read returns what arrived within this time, so a board that does not answer never blocks past the deadline
+READ_POLL_SEC = 0.1
+# Asks a board for its side and version
+IDENTIFY_CODE = 14
+# The device node and inode of a tty, a board that was plugged back gets a new one even under the same name
+Identity = Optional[Tuple[int, int]]
+
+
+def get_identity(device: str) -> Identity:
+    try:
+        stat = os.stat(device)
+    except OSError:
+        return None
+    return stat.st_rdev, stat.st_ino
+
+
 class SerialManagerAbstract:
     def send(self, message: List[int]) -> None:
         raise NotImplementedError("The method not implemented")
 
-    def receive(self) -> Tuple[List[bytes], List[bytes]]:
+    def receive(self) -> Tuple[FirmwareReply, FirmwareReply]:
         raise NotImplementedError("The method not implemented")
 
-    def is_ok(self, left: List[bytes], right: List[bytes]) -> bool:
+    def is_ok(self, left: FirmwareReply, right: FirmwareReply) -> bool:
         raise NotImplementedError("The method not implemented")
 
-    def get_firmware_error(self, left: List[bytes], right: List[bytes]) -> list[FirmwareError]:
+    def get_firmware_error(self, left: FirmwareReply, right: FirmwareReply) -> list[FirmwareError]:
         raise NotImplementedError("The method not implemented")
 
+    def request_many(self, messages: List[List[int]]) -> List[Tuple[FirmwareReply, FirmwareReply]]:
+        """Send read-only probes and return their (left, right) answers in the order of the messages"""
+        answers = []
+        for message in messages:
+            self.send(message)
+            answers.append(self.receive())
+        return answers
+
 
 class SerialManagerMock(SerialManagerAbstract):
     def __init__(self, _: Config, logger: Logger) -> None:
@@ -40,7 +71,7 @@ class SerialManagerMock(SerialManagerAbstract):
         self._logger.prepare_listitem_for_event(serial_in=str(message))
         self.__lock.release()
 
-    def receive(self) -> Tuple[List[bytes], List[bytes]]:
+    def receive(self) -> Tuple[FirmwareReply, FirmwareReply]:
         self.__lock.acquire()
         time.sleep(2)
         self._detonate_count += 1
@@ -52,17 +83,16 @@ class SerialManagerMock(SerialManagerAbstract):
 
         if self._detonate_count != 10000:
             self.__lock.release()
-            return (b'0 0 0 0 0 0 0 0 1'.split(b' '), b'0 0 30 0 0 0 0 0 1'.split(b' '))
+            return (FirmwareReply(b'0 0 0 0 0 0 0 0 1', 'left'),
+                    FirmwareReply(b'0 0 30 0 0 0 0 0 1', 'right'))
         else:
             self.__lock.release()
-            return (b'0 0 0 0 0 0 0 0 1'.split(b' '), b''.split(b' '))
+            return (FirmwareReply(b'0 0 0 0 0 0 0 0 1', 'left'), FirmwareReply(b'', 'right'))
 
-    def is_ok(self, left: List[bytes], right: List[bytes]) -> bool:
-        return not (left == [b''] or right == [b'']
-                    or int(left[0]) == CommandCode.ERROR.value
-                    or int(right[0]) == CommandCode.ERROR.value)
+    def is_ok(self, left: FirmwareReply, right: FirmwareReply) -> bool:
+        return left.ok and right.ok
 
-    def get_firmware_error(self, left: List[bytes], right: List[bytes]) -> list[FirmwareError]:
+    def get_firmware_error(self, left: FirmwareReply, right: FirmwareReply) -> list[FirmwareError]:
         if random() > .9:
             return [FirmwareError(random.randint(5000, 6999), "Fake Error", "Fake Error")]
         else:
@@ -72,6 +102,9 @@ class SerialManagerMock(SerialManagerAbstract):
 class SerialManager(SerialManagerAbstract):
     def __init__(self, config: Config, logger: Logger, firmware_error_info: FirmwareErrorInfo) -> None:
         self.__lock = Lock()  # TODO: check if send and receive can be done concurrently
+        # Signalled under the lock when the boards are reconnected
+        self.__reconnected = Condition(self.__lock)
+        self._reconnect_wait_sec: float = config.serial_reconnect_wait_sec
         self._logger: Logger = logger
         self.__firmware_error_info = firmware_error_info
         self._logger.log_system(logging.INFO, 'Start Init Serial Connections')
@@ -83,107 +116,267 @@ class SerialManager(SerialManagerAbstract):
                                                       f'{config.serial_name_pattern}')
             exit(1)
 
-        self._right: Serial = Serial(self._ttys[0], 115200)
-        self._left: Serial = Serial(self._ttys[1], 115200)
+        self._timeouts: SerialTimeouts = SerialTimeouts(config)
+        self.__message: List[int] = [IDENTIFY_CODE]
+        self.__deadlines: Dict[str, float] = {}
+        self.__timeouts: Dict[str, float] = self._timeouts.get_timeouts(self.__message)
+        self.__stale: Set[str] = set()
+        self.__connected: bool = True
+        self._right, self._left, self._devices = self._connect(self._ttys)
+        self._identities: Tuple[Identity, Identity] = (get_identity(self._devices[0]), get_identity(self._devices[1]))
+
+        self._logger.log_system(logging.INFO, 'Successfully Init Serial Connections')
+        self._supervisor: Optional[SerialSupervisor] = \
+            SerialSupervisor(self, config.serial_name_pattern, config.serial_supervisor_interval_sec, logger) \
+            if config.serial_supervisor_interval_sec > 0 else None
+
+        self._NULL_ANSWER: List[bytes] = [b'0'] * 8
+
+        self._parallel_receive: bool = config.serial_parallel_receive
+        self._pipelining: bool = config.serial_pipelining
+        self._reader_pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='serial-right')
+
+    def _connect(self, ttys: List[str]) -> Tuple[Serial, Serial, Tuple[str, str]]:
+        """Opens the first two devices and asks the first one for its side"""
+        right: Serial = Serial(ttys[0], 115200, timeout=READ_POLL_SEC)
+        left: Serial = Serial(ttys[1], 115200, timeout=READ_POLL_SEC)
+        devices = (ttys[0], ttys[1])
 
         time.sleep(2)
 
         # Fix left/right
-        self._right.write(bytes([14]))  # type: ignore
-        if cast(bytes, self._right.readline()).startswith(b'Side: Left version:'):  # type: ignore
-            self._right, self._left = self._left, self._right  # type: ignore
-
-        self._logger.log_system(logging.INFO, 'Successfully Init Serial Connections')
+        right.write(bytes([IDENTIFY_CODE]))  # type: ignore
+        side = self._readline(right, 'right', time.monotonic() + self._timeouts.probe_sec)
+        if side is not None and side.startswith(b'Side: Left version:'):
+            right, left, devices = left, right, (ttys[1], ttys[0])
+        return right, left, devices
+
+    def update_devices(self, devices: List[str]) -> bool:
+        """Marks the boards as lost when one of their devices is not among devices or is not the tty it was (a
+            board plugged back under the same name is a new device), returns whether both boards are connected
+        """
+        for side, device, identity in zip(('right', 'left'), self._devices, self._identities):
+            if device not in devices or get_identity(device) != identity:
+                self._lost(side)
+        return self.__connected
+
+    def reconnect(self, ttys: List[str]) -> bool:
+        """Replaces the ports of the boards under the lock and redoes the left/right handshake, a command waits
+            until the boards are back instead of talking to a device that is gone
+        """
+        with self.__lock:
+            self._logger.log_system(logging.WARNING, f'Reconnect the boards {self._devices} as {ttys[:2]}')
+            for port in (self._right, self._left):
+                try:
+                    port.close()  # type: ignore
+                except Exception as e:
+                    self._logger.log_system(logging.INFO, f'Closing a lost USB failed: {e}')
+            try:
+                self._right, self._left, self._devices = self._connect(ttys)
+                self._identities = (get_identity(self._devices[0]), get_identity(self._devices[1]))
+            except Exception as e:
+                self._logger.log_system(logging.ERROR, f'Reconnecting the boards failed: {e}')
+                return False
+            self.__connected = True
+            self.__stale.clear()
+            # A board that was reset may not be where it was
+            self._timeouts.forget_position()
+            self._logger.log_system(logging.WARNING, f'Reconnected right {self._devices[0]}, left {self._devices[1]}')
+            self.__reconnected.notify_all()
+            return True
 
-        self._NULL_ANSWER: List[bytes] = [b'0'] * 8
+    def __wait_connected(self) -> bool:
+        """Called under the lock, waits up to serial_reconnect_wait_sec for lost boards to be reconnected"""
+        if self.__connected:
+            return False
+        self._logger.log_system(logging.WARNING, f'Waiting up to {self._reconnect_wait_sec} s for the boards')
+        if not self.__reconnected.wait_for(lambda: self.__connected, self._reconnect_wait_sec):
+            self._logger.log_system(logging.ERROR, 'The boards were not reconnected in time')
+        return True
+
+    def _lost(self, side: str) -> None:
+        if not self.__connected:
+            return
+        self.__connected = False
+        self._logger.log_system(logging.ERROR, f'Lost the {side} board')
+        if getattr(self, '_supervisor', None) is not None:
+            self._supervisor.wake()
 
     def send(self, message: List[int]) -> None:
         with self.__lock:
             self._logger.log_system(logging.INFO, "Send to Serial: ")
             self._logger.log_system(logging.INFO, str(message))
             self._logger.prepare_listitem_for_event(serial_in=str(message))
-            trys: int = 0
-            while trys < 3:
-                try:
-                    self._right.write(bytes(message))  # type: ignore
-                    break
-                except Exception as e:
-                    self._logger.log_system(logging.ERROR,
-                                            f'Exception occurred on writing on the right USB, try number '
-                                            f'{trys}: {e}')
-                    trys += 1
-            if trys >= 3:
+            self.__wait_connected()
+            self.__start(message, self._timeouts.get_timeouts(message))
+            if not self._write(self._right, 'right', bytes(message)):
                 # Todo: Handle bad things
                 return
-
-            trys = 0
-            while trys < 3:
-                try:
-                    self._left.write(bytes(message))  # type: ignore
-                    break
-                except Exception as e:
-                    self._logger.log_system(logging.ERROR, f'Exception occurred on writing on the left USB, try number '
-                                                           f'{trys}: {e}')
-                    trys += 1
-            if trys >= 3:
+            if not self._write(self._left, 'left', bytes(message)):
                 # Todo: Handle bad things
                 return
 
-    def receive(self) -> Tuple[List[bytes], List[bytes]]:
+    def __start(self, message: List[int], timeouts: Dict[str, float]) -> None:
+        """The deadlines of the answers start when the message is sent"""
+        for side in self.__stale:
+            # Drop the late answer to the message that timed out before
+            try:
+                (self._right if side == 'right' else self._left).reset_input_buffer()  # type: ignore
+            except Exception as e:
+                self._logger.log_system(logging.ERROR, f'Exception occurred on flushing the {side} USB: {e}')
+        self.__stale.clear()
+        self.__message = message
+        self.__timeouts = timeouts
+        now = time.monotonic()
+        self.__deadlines = {side: now + timeout for side, timeout in timeouts.items()}
+
+    def _write(self, port: Serial, side: str, data: bytes) -> bool:
+        trys: int = 0
+        while trys < 3:
+            try:
+                port.write(data)  # type: ignore
+                return True
+            except Exception as e:
+                self._logger.log_system(logging.ERROR,
+                                        f'Exception occurred on writing on the {side} USB, try number {trys}: {e}')
+                trys += 1
+        self._lost(side)
+        return False
+
+    def _readline(self, port: Serial, side: str, deadline: float) -> Optional[bytes]:
+        """Reads a line, or None if the line did not end before the deadline"""
+        answer = b''
+        trys: int = 0
+        self._logger.log_system(logging.INFO, f"Read {side}:")
+        while trys < 3:
+            try:
+                answer += cast(bytes, port.readline())  # type: ignore
+            except Exception as e:
+                self._logger.log_system(logging.ERROR,
+                                        f'Exception occurred on reading on the {side} USB, try number '
+                                        f'{trys}: {e}')
+                trys += 1
+                if trys == 3:
+                    self._lost(side)
+                continue
+            if answer.endswith(b'\n'):
+                break
+            if time.monotonic() >= deadline:
+                self.__stale.add(side)
+                return None
+        self._logger.log_system(logging.INFO, f"Read: {str(answer)}")
+        return answer
+
+    def _reply(self, answer: Optional[bytes], side: str, message: List[int], timeout: float) -> FirmwareReply:
+        if answer is not None:
+            return FirmwareReply(answer, side)
+        error = SerialTimeoutError(side, message[0], timeout)
+        self._logger.log_system(logging.ERROR, f'{error.description}: {message}')
+        return FirmwareReply(b'', side, error)
+
+    def receive(self) -> Tuple[FirmwareReply, FirmwareReply]:
         with self.__lock:
-            left_answer = b''
-            right_answer = b''
-            trys: int = 0
-            while trys < 3:
-                try:
-                    self._logger.log_system(logging.INFO, "Read right:")
-                    right_answer = cast(bytes, self._right.readline())  # type: ignore
-                    self._logger.log_system(logging.INFO, f"Read: {str(right_answer)}")
-                    self._logger.prepare_listitem_for_event(serial_out_right=strip_new_line(str(right_answer)))
-                    break
-                except Exception as e:
-                    self._logger.log_system(logging.ERROR,
-                                            f'Exception occurred on reading on the right USB, try number '
-                                            f'{trys}: {e}')
-                    trys += 1
-
-            trys = 0
-            while trys < 3:
-                try:
-                    self._logger.log_system(logging.INFO, "Read left:")
-                    left_answer = cast(bytes, self._left.readline())  # type: ignore
-                    self._logger.log_system(logging.INFO, f"Read: {str(left_answer)}")
-                    self._logger.prepare_listitem_for_event(serial_out_left=strip_new_line(str(left_answer)))
-                    break
-                except Exception as e:
-                    self._logger.log_system(logging.ERROR, f'Exception occurred on reading on the left USB, try number '
-                                                           f'{trys}: {e}')
-                    trys += 1
-
+            if self.__wait_connected():
+                # The time spent waiting for the boards does not count against the answer
+                self.__deadlines = {}
+            message, deadlines = self.__message, self.__deadlines or self.__default_deadlines()
+            if self._parallel_receive:
+                # Both boards answer independently, so wait for the slower one instead of for both in turn
+                right_future: Future[Optional[bytes]] = \
+                    self._reader_pool.submit(self._readline, self._right, 'right', deadlines['right'])
+                left_answer = self._readline(self._left, 'left', deadlines['left'])
+                right_answer = right_future.result()
+            else:
+                right_answer = self._readline(self._right, 'right', deadlines['right'])
+                left_answer = self._readline(self._left, 'left', deadlines['left'])
+            # A following receive without a send waits for another answer to the same message
+            self.__deadlines = {}
+
+            self._logger.prepare_listitem_for_event(serial_out_right=strip_new_line(str(right_answer)))
+            self._logger.prepare_listitem_for_event(serial_out_left=strip_new_line(str(left_answer)))
             self._logger.add_listitem_to_event('serial')
 
-            return (left_answer.split(b" "), right_answer.split(b" "))
+            timeouts = self.__timeouts
+            left = self._reply(left_answer, 'left', message, timeouts['left'])
+            right = self._reply(right_answer, 'right', message, timeouts['right'])
+            self._timeouts.observe(message, left, right)
+            return left, right
+
+    def __default_deadlines(self) -> Dict[str, float]:
+        now = time.monotonic()
+        return {side: now + timeout for side, timeout in self.__timeouts.items()}
+
+    def request_many(self, messages: List[List[int]]) -> List[Tuple[FirmwareReply, FirmwareReply]]:
+        """With pipelining all probes are written back to back and the boards answer them in order,
+            so a sequence of probes costs one exchange. Every answer is checked against the code of its message.
+        """
+        if not self._pipelining or len(messages) < 2:
+            return super().request_many(messages)
+        if any(message[0] not in PIPELINABLE_CODES for message in messages):
+            raise ValueError(f'Only read-only probes {sorted(PIPELINABLE_CODES)} can be pipelined: {messages}')
 
-    def is_integer(self, n: Any) -> bool:
-        try:
-            int(n)
-            return True
-        except ValueError:
-            return False
-
-    def is_ok(self, left: List[bytes], right: List[bytes]) -> bool:
-        return not (left == [b''] or right == [b'']
-                    or (self.is_integer(left[0]) and int(left[0]) == CommandCode.ERROR.value)
-                    or (self.is_integer(right[0]) and int(right[0]) == CommandCode.ERROR.value))
-
-    def __get_firmware_error(self, bytes: List[bytes]) -> FirmwareError:
-        if (len(bytes) >= 3 and self.is_integer(bytes[0])
-                and int(bytes[0]) == CommandCode.ERROR.value and self.is_integer(bytes[2])):
-
-            error_id = int(bytes[2])
+        with self.__lock:
+            self._logger.log_system(logging.INFO, f'Send pipelined to Serial: {messages}')
+            self.__wait_connected()
+            data = bytes(byte for message in messages for byte in message)
+            # The probes are answered one after the other, so their timeouts add up
+            timeouts = {side: sum(self._timeouts.get_timeouts(message)[side] for message in messages)
+                        for side in ('right', 'left')}
+            self.__start(messages[-1], timeouts)
+            deadlines, self.__deadlines = self.__deadlines, {}
+            if not (self._write(self._right, 'right', data) and self._write(self._left, 'left', data)):
+                return [(FirmwareReply(b'', 'left'), FirmwareReply(b'', 'right'))] * len(messages)
+
+            if self._parallel_receive:
+                right_future: Future[List[Optional[bytes]]] = \
+                    self._reader_pool.submit(self._readlines, self._right, 'right', len(messages), deadlines['right'])
+                left_answers = self._readlines(self._left, 'left', len(messages), deadlines['left'])
+                right_answers = right_future.result()
+            else:
+                right_answers = self._readlines(self._right, 'right', len(messages), deadlines['right'])
+                left_answers = self._readlines(self._left, 'left', len(messages), deadlines['left'])
+
+            answers: List[Tuple[FirmwareReply, FirmwareReply]] = []
+            for message, left_answer, right_answer in zip(messages, left_answers, right_answers):
+                self._logger.prepare_listitem_for_event(serial_in=str(message),
+                                                        serial_out_right=strip_new_line(str(right_answer)),
+                                                        serial_out_left=strip_new_line(str(left_answer)))
+                self._logger.add_listitem_to_event('serial')
+                left = self._reply(left_answer, 'left', message, timeouts['left'])
+                right = self._reply(right_answer, 'right', message, timeouts['right'])
+                if left.timeout is None and right.timeout is None and \
+                        not (self._answers(message, left) and self._answers(message, right)):
+                    self._logger.log_system(logging.ERROR, f'Pipelined answer {left_answer!r}/{right_answer!r} does '
+                                                           f'not belong to {message}')
+                    # The lines left over from the probes must not be read as the answer to the next message
+                    self.__stale.update(side for side, reply in (('left', left), ('right', right))
+                                        if not self._answers(message, reply))
+                    left, right = FirmwareReply(b'', 'left'), FirmwareReply(b'', 'right')
+                answers.append((left, right))
+            return answers
+
+    def _readlines(self, port: Serial, side: str, count: int, deadline: float) -> List[Optional[bytes]]:
+        answers: List[Optional[bytes]] = []
+        for _ in range(count):
+            # After a timeout the remaining answers are not waited for
+            answers.append(self._readline(port, side, deadline) if not answers or answers[-1] is not None else None)
+        return answers
+
+    def _answers(self, message: List[int], answer: FirmwareReply) -> bool:
+        """A board answers with the code of the message, or with the error code"""
+        return answer.code in (message[0], CommandCode.ERROR.value)
+
+    def is_ok(self, left: FirmwareReply, right: FirmwareReply) -> bool:
+        return left.ok and right.ok
+
+    def __get_firmware_error(self, reply: FirmwareReply) -> FirmwareError:
+        if reply.timeout is not None:
+            return reply.timeout
+        error_id = reply.error_id
+        if error_id is not None:
             return self.__firmware_error_info.get_error(error_id)
 
-    def get_firmware_error(self, left: List[bytes], right: List[bytes]) -> list[FirmwareError]:
+    def get_firmware_error(self, left: FirmwareReply, right: FirmwareReply) -> list[FirmwareError]:
         result = []
         left_error = self.__get_firmware_error(left)
         if left_error is not None:
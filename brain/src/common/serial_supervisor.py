@@ -0,0 +1,61 @@
+from __future__ import annotations
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, List, Optional
+import glob
+import logging
+
+from common.log_event import Logger
+from common.scheduler import ScheduledJob, Scheduler, get_scheduler
+
+if TYPE_CHECKING:
+    from common.serial_manager import SerialManager
+
+
+class SerialSupervisor:
+    """Watches the devices of serial_name_pattern. When a board was lost, because its device disappeared or it failed
+        to read or write, it is reconnected as soon as two devices are there again.
+        The check only lists the devices on the scheduler, the reconnect runs on its own thread.
+    """
+    def __init__(self, serial_manager: SerialManager, pattern: str, interval_sec: float, logger: Logger,
+                 scheduler: Optional[Scheduler] = None) -> None:
+        self._serial_manager: SerialManager = serial_manager
+        self._pattern: str = pattern
+        self._logger: Logger = logger
+        self._reconnect_lock = Lock()
+        self._reconnecting: bool = False
+        self._devices: List[str] = []
+        self.reconnects: int = 0
+        scheduler = scheduler or get_scheduler()
+        self._job: ScheduledJob = scheduler.schedule(interval_sec, self.check, period=interval_sec,
+                                                     name='serial-supervisor')
+
+    def check(self) -> None:
+        devices: List[str] = glob.glob(self._pattern)
+        if self._serial_manager.update_devices(devices):
+            return
+        if len(devices) < 2:
+            if devices != self._devices:
+                self._logger.log_system(logging.WARNING, f'Waiting for the boards, found {devices}')
+            self._devices = devices
+            return
+        self._devices = devices
+        with self._reconnect_lock:
+            if self._reconnecting:
+                return
+            self._reconnecting = True
+        Thread(target=self._reconnect, args=(devices,), daemon=True, name='serial-reconnect').start()
+
+    def _reconnect(self, devices: List[str]) -> None:
+        try:
+            if self._serial_manager.reconnect(devices):
+                self.reconnects += 1
+        finally:
+            with self._reconnect_lock:
+                self._reconnecting = False
+
+    def wake(self) -> None:
+        """Checks right away instead of at the next interval"""
+        self._job.reset(0)
+
+    def stop(self) -> None:
+        self._job.cancel()
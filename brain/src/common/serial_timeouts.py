@@ -0,0 +1,84 @@
+from typing import Dict, List, Optional
+
+from common.config import Config
+from model.firmware_reply import FirmwareReply
+
+MOVE = 0
+PAUSE = 3
+HOME = 7
+GET_POSITION = 9
+# Where moves and homing messages keep their speed
+SPEED_INDEX = 7
+# Probes, settings and switches, a board answers them right away
+QUICK_CODES = {1, 6, 8, 9, 12, 13, 14, 15, 16, 17, 21}
+# The axes a board drives
+AXES = {'right': ('x', 'z'), 'left': ('y', 'z')}
+
+
+class SerialTimeouts:
+    """How long each board may take to answer a message. Probes get the short probe timeout, pauses their length.
+        With serial_travel_timeouts moves and homing get the travel time of the requested distance at the requested
+        speed times a margin (the speeds of the axes must be measured on the robot first).
+        Everything is capped by serial_timeout_right/left, which is also the timeout of the other commands and of
+        moves from an unknown position.
+    """
+    def __init__(self, config: Config) -> None:
+        self.probe_sec: float = config.serial_timeout_probe_sec
+        self.margin: float = config.serial_timeout_margin
+        self.caps: Dict[str, float] = {'right': config.serial_timeout_right, 'left': config.serial_timeout_left}
+        self.travel: bool = config.serial_travel_timeouts
+        # Units per second at speed 100
+        self.speeds: Dict[str, float] = {'x': config.serial_speed_x, 'y': config.serial_speed_y,
+                                         'z': config.serial_speed_z}
+        self.position: Dict[str, Optional[int]] = {'x': None, 'y': None, 'z': None}
+
+    def get_timeouts(self, message: List[int]) -> Dict[str, float]:
+        """Seconds per board ('right', 'left') to answer the message"""
+        code = message[0]
+        if code in QUICK_CODES:
+            return {side: min(self.probe_sec, cap) for side, cap in self.caps.items()}
+        if code == PAUSE and len(message) > 1:
+            return {side: min(self.probe_sec + message[1], cap) for side, cap in self.caps.items()}
+        targets = self._get_targets(message)
+        if not self.travel or targets is None:
+            return dict(self.caps)
+        speed = max(message[SPEED_INDEX], 1) / 100
+        timeouts = {}
+        for side, cap in self.caps.items():
+            travel: Optional[float] = 0.0
+            for axis in AXES[side]:
+                if axis not in targets:
+                    continue
+                current = self.position[axis]
+                if current is None:
+                    travel = None
+                    break
+                travel = max(travel, abs(targets[axis] - current) / (self.speeds[axis] * speed))
+            timeouts[side] = cap if travel is None else min(self.probe_sec + travel * self.margin, cap)
+        return timeouts
+
+    def observe(self, message: List[int], left: FirmwareReply, right: FirmwareReply) -> None:
+        """Keeps track of the position from position answers and finished moves"""
+        targets = self._get_targets(message)
+        if message[0] == GET_POSITION and left.ok and right.ok:
+            try:
+                self.position.update(x=right.get_int(2), y=left.get_int(2), z=right.get_int(3))
+            except (IndexError, ValueError):
+                self.position.update(x=None, y=None, z=None)
+        elif targets is not None:
+            # After a failed move the axes may have stopped anywhere on the way
+            self.position.update(targets if left.ok and right.ok else {axis: None for axis in targets})
+
+    def forget_position(self) -> None:
+        self.position = {'x': None, 'y': None, 'z': None}
+
+    @staticmethod
+    def _get_targets(message: List[int]) -> Optional[Dict[str, int]]:
+        if len(message) < 8:
+            return None
+        if message[0] == MOVE:
+            return {'x': message[1] + message[2] * 256, 'y': message[3] + message[4] * 256,
+                    'z': message[5] + message[6] * 256}
+        if message[0] == HOME:
+            return {axis: 0 for axis, flag in (('x', message[1]), ('y', message[3]), ('z', message[5])) if flag}
+        return None
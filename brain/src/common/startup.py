@@ -0,0 +1,111 @@
+from concurrent.futures import Future
+from threading import Thread
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import logging
+import time
+
+from common.log_event import Logger
+
+
+class StartupError(Exception):
+    def __init__(self, step: str, error: BaseException) -> None:
+        super().__init__(f'Startup step {step} failed: {error}')
+        self.step: str = step
+        self.error: BaseException = error
+
+
+class StartupStep:
+    def __init__(self, name: str, action: Callable[..., Any], requires: Sequence[str]) -> None:
+        self.name: str = name
+        self.action: Callable[..., Any] = action
+        self.requires: List[str] = list(requires)
+        self.future: Future[Any] = Future()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+
+class Startup:
+    """Runs the initialization steps of the bot in parallel. A step starts as soon as the steps it requires are done
+        and is called with their results, in the order they are required. A step can only require steps that were
+        added before it, so the steps cannot wait for each other in a cycle.
+    """
+    def __init__(self, logger: Logger, clock: Callable[[], float] = time.monotonic) -> None:
+        self._logger: Logger = logger
+        self._clock = clock
+        self._steps: Dict[str, StartupStep] = {}
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def add(self, name: str, action: Callable[..., Any], requires: Sequence[str] = ()) -> None:
+        if name in self._steps:
+            raise ValueError(f'Startup step {name} was added twice')
+        unknown = [step for step in requires if step not in self._steps]
+        if unknown:
+            raise ValueError(f'Startup step {name} requires the unknown steps {unknown}')
+        self._steps[name] = StartupStep(name, action, requires)
+
+    def run(self) -> Dict[str, Any]:
+        """Waits for all steps and returns their results by name, raises StartupError for the first step that
+            failed in the order the steps were added (the steps that require it fail as well). A step that exited
+            exits the process with its exit code.
+        """
+        self._started = self._clock()
+        for step in self._steps.values():
+            # A step may block for long (like a connection to the cloud), it must not keep the process alive
+            Thread(target=self._run_step, args=(step,), daemon=True, name=f'startup-{step.name}').start()
+        try:
+            return {name: step.future.result() for name, step in self._steps.items()}
+        except StartupError as e:
+            error: BaseException = e
+            while isinstance(error, StartupError):
+                error = error.error
+            if isinstance(error, SystemExit):
+                raise SystemExit(error.code) from e
+            raise
+        finally:
+            self._finished = self._clock()
+            self._logger.log_system(logging.INFO, self.get_report_line())
+
+    def _run_step(self, step: StartupStep) -> None:
+        try:
+            args = [self._steps[name].future.result() for name in step.requires]
+        except StartupError as e:
+            step.future.set_exception(StartupError(step.name, e))
+            return
+        step.started = self._clock()
+        try:
+            result = step.action(*args)
+        except BaseException as e:
+            step.finished = self._clock()
+            self._logger.log_system(logging.ERROR, f'Startup step {step.name} failed: {e}')
+            step.future.set_exception(StartupError(step.name, e))
+            return
+        step.finished = self._clock()
+        self._logger.log_system(logging.INFO, f'Startup step {step.name} done after '
+                                              f'{step.finished - self._started:.2f} s')
+        step.future.set_result(result)
+
+    def get_report(self) -> Dict[str, Any]:
+        """When each step started and finished relative to the start, and the time the steps took in total (what
+            the startup would take if they ran one after the other)
+        """
+        def ms(at: Optional[float]) -> Optional[float]:
+            return None if at is None or self._started is None else (at - self._started) * 1000
+
+        steps = {name: {'requires': step.requires,
+                        'start_ms': ms(step.started),
+                        'end_ms': ms(step.finished),
+                        'duration_ms': (step.finished - step.started) * 1000
+                        if step.started is not None and step.finished is not None else None}
+                 for name, step in self._steps.items()}
+        return {'total_ms': ms(self._finished),
+                'sequential_ms': sum(step['duration_ms'] or 0 for step in steps.values()),
+                'steps': steps}
+
+    def get_report_line(self) -> str:
+        report = self.get_report()
+        steps = ', '.join(f"{name} {step['start_ms'] / 1000:.2f}-{step['end_ms'] / 1000:.2f} s"
+                          if step['end_ms'] is not None else f'{name} not done'
+                          for name, step in report['steps'].items())
+        return f"Startup took {(report['total_ms'] or 0) / 1000:.2f} s instead of " \
+               f"{report['sequential_ms'] / 1000:.2f} s one step after the other: {steps}"
@@ -0,0 +1,45 @@
+from collections import deque
+from threading import Condition
+from typing import Deque, Generic, Optional, Tuple, TypeVar
+import time
+
+from common.metrics import LatencyCounter
+
+T = TypeVar('T')
+
+
+class WorkQueue(Generic[T]):
+    """FIFO queue whose consumer blocks on a condition until work is put, instead of polling.
+        The time every item spent in the queue is recorded in `latency` (enqueue-to-start).
+    """
+    def __init__(self) -> None:
+        self.__condition = Condition()
+        self.__items: Deque[Tuple[float, T]] = deque()
+        self.latency: LatencyCounter = LatencyCounter()
+
+    def put(self, item: T) -> None:
+        with self.__condition:
+            self.__items.append((time.monotonic(), item))
+            self.__condition.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[T]:
+        """Wait for the oldest item; returns None if the timeout passed without work"""
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: len(self.__items) > 0, timeout):
+                return None
+            enqueued_at, item = self.__items.popleft()
+        self.latency.observe(time.monotonic() - enqueued_at)
+        return item
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for work without taking it; returns whether there is some"""
+        with self.__condition:
+            return self.__condition.wait_for(lambda: len(self.__items) > 0, timeout)
+
+    def clear(self) -> None:
+        with self.__condition:
+            self.__items.clear()
+
+    def __len__(self) -> int:
+        with self.__condition:
+            return len(self.__items)
@@ -45,3 +45,15 @@ class FirmwareError:
     @staticmethod
     def fromJson(json_str: str) -> FirmwareError:
         return json.loads(json_str, object_hook=lambda d: FirmwareError(d['number'], d['task'], d['description']))
+
+
+class SerialTimeoutError(FirmwareError):
+    """A board did not answer a message in time, reported next to the errors the boards answer with"""
+    NUMBER = 69000
+
+    def __init__(self, side: str, code: int, timeout_sec: float) -> None:
+        super().__init__(SerialTimeoutError.NUMBER, 'serial',
+                         f'No answer of the {side} board to command {code} within {timeout_sec:.1f} s')
+        self.side = side
+        self.code = code
+        self.timeout_sec = timeout_sec
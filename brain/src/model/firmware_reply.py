@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from common.enums import CommandCode
+from model.firmware_error import SerialTimeoutError
+
+# A board answers `<code> <board> <field> ...\r\n`, an error is `5 <board> <error id>`
+SIDES = {1: 'right', 2: 'left'}
+ERROR_CODE = CommandCode.ERROR.value
+
+
+class FirmwareReply:
+    """One answer line of a board, split once when it is read.
+        Only the code is converted right away, the serial layer needs it for every answer. The fields are
+        converted when a command reads them, so a reply costs the split and the conversions that are used.
+        A board that did not answer in time gives an empty reply with the timeout.
+    """
+    __slots__ = ('raw', 'side', 'code', 'is_error', 'ok', 'timeout', '_tokens', '_fields')
+
+    def __init__(self, raw: bytes, side: str = '', timeout: Optional[SerialTimeoutError] = None) -> None:
+        self.raw: bytes = raw
+        self.timeout: Optional[SerialTimeoutError] = timeout
+        self._tokens: List[bytes] = raw.split()
+        self._fields: Optional[Tuple[Optional[int], ...]] = None
+        code = self._tokens[0] if self._tokens else b''
+        self.code: Optional[int] = int(code) if code.isdigit() else None
+        self.is_error: bool = self.code == ERROR_CODE
+        self.ok: bool = code != b'' and not self.is_error
+        self.side: str = side or SIDES.get(self.board, '')
+
+    @property
+    def fields(self) -> Tuple[Optional[int], ...]:
+        """All tokens as integers, None for a token that is not one (e.g. an RFID or a weight with decimals)"""
+        if self._fields is None:
+            self._fields = tuple([int(token) if _is_integer(token) else None for token in self._tokens])
+        return self._fields
+
+    @property
+    def board(self) -> Optional[int]:
+        return self.fields[1] if len(self._tokens) > 1 else None
+
+    @property
+    def is_empty(self) -> bool:
+        return not self._tokens
+
+    @property
+    def error_id(self) -> Optional[int]:
+        return self.fields[2] if self.is_error and len(self._tokens) > 2 else None
+
+    def get_int(self, index: int) -> int:
+        return int(self._tokens[index])
+
+    def get_float(self, index: int) -> float:
+        return float(self._tokens[index])
+
+    def get_text(self, index: int) -> str:
+        return self._tokens[index].decode('utf-8')
+
+    def get_texts(self) -> List[str]:
+        return self.raw.decode('utf-8').split()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, FirmwareReply):
+            return self.raw == other.raw
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.raw)
+
+    def __repr__(self) -> str:
+        return f'FirmwareReply({self.raw!r}, {self.side!r})'
+
+
+def _is_integer(token: bytes) -> bool:
+    return token.isdigit() or (token[:1] == b'-' and token[1:].isdigit())
@@ -0,0 +1,553 @@
+from concurrent.futures import Future
+from threading import Condition, Lock, Timer, local
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from unittest import mock
+import argparse
+import contextlib
+import copy
+import functools
+import json
+import math
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+
+import redis
+
+from actions.action_manager import ActionManager
+from actions.feedback.firmware_error_info import FirmwareErrorInfo
+from common.camera_rpc import CAPTURED_STATUS
+from common.config import Config
+from common.log_event import Logger
+from common.mqtt_client import MqttPublisher
+from common.redis_client import OpCounter, Redis
+from common.scheduler import get_scheduler
+from common.serial_manager import SerialManager
+from simulator.firmware import FirmwareSimulator, LatencyProfile
+
+COMMAND_NAMES: Dict[int, str] = {0: 'MOVE', 1: 'WEIGHT', 2: 'WATER', 3: 'PAUSE', 6: 'SCAN_RFID', 7: 'HOME',
+                                 8: 'SET_POSITION', 9: 'GET_POSITION', 12: 'GET_SETTINGS', 13: 'SET_SETTINGS',
+                                 15: 'GRIPSENSE', 16: 'WATER_LEVEL', 17: 'MAGNET', 20: 'AUTOREFILL',
+                                 21: 'SET_PUMPS', 22: 'TARE', 100: 'TOPCAM_OPEN', 101: 'TOPCAM_TAKE_IMAGE',
+                                 102: 'TOPCAM_CLOSE', 105: 'SIDECAM_OPEN', 106: 'SIDECAM_TAKE_IMAGE',
+                                 107: 'SIDECAM_CLOSE', 255: 'CANCEL'}
+
+LOCATION = {'farmId': 4001, 'cellId': 1, 'layerId': 2, 'slotId': 3, 'sourceSlotId': 3,
+            'cellIdDestination': 1, 'layerIdDestination': 2, 'slotIdDestination': 4}
+
+# Instructions as they arrive from the gateway, one per instruction type
+RECORDED_INSTRUCTIONS: List[Dict[str, Any]] = [
+    {'Instruction': {'type': 'MOVE', **LOCATION},
+     'Commands': [{'Str': '0 16 1 44 1 0 0 80'},
+                  {'Str': '6'},
+                  {'Str': '0 100 0 44 1 0 0 80', 'NeedsFeedbackOnSuccess': True}]},
+    {'Instruction': {'type': 'WATER', **LOCATION},
+     'Commands': [{'Str': '0 16 1 200 0 0 0 80'},
+                  {'Str': '1'},
+                  {'Str': '16'},
+                  {'Str': '2 0 0 1 1 1 1 1.0 400 300 1800'},
+                  {'Str': '0 16 1 250 0 0 0 80'},
+                  {'Str': '21 0 0 0 0 0 0'},
+                  {'Str': '1'},
+                  {'Str': '16', 'NeedsFeedbackOnSuccess': True}]},
+    {'Instruction': {'type': 'PHOTO', **LOCATION},
+     'Commands': [{'Str': '0 16 1 88 2 0 0 80'},
+                  {'Str': '100'},
+                  {'Str': '101'},
+                  {'Str': '102'},
+                  {'Str': '105'},
+                  {'Str': '106'},
+                  {'Str': '107', 'NeedsFeedbackOnSuccess': True}]},
+    {'Instruction': {'type': 'VALIDATE', **LOCATION},
+     'Commands': [{'Str': '0 16 1 44 1 0 0 80'},
+                  {'Str': '6'},
+                  {'Str': '1', 'NeedsFeedbackOnSuccess': True}]},
+    {'Instruction': {'type': 'AUTOREFILL', 'workingStations': ['300', '1200'], **LOCATION},
+     'Commands': [{'Str': '20 1 0 0 0 0 0', 'NeedsFeedbackOnSuccess': True}]},
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    return {'count': len(values),
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'mean_ms': sum(values) / len(values) * 1000 if values else 0.0,
+            'max_ms': max(values, default=0.0) * 1000}
+
+
+class StorageProfile:
+    """Write cost of the SD card: a fixed cost per synced file plus the transfer time of its bytes"""
+    def __init__(self, sync_ms: float = 20.0, write_mb_per_sec: float = 10.0) -> None:
+        self.sync_ms: float = sync_ms
+        self.write_mb_per_sec: float = write_mb_per_sec
+
+    def write_seconds(self, size: int) -> float:
+        return self.sync_ms / 1000 + size / (self.write_mb_per_sec * 1024 * 1024)
+
+
+class MemoryRedis:
+    """In-process stand-in for the subset of StrictRedis (decode_responses=True) used by the robot.
+        Counts the bytes redis would write to the SD card: the whole dataset for a SAVE or BGSAVE
+        (only SAVE blocks the caller) and every write command while the append only file is on.
+    """
+    def __init__(self, latency_ms: float = 0.0, storage: Optional[StorageProfile] = None, **_: Any) -> None:
+        self._latency: float = latency_ms / 1000
+        self._storage: StorageProfile = storage or StorageProfile()
+        self._lock = Lock()
+        self._data: Dict[str, Any] = {}
+        self._appendonly: bool = False
+        self.written_bytes: int = 0
+        self.saves: int = 0
+        self._pipelined = local()
+        self.op_counter: OpCounter = OpCounter()
+        self.ops: int = 0
+
+    def connect(self, connection_pool: redis.ConnectionPool, **_: Any) -> 'MemoryRedis':
+        """Counts the commands into the counter of the pool, like the connections of the pool do"""
+        self.op_counter = connection_pool.connection_kwargs['op_counter']
+        return self
+
+    def _op(self, name: str) -> None:
+        self.ops += 1
+        self.op_counter.count_command(name)
+        if not getattr(self._pipelined, 'active', False):
+            self._round_trip()
+
+    def _round_trip(self) -> None:
+        self.op_counter.count_round_trip()
+        if self._latency:
+            time.sleep(self._latency)
+
+    def pipeline(self, transaction: bool = True) -> 'MemoryPipeline':
+        return MemoryPipeline(self)
+
+    def execute_pipeline(self, calls: List[Tuple[str, Tuple[Any, ...]]]) -> List[Any]:
+        self._round_trip()
+        self._pipelined.active = True
+        try:
+            return [getattr(self, name)(*args) for name, args in calls]
+        finally:
+            self._pipelined.active = False
+
+    def _append(self, *args: Any) -> None:
+        if self._appendonly:
+            # The command is appended as it was sent: *<count> and $<length> <value> for every argument
+            encoded = [str(arg).encode() for arg in args]
+            size = len(f'*{len(encoded)}\r\n') + sum(len(f'${len(arg)}\r\n\r\n') + len(arg) for arg in encoded)
+            with self._lock:
+                self.written_bytes += size
+
+    def _snapshot(self) -> int:
+        with self._lock:
+            size = len(json.dumps(self._data, default=sorted))
+            self.written_bytes += size
+            self.saves += 1
+        return size
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {'appendonly': self._appendonly, 'saves': self.saves, 'written_bytes': self.written_bytes}
+
+    def ping(self) -> bool:
+        return True
+
+    def config_get(self, pattern: str) -> Dict[str, str]:
+        self._op('config_get')
+        settings = {'appendonly': 'yes' if self._appendonly else 'no', 'appendfsync': 'everysec'}
+        return {pattern: settings[pattern]} if pattern in settings else {}
+
+    def config_set(self, name: str, value: str) -> bool:
+        self._op('config_set')
+        if name == 'appendonly':
+            self._appendonly = value == 'yes'
+        return True
+
+    def get(self, name: str) -> Optional[str]:
+        self._op('get')
+        with self._lock:
+            return self._data.get(name)
+
+    def set(self, name: str, value: Any, nx: bool = False) -> Optional[bool]:
+        self._op('set')
+        self._append('set', name, value)
+        with self._lock:
+            if nx and name in self._data:
+                return None
+            self._data[name] = str(value)
+            return True
+
+    def hset(self, name: str, key: str, value: Any) -> int:
+        self._op('hset')
+        self._append('hset', name, key, value)
+        with self._lock:
+            self._data.setdefault(name, {})[key] = str(value)
+            return 1
+
+    def hmset(self, name: str, mapping: Dict[str, Any]) -> bool:
+        self._op('hmset')
+        self._append('hmset', name, *(item for pair in mapping.items() for item in pair))
+        with self._lock:
+            self._data.setdefault(name, {}).update({key: str(value) for key, value in mapping.items()})
+            return True
+
+    def hget(self, name: str, key: str) -> Optional[str]:
+        self._op('hget')
+        with self._lock:
+            return self._data.get(name, {}).get(key)
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        self._op('hgetall')
+        with self._lock:
+            return dict(self._data.get(name, {}))
+
+    def sadd(self, name: str, *values: Any) -> int:
+        self._op('sadd')
+        self._append('sadd', name, *values)
+        with self._lock:
+            members = self._data.setdefault(name, set())
+            added = len({str(value) for value in values} - members)
+            members.update(str(value) for value in values)
+            return added
+
+    def smembers(self, name: str) -> Set[str]:
+        self._op('smembers')
+        with self._lock:
+            return set(self._data.get(name, set()))
+
+    def rpush(self, name: str, *values: Any) -> int:
+        self._op('rpush')
+        self._append('rpush', name, *values)
+        with self._lock:
+            items = self._data.setdefault(name, [])
+            items.extend(str(value) for value in values)
+            return len(items)
+
+    def lrange(self, name: str, start: int, end: int) -> List[str]:
+        self._op('lrange')
+        with self._lock:
+            items = self._data.get(name, [])
+            return items[start:] if end == -1 else items[start:end + 1]
+
+    def exists(self, *names: str) -> int:
+        self._op('exists')
+        with self._lock:
+            return sum(name in self._data for name in names)
+
+    def delete(self, *names: str) -> int:
+        self._op('delete')
+        self._append('del', *names)
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def xadd(self, name: str, fields: Dict[str, Any], maxlen: Optional[int] = None, approximate: bool = True) -> str:
+        self._op('xadd')
+        self._append('xadd', name, '*', *(item for pair in fields.items() for item in pair))
+        with self._lock:
+            entries = self._data.setdefault(name, [])
+            entry_id = f'{self.ops}-0'
+            entries.append((entry_id, {key: str(value) for key, value in fields.items()}))
+            if maxlen is not None and len(entries) > maxlen:
+                del entries[:len(entries) - maxlen]
+            return entry_id
+
+    def xtrim(self, name: str, maxlen: Optional[int] = None, approximate: bool = True, minid: Optional[str] = None,
+              limit: Optional[int] = None) -> int:
+        self._op('xtrim')
+        self._append('xtrim', name, 'MINID', minid or '0')
+        with self._lock:
+            entries = self._data.get(name, [])
+            kept = [(entry_id, fields) for entry_id, fields in entries
+                    if tuple(map(int, entry_id.split('-'))) >= tuple(map(int, (minid or '0-0').split('-')))]
+            self._data[name] = kept
+            return len(entries) - len(kept)
+
+    def xrange(self, name: str, min: str = '-', max: str = '+') -> List[Tuple[str, Dict[str, str]]]:
+        self._op('xrange')
+        with self._lock:
+            return list(self._data.get(name, []))
+
+    def save(self) -> bool:
+        self._op('save')
+        time.sleep(self._storage.write_seconds(self._snapshot()))
+        return True
+
+    def bgsave(self) -> bool:
+        # The forked child writes the snapshot, the caller does not wait for it
+        self._op('bgsave')
+        self._snapshot()
+        return True
+
+
+class MemoryPipeline:
+    """Queues the commands and runs them in a single round trip on execute"""
+    def __init__(self, store: MemoryRedis) -> None:
+        self._store: MemoryRedis = store
+        self._calls: List[Tuple[str, Tuple[Any, ...]]] = []
+
+    def __getattr__(self, name: str) -> Callable[..., 'MemoryPipeline']:
+        def queue(*args: Any) -> 'MemoryPipeline':
+            self._calls.append((name, args))
+            return self
+        return queue
+
+    def execute(self) -> List[Any]:
+        calls, self._calls = self._calls, []
+        return self._store.execute_pipeline(calls)
+
+
+class StubMQTT:
+    """MQTT transport without broker. Outbound messages still go through the MqttPublisher workers,
+        camera commands are answered on the matching feedback topic like the camera services do.
+    """
+    CAMERA_COMMANDS = re.compile(r'rc/(?P<stage>[^/]+)/robots/(?P<robot>[^/]+)/cameras/(?P<view>[^/]+)/cmds')
+
+    def __init__(self, logger: Logger, publish_latency_ms: float = 0.0, camera_capture_ms: float = 50.0,
+                 camera_upload_ms: float = 200.0) -> None:
+        self._subscriptions: Dict[str, Callable[..., None]] = {}
+        self._publish_latency: float = publish_latency_ms / 1000
+        self._camera_capture: float = camera_capture_ms / 1000
+        self._camera_upload: float = camera_upload_ms / 1000
+        self._publisher: MqttPublisher = MqttPublisher(self._publish, logger)
+        self.sent: int = 0
+
+    def subscribe(self, topic_name: str, callback: Callable[..., None]) -> None:
+        self._subscriptions[topic_name] = callback
+
+    def send(self, topic_name: str, data: str, durable: bool = False) -> None:
+        self._publisher.submit(topic_name, data)
+
+    def deliver(self, topic_name: str, data: str) -> None:
+        """Hand an inbound message to its subscriber, like the broker callback"""
+        self._subscriptions[topic_name](topic_name, data)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._publisher.get_metrics()
+
+    def _publish(self, topic_name: str, data: str) -> Future:
+        if self._publish_latency:
+            time.sleep(self._publish_latency)
+        self.sent += 1
+        match = StubMQTT.CAMERA_COMMANDS.fullmatch(topic_name)
+        if match:
+            self._answer_camera(topic_name[:-len('cmds')] + 'feedback', json.loads(data))
+        published: Future = Future()
+        published.set_result({})
+        return published
+
+    def _answer_camera(self, feedback_topic: str, command: Dict[str, Any]) -> None:
+        reply = {'instructionId': command['instructionId'], 'requestId': command['requestId']}
+        if command.get('ackOnCapture', False):
+            captured = {**reply, 'instructionStatus': CAPTURED_STATUS, 'message': 'captured'}
+            self._later(self._camera_capture, feedback_topic, captured)
+        self._later(self._camera_capture + self._camera_upload if command['Str'] == 'take_image' else 0,
+                    feedback_topic, {**reply, 'instructionStatus': 'SUCCESSFUL', 'message': 'ok'})
+
+    def _later(self, delay: float, topic_name: str, reply: Dict[str, Any]) -> None:
+        timer = Timer(delay, self.deliver, [topic_name, json.dumps(reply)])
+        timer.daemon = True
+        timer.start()
+
+
+class Profiler:
+    """Exclusive time per category: time spent in a nested instrumented call is only counted for the inner one"""
+    def __init__(self) -> None:
+        self._local = local()
+        self._lock = Lock()
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+    def instrument(self, target: Any, category: str, names: List[str]) -> None:
+        for name in names:
+            setattr(target, name, self._timed(category, getattr(target, name)))
+
+    def _timed(self, category: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(function)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            stack: List[float] = self._local.__dict__.setdefault('stack', [])
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with self._lock:
+                    self.seconds[category] = self.seconds.get(category, 0.0) + elapsed - nested
+                    self.calls[category] = self.calls.get(category, 0) + 1
+        return timed
+
+
+class ThroughputBenchmark:
+    """Drives an ActionManager with recorded instructions, one instruction at a time, against the firmware
+        simulator, an in-memory Redis and a broker-less MQTT and measures where the time goes.
+    """
+    def __init__(self, workdir: str, time_scale: float = 0.01, serial_latency_ms: float = 2.0,
+                 serial_jitter_ms: float = 0.5, redis_latency_ms: float = 0.0, mqtt_latency_ms: float = 0.0,
+                 camera_capture_ms: float = 50.0, camera_upload_ms: float = 200.0,
+                 config_overrides: Optional[Dict[str, str]] = None, storage: Optional[StorageProfile] = None,
+                 redis_store: Optional[MemoryRedis] = None) -> None:
+        self.settings: Dict[str, Any] = {'time_scale': time_scale, 'serial_latency_ms': serial_latency_ms,
+                                         'serial_jitter_ms': serial_jitter_ms, 'redis_latency_ms': redis_latency_ms,
+                                         'mqtt_latency_ms': mqtt_latency_ms, 'camera_capture_ms': camera_capture_ms,
+                                         'camera_upload_ms': camera_upload_ms, 'config': config_overrides or {}}
+        latency = LatencyProfile(serial_latency_ms, serial_jitter_ms)
+        self.simulator = FirmwareSimulator(f'{workdir}/tty', latency=latency, time_scale=time_scale)
+        options = {'robot_id': '2001', 'farm_id': '4001', 'serial_name_pattern': self.simulator.pattern,
+                   'serial_timeout_right': '300', 'serial_timeout_left': '300', 'log_level_terminal': '30',
+                   'log_level_file': '20', 'idle_time_sec': '3600', **(config_overrides or {})}
+        with open(f'{workdir}/bot_benchmark.config', 'w') as config_file:
+            config_file.writelines(f'{key}: {value}\n' for key, value in options.items())
+        with open(f'{workdir}/error_codes.txt', 'w') as errors_file:
+            errors_file.write('Number,Task,Description\n')
+        os.makedirs(f'{workdir}/logs', exist_ok=True)
+        self.config = Config(workdir, 'bot_benchmark.config', 'benchmark')
+        self.logger = Logger(self.config)
+
+        self.profiler = Profiler()
+        self.serial = SerialManager(self.config, self.logger, FirmwareErrorInfo(f'{workdir}/error_codes.txt'))
+        self.mqtt = StubMQTT(self.logger, mqtt_latency_ms, camera_capture_ms, camera_upload_ms)
+        # The store of an earlier run starts the robot like a reboot with the data redis kept
+        self.redis_store = redis_store or MemoryRedis(redis_latency_ms, storage)
+        with mock.patch.object(redis, 'StrictRedis', self.redis_store.connect):
+            self.redis = Redis(0, self.config, self.logger)
+        self._instrument()
+
+        self.action_manager = ActionManager(self.serial, self.mqtt, self.redis, self.config, self.logger)
+        self._done = Condition()
+        self._completed: int = 0
+        self.command_seconds: Dict[str, List[float]] = {}
+        self.instruction_seconds: Dict[str, List[float]] = {}
+        resolver = self.action_manager._resolver
+        for code, command in resolver.items():
+            resolver[code] = self._measured(COMMAND_NAMES.get(code, str(code)), command)
+        self.action_manager.start_handling_instructions()
+
+    def _instrument(self) -> None:
+        self.profiler.instrument(self.serial, 'serial', ['send', 'receive'])
+        self.profiler.instrument(self.redis, 'redis', [name for name in dir(self.redis) if not name.startswith('_')
+                                                       and name not in ('get_redis', 'get_metrics')])
+        self.profiler.instrument(self.logger, 'logging', ['create_event', 'add_to_event',
+                                                          'prepare_listitem_for_event', 'add_listitem_to_event',
+                                                          'send_event', 'log_system'])
+        self.profiler.instrument(self.mqtt, 'mqtt', ['send'])
+
+    def _measured(self, name: str, command: Callable[..., bool]) -> Callable[..., bool]:
+        def measured(*args: Any, **kwargs: Any) -> bool:
+            start = time.perf_counter()
+            try:
+                return command(*args, **kwargs)
+            finally:
+                self.command_seconds.setdefault(name, []).append(time.perf_counter() - start)
+                with self._done:
+                    self._completed += 1
+                    self._done.notify_all()
+        return measured
+
+    def run(self, instructions: List[Dict[str, Any]], repetitions: int = 10, timeout: float = 600) -> Dict[str, Any]:
+        topic = f'rc/{self.config.stage}/robots/{self.config.robot_id}/cmds'
+        profiled_before = dict(self.profiler.seconds)
+        commands = 0
+        start = time.perf_counter()
+        for repetition in range(repetitions):
+            for number, recorded in enumerate(instructions):
+                payload = copy.deepcopy(recorded)
+                payload['Instruction']['instructionId'] = f'benchmark-{repetition}-{number}'
+                with self._done:
+                    target = self._completed + len(payload['Commands'])
+                sent_at = time.perf_counter()
+                self.mqtt.deliver(topic, json.dumps(payload))
+                with self._done:
+                    if not self._done.wait_for(lambda: self._completed >= target, timeout):
+                        raise TimeoutError(f"Instruction {payload['Instruction']['instructionId']} did not finish")
+                self.instruction_seconds.setdefault(payload['Instruction']['type'], []) \
+                    .append(time.perf_counter() - sent_at)
+                commands += len(payload['Commands'])
+        elapsed = time.perf_counter() - start
+
+        instruction_count = repetitions * len(instructions)
+        command_total = sum(sum(seconds) for seconds in self.command_seconds.values())
+        time_split = {category: seconds - profiled_before.get(category, 0.0)
+                      for category, seconds in self.profiler.seconds.items()}
+        time_split['other'] = max(0.0, command_total - sum(time_split.values()))
+        return {'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+                         'repetitions': repetitions, **self.settings},
+                'throughput': {'elapsed_sec': elapsed,
+                               'instructions': instruction_count,
+                               'commands': commands,
+                               'instructions_per_hour': instruction_count / elapsed * 3600 if elapsed else 0.0,
+                               'commands_per_sec': commands / elapsed if elapsed else 0.0},
+                'commands': {name: summarize(seconds) for name, seconds in sorted(self.command_seconds.items())},
+                'instructions': {name: summarize(seconds)
+                                 for name, seconds in sorted(self.instruction_seconds.items())},
+                'time_split_sec': time_split,
+                'calls': dict(self.profiler.calls),
+                'redis_ops': self.redis_store.ops,
+                'redis': self.redis.get_metrics(),
+                'redis_storage': self.redis_store.get_metrics(),
+                'queue_latency': self.action_manager._queue.latency.snapshot(),
+                'mqtt': self.mqtt.get_metrics(),
+                'log_queue': self.logger.get_metrics(),
+                'scheduler': get_scheduler().get_metrics()}
+
+    def stop(self) -> None:
+        self.simulator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure instruction throughput of the robot brain against '
+                                                 'simulated hardware and print the results as JSON')
+    parser.add_argument('--repetitions', type=int, default=10)
+    parser.add_argument('--instructions', default=None, help='JSON file with a list of recorded instructions')
+    parser.add_argument('--time-scale', type=float, default=0.01, help='Scale of simulated movement time')
+    parser.add_argument('--serial-latency-ms', type=float, default=2.0)
+    parser.add_argument('--serial-jitter-ms', type=float, default=0.5)
+    parser.add_argument('--redis-latency-ms', type=float, default=0.0)
+    parser.add_argument('--sd-sync-ms', type=float, default=20.0, help='Fixed cost of a synced write to the SD card')
+    parser.add_argument('--sd-write-mb-per-sec', type=float, default=10.0)
+    parser.add_argument('--mqtt-latency-ms', type=float, default=0.0)
+    parser.add_argument('--camera-capture-ms', type=float, default=50.0)
+    parser.add_argument('--camera-upload-ms', type=float, default=200.0)
+    parser.add_argument('--set', action='append', default=[], metavar='OPTION=VALUE',
+                        help='Overwrite a bot config option, e.g. --set camera_async_capture=True')
+    parser.add_argument('--output', default=None, help='Write the results to this file instead of stdout')
+    args = parser.parse_args()
+
+    instructions = RECORDED_INSTRUCTIONS
+    if args.instructions:
+        with open(args.instructions) as instructions_file:
+            instructions = json.load(instructions_file)
+
+    # stdout is reserved for the results
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(sys.stderr):
+        benchmark = ThroughputBenchmark(workdir, args.time_scale, args.serial_latency_ms, args.serial_jitter_ms,
+                                        args.redis_latency_ms, args.mqtt_latency_ms, args.camera_capture_ms,
+                                        args.camera_upload_ms, dict(option.split('=', 1) for option in args.set),
+                                        StorageProfile(args.sd_sync_ms, args.sd_write_mb_per_sec))
+        try:
+            results = benchmark.run(instructions, args.repetitions)
+        finally:
+            benchmark.stop()
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+    else:
+        json.dump(results, sys.stdout, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+from typing import Any, Dict
+import argparse
+import contextlib
+import json
+import sys
+import tempfile
+
+from common.enums import DurabilityMode
+from simulator.benchmark import RECORDED_INSTRUCTIONS, StorageProfile, ThroughputBenchmark
+
+
+def measure(mode: DurabilityMode, repetitions: int, storage: StorageProfile, time_scale: float) -> Dict[str, Any]:
+    """Runs the recorded instructions with one durability mode against the in-memory redis"""
+    with tempfile.TemporaryDirectory() as workdir:
+        benchmark = ThroughputBenchmark(workdir, time_scale, config_overrides={'redis_durability': mode.value,
+                                                                               'redis_save_debounce_sec': '0.2'},
+                                        storage=storage)
+        try:
+            results = benchmark.run(RECORDED_INSTRUCTIONS, repetitions)
+        finally:
+            benchmark.stop()
+    return {'commands': results['commands'],
+            'instructions_per_hour': results['throughput']['instructions_per_hour'],
+            'redis_time_sec': results['time_split_sec'].get('redis', 0.0),
+            'storage': results['redis_storage']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare command latency and SD card writes of the redis '
+                                                 'durability modes and print the results as JSON')
+    parser.add_argument('--modes', nargs='+', default=[mode.value for mode in DurabilityMode],
+                        choices=[mode.value for mode in DurabilityMode])
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--time-scale', type=float, default=0.01)
+    parser.add_argument('--sd-sync-ms', type=float, default=20.0)
+    parser.add_argument('--sd-write-mb-per-sec', type=float, default=10.0)
+    args = parser.parse_args()
+
+    storage = StorageProfile(args.sd_sync_ms, args.sd_write_mb_per_sec)
+    # stdout is reserved for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        results = {mode: measure(DurabilityMode(mode), args.repetitions, storage, args.time_scale)
+                   for mode in args.modes}
+    json.dump(results, sys.stdout, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+from typing import Dict, List, Optional, Tuple
+import argparse
+import csv
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+RIGHT_BOARD: int = 1
+LEFT_BOARD: int = 2
+ERROR_CODE: int = 5
+
+# Number of bytes of every command, the firmware has no delimiter. Codes not listed take the rest of the chunk.
+COMMAND_LENGTHS: Dict[int, int] = {0: 8, 1: 1, 2: 7, 3: 2, 6: 1, 7: 8, 9: 1, 14: 1, 15: 1, 16: 1, 21: 7, 22: 1}
+
+
+class LatencyProfile:
+    """Answer latency of a board: a gaussian around base_ms, never below zero"""
+    def __init__(self, base_ms: float = 5, jitter_ms: float = 2) -> None:
+        self.base_ms: float = base_ms
+        self.jitter_ms: float = jitter_ms
+
+    def sample(self) -> float:
+        return max(0.0, random.gauss(self.base_ms, self.jitter_ms)) / 1000
+
+
+class MachineState:
+    """Physical state shared by both simulated boards"""
+    def __init__(self, axis_speeds: Dict[str, float], rfid: str = 'te.st.01.02', tank_level: int = 40,
+                 weight: int = 1500) -> None:
+        self.lock = threading.Lock()
+        self.position: Dict[str, int] = {'x': 0, 'y': 0, 'z': 0}
+        self.axis_speeds: Dict[str, float] = axis_speeds  # units per second at speed 100
+        self.rfid: str = rfid
+        self.tank_level: int = tank_level
+        self.weight: int = weight
+
+    def travel_time(self, axis: str, target: int, speed: int) -> float:
+        return abs(target - self.position[axis]) / (self.axis_speeds[axis] * max(speed, 1) / 100)
+
+
+class ErrorInjector:
+    """Answers a share of the commands with a random firmware error taken from error_codes.txt"""
+    def __init__(self, error_rate: float = 0.0, errors_file: Optional[str] = None) -> None:
+        self.error_rate: float = error_rate
+        self.error_codes: List[int] = []
+        if errors_file:
+            with open(errors_file) as csv_file:
+                self.error_codes = [int(row['Number']) for row in csv.DictReader(csv_file)
+                                    if row['Number'].startswith(('5', '6'))]
+
+    def next_error(self) -> Optional[int]:
+        if self.error_codes and random.random() < self.error_rate:
+            return random.choice(self.error_codes)
+        return None
+
+
+class SimulatedBoard:
+    """One USB board behind a pseudo terminal. The right board drives x, the left board y, both drive z."""
+    def __init__(self, board: int, machine: MachineState, latency: LatencyProfile, errors: ErrorInjector,
+                 time_scale: float = 1.0) -> None:
+        self.board: int = board
+        self.side: str = 'Right' if board == RIGHT_BOARD else 'Left'
+        self.axis: str = 'x' if board == RIGHT_BOARD else 'y'
+        self._machine: MachineState = machine
+        self._latency: LatencyProfile = latency
+        self._errors: ErrorInjector = errors
+        self._time_scale: float = time_scale
+        self._master, slave = os.openpty()
+        tty.setraw(slave)
+        self.tty: str = os.ttyname(slave)
+        self._slave: int = slave
+        self._running: bool = True
+        self.commands: int = 0
+        self._thread = threading.Thread(target=self._serve, daemon=True, name=f'sim-{self.side.lower()}')
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        self._thread.join(timeout=1)
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _serve(self) -> None:
+        while self._running:
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                chunk = os.read(self._master, 1024)
+            except OSError:
+                return
+            for message in self._split(list(chunk)):
+                reply = self._answer(message)
+                os.write(self._master, reply.encode('utf-8') + b'\r\n')
+
+    @staticmethod
+    def _split(chunk: List[int]) -> List[List[int]]:
+        messages: List[List[int]] = []
+        while chunk:
+            length = COMMAND_LENGTHS.get(chunk[0], len(chunk))
+            messages.append(chunk[:length])
+            chunk = chunk[length:]
+        return messages
+
+    def _wait(self, seconds: float) -> None:
+        # time_scale only shortens movements and pauses, the answer latency stays realistic
+        time.sleep(seconds * self._time_scale + self._latency.sample())
+
+    def _answer(self, message: List[int]) -> str:
+        code = message[0]
+        if code == 14:
+            self._wait(0)
+            return f'Side: {self.side} version: simulator'
+        self.commands += 1
+        error = self._errors.next_error()
+        if error is not None:
+            self._wait(0)
+            return f'{ERROR_CODE} {self.board} {error}'
+        fields = self._execute(code, message + [0] * 8)
+        return ' '.join(str(field) for field in [code, self.board] + fields)
+
+    def _execute(self, code: int, args: List[int]) -> List[object]:
+        machine = self._machine
+        if code == 0:  # move
+            target = {'x': args[1] + args[2] * 256, 'y': args[3] + args[4] * 256, 'z': args[5] + args[6] * 256}
+            return self._move({self.axis: target[self.axis], 'z': target['z']}, args[7])
+        if code == 7:  # home, flags at the x, y and z positions
+            axes = {'x': args[1], 'y': args[3], 'z': args[5]}
+            return self._move({axis: 0 for axis, flag in axes.items() if flag and axis in (self.axis, 'z')}, args[7])
+        if code == 3:  # pause
+            self._wait(args[1])
+            return []
+        self._wait(0)
+        with machine.lock:
+            if code == 9:
+                return [machine.position[self.axis], machine.position['z']]
+            if code == 1:
+                return [machine.weight // 2 + random.randint(-5, 5)]
+            if code == 16:
+                return [machine.tank_level] if self.board == RIGHT_BOARD else []
+            if code == 6:
+                return [machine.rfid if self.board == LEFT_BOARD else 0]
+            if code == 2:
+                machine.tank_level = min(100, machine.tank_level + 3)
+            if code == 20:
+                machine.tank_level = 20
+        return []
+
+    def _move(self, targets: Dict[str, int], speed: int) -> List[object]:
+        with self._machine.lock:
+            duration = max([self._machine.travel_time(axis, target, speed) for axis, target in targets.items()],
+                           default=0.0)
+        self._wait(duration)
+        with self._machine.lock:
+            self._machine.position.update(targets)
+        return []
+
+
+class FirmwareSimulator:
+    """Two simulated boards on pseudo terminals, reachable under links_dir/ttyUSB0 and links_dir/ttyUSB1.
+        Point serial_name_pattern to links_dir/ttyUSB* to run the unmodified SerialManager against it.
+    """
+    def __init__(self, links_dir: str, axis_speeds: Optional[Dict[str, float]] = None,
+                 latency: Optional[LatencyProfile] = None, error_rate: float = 0.0,
+                 errors_file: Optional[str] = None, time_scale: float = 1.0, swap_ports: bool = False) -> None:
+        self.machine = MachineState(axis_speeds or {'x': 400.0, 'y': 400.0, 'z': 200.0})
+        errors = ErrorInjector(error_rate, errors_file)
+        self.right = SimulatedBoard(RIGHT_BOARD, self.machine, latency or LatencyProfile(), errors, time_scale)
+        self.left = SimulatedBoard(LEFT_BOARD, self.machine, latency or LatencyProfile(), errors, time_scale)
+
+        os.makedirs(links_dir, exist_ok=True)
+        self.pattern: str = os.path.join(links_dir, 'ttyUSB*')
+        boards: Tuple[SimulatedBoard, SimulatedBoard] = (self.left, self.right) if swap_ports \
+            else (self.right, self.left)
+        self._links: List[str] = []
+        for index, board in enumerate(boards):
+            link = os.path.join(links_dir, f'ttyUSB{index}')
+            if os.path.lexists(link):
+                os.remove(link)
+            os.symlink(board.tty, link)
+            self._links.append(link)
+
+    def stop(self) -> None:
+        for link in self._links:
+            if os.path.lexists(link):
+                os.remove(link)
+        self.right.stop()
+        self.left.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate the two robot USB boards on pseudo terminals')
+    parser.add_argument('--links-dir', default='/tmp/robot-sim')
+    parser.add_argument('--speed-x', type=float, default=400.0)
+    parser.add_argument('--speed-y', type=float, default=400.0)
+    parser.add_argument('--speed-z', type=float, default=200.0)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--jitter-ms', type=float, default=2.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-codes', default=None)
+    parser.add_argument('--time-scale', type=float, default=1.0)
+    args = parser.parse_args()
+
+    simulator = FirmwareSimulator(args.links_dir, {'x': args.speed_x, 'y': args.speed_y, 'z': args.speed_z},
+                                  LatencyProfile(args.latency_ms, args.jitter_ms), args.error_rate, args.error_codes,
+                                  args.time_scale)
+    print(f'Simulating boards under {simulator.pattern} (serial_name_pattern)')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import sys
+import time
+
+from common.log_event import LogEvent, LogEventSerializer
+
+
+class RebuildingLogEvent:
+    """The former LogEvent: every update rebuilds the dict and a persist encodes the whole event"""
+    def __init__(self, message: str, **kwargs: Any) -> None:
+        self._dict: Dict[str, Any] = {'message': message, **kwargs}
+        self._cached_item: Dict[str, Any] = {}
+
+    def add(self, **kwargs: Any) -> None:
+        self._dict = {**self._dict, **kwargs}
+
+    def add_to_cached_item(self, **kwargs: Any) -> None:
+        self._cached_item = {**self._cached_item, **kwargs}
+
+    def add_cached_item_to_key(self, key: str) -> None:
+        if key in self._dict:
+            self._dict[key].append(self._cached_item)
+        else:
+            self._dict[key] = [self._cached_item]
+        self._cached_item = {}
+
+
+def run_commands(event: Any, persist: Callable[[], Any], entries: int) -> float:
+    """Time of an instruction with `entries` serial exchanges, the event is persisted after each of them"""
+    start = time.perf_counter()
+    for number in range(entries):
+        event.add_to_cached_item(serial_in=str([0, number % 256, 1, 44, 1, 0, 0, 80]))
+        event.add_to_cached_item(serial_out_right=f"b'0 1 {number}\\r\\n'")
+        event.add_to_cached_item(serial_out_left=f"b'0 2 {number}\\r\\n'")
+        event.add_cached_item_to_key('serial')
+        event.add(pre_weight=number, post_weight=number + 1)
+        persist()
+    return time.perf_counter() - start
+
+
+def compare(entries: int) -> Dict[str, float]:
+    legacy = RebuildingLogEvent('benchmark', id='instruction-1', type='WATER')
+    legacy_seconds = run_commands(legacy, lambda: json.dumps(legacy._dict), entries)
+
+    event = LogEvent('benchmark', id='instruction-1', type='WATER')
+    serializer = LogEventSerializer()
+    incremental_seconds = run_commands(event, lambda: serializer.encode(event), entries)
+
+    return {'entries': entries,
+            'rebuild_full_dump_ms': legacy_seconds * 1000,
+            'in_place_incremental_ms': incremental_seconds * 1000,
+            'speedup': legacy_seconds / incremental_seconds if incremental_seconds else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the cost of growing and persisting log events')
+    parser.add_argument('--entries', type=int, nargs='+', default=[10, 100, 300, 1000])
+    args = parser.parse_args()
+
+    results: List[Dict[str, float]] = [compare(entries) for entries in args.entries]
+    json.dump(results, sys.stdout, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import json
+import sys
+import time
+
+from model.firmware_reply import FirmwareReply
+
+# One recorded exchange per probe: the left and the right answer line
+RECORDED_REPLIES: Dict[str, Tuple[bytes, bytes]] = {
+    'position': (b'9 2 4520 30\r\n', b'9 1 12034 30\r\n'),
+    'water_level': (b'16 2\r\n', b'16 1 56\r\n'),
+    'weight': (b'1 2 812.5\r\n', b'1 1 904.25\r\n'),
+    'rfid': (b'6 2 te.st.01.02\r\n', b'6 1 0\r\n'),
+    'error': (b'5 2 50023\r\n', b'9 1 12034 30\r\n'),
+}
+
+
+def is_integer(n: bytes) -> bool:
+    try:
+        int(n)
+        return True
+    except ValueError:
+        return False
+
+
+def split_and_decode(left_line: bytes, right_line: bytes) -> None:
+    """What a command did before with an answer: split it, check it, decode it for the log and convert fields"""
+    left, right = left_line.split(b' '), right_line.split(b' ')
+    if (left == [b''] or right == [b'']
+            or (is_integer(left[0]) and int(left[0]) == 5)
+            or (is_integer(right[0]) and int(right[0]) == 5)):
+        return
+    answer = {'Left': [x.decode('utf-8') for x in left], 'Right': [x.decode('utf-8') for x in right]}
+    code = int(answer['Right'][0])
+    if code == 9:
+        int(right[2]), int(left[2]), int(right[3]), int(left[3])
+    elif code == 16:
+        int(answer['Right'][2])
+    elif code == 1:
+        float(left[2]) + float(right[2])
+    elif code == 6:
+        bytes(left[2]).decode('utf-8').strip()
+
+
+def parse_once(left_line: bytes, right_line: bytes) -> None:
+    """Every line is parsed once by the serial layer, the commands read the converted fields"""
+    left, right = FirmwareReply(left_line, 'left'), FirmwareReply(right_line, 'right')
+    if not (left.ok and right.ok):
+        return
+    {'Left': left.get_texts(), 'Right': right.get_texts()}  # decoded for the log
+    code = right.code
+    if code == 9:
+        right.get_int(2), left.get_int(2), right.get_int(3), left.get_int(3)
+    elif code == 16:
+        right.get_int(2)
+    elif code == 1:
+        left.get_float(2) + right.get_float(2)
+    elif code == 6:
+        left.get_text(2)
+
+
+def measure(handle: Callable[[bytes, bytes], None], exchanges: List[Tuple[bytes, bytes]], rounds: int,
+            repeats: int) -> float:
+    """Best of the repeats, the others are slowed down by the rest of the system"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for left_line, right_line in exchanges:
+                handle(left_line, right_line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare_exchanges(exchanges: List[Tuple[bytes, bytes]], rounds: int, repeats: int) -> Dict[str, float]:
+    count = rounds * len(exchanges)
+    legacy_seconds = measure(split_and_decode, exchanges, rounds, repeats)
+    parsed_seconds = measure(parse_once, exchanges, rounds, repeats)
+    return {'split_and_decode_us_per_exchange': legacy_seconds / count * 1e6,
+            'parse_once_us_per_exchange': parsed_seconds / count * 1e6,
+            'speedup': legacy_seconds / parsed_seconds if parsed_seconds else 0.0}
+
+
+def compare(rounds: int, repeats: int) -> Dict[str, Any]:
+    """All recorded answers mixed, and every kind of answer on its own"""
+    return {'exchanges': rounds * len(RECORDED_REPLIES),
+            'all': compare_exchanges(list(RECORDED_REPLIES.values()), rounds, repeats),
+            'by_answer': {name: compare_exchanges([exchange], rounds, repeats)
+                          for name, exchange in RECORDED_REPLIES.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the cost of handling firmware replies')
+    parser.add_argument('--rounds', type=int, default=20000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    json.dump(compare(args.rounds, args.repeats), sys.stdout, indent=4)
+
+
+if __name__ == '__main__':
+    main()
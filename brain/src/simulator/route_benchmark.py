@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Tuple
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+
+from actions.instruction_compiler import InstructionCompiler
+from actions.route_planner import RoutePlanner, Stop, route_cost, travel_cost
+from simulator.benchmark import RECORDED_INSTRUCTIONS, percentile
+
+BATCH_TYPES = ['WATER', 'PHOTO', 'VALIDATE']
+# Slots of the simulated farm: gutters along x, layers along y
+GUTTERS = [272 + 350 * gutter for gutter in range(8)]
+LAYERS = [44 + 300 * layer for layer in range(5)]
+
+
+def record_batch(size: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """A batch as the gateway sends it: recorded instructions of the batch types for random slots, some slots get
+        more than one instruction
+    """
+    templates = {instruction['Instruction']['type']: instruction for instruction in RECORDED_INSTRUCTIONS}
+    slots = [(rng.choice(GUTTERS), rng.choice(LAYERS)) for _ in range(max(1, size * 3 // 4))]
+    batch = []
+    for index in range(size):
+        instruction = copy.deepcopy(templates[rng.choice(BATCH_TYPES)])
+        x, y = rng.choice(slots)
+        instruction['Instruction'].update({'instructionId': f'batch-{index}', 'cellId': x, 'layerId': y,
+                                           'slotId': 1})
+        instruction['Commands'][0]['Str'] = f'0 {x % 256} {x // 256} {y % 256} {y // 256} 0 0 80'
+        batch.append(instruction)
+    return batch
+
+
+def measure(batch: List[Dict[str, Any]], speeds: Tuple[float, float], max_stops: int) -> Dict[str, Any]:
+    """Travel between the slots in arrival order against the order the planner hands the instructions out in"""
+    compiler = InstructionCompiler([0, 1, 2, 6, 16, 21, 100, 101, 102, 105, 106, 107])
+    cost = travel_cost(*speeds)
+    planner = RoutePlanner(BATCH_TYPES, cost, max_stops=max_stops)
+    arrival = []
+    for index, instruction in enumerate(copy.deepcopy(batch)):
+        instruction, plan = compiler.compile(instruction)
+        planner.add(instruction, plan)
+        arrival.append(Stop(instruction, plan, index))
+
+    by_id = {stop.instruction['instructionId']: stop for stop in arrival}
+    planned: List[Stop] = []
+    position = (0, 0)
+    planning_ms: List[float] = []
+    while len(planner):
+        start = time.perf_counter()
+        instruction, _ = planner.next(position)  # type: ignore
+        planning_ms.append((time.perf_counter() - start) * 1000)
+        stop = by_id[instruction['instructionId']]
+        planned.append(stop)
+        if stop.point is not None and stop.point[0] is not None:
+            position = (stop.point[0], stop.point[1])
+
+    def travel(route: List[Stop]) -> Dict[str, float]:
+        x = y = 0
+        distance = {'x': 0, 'y': 0}
+        for stop in route:
+            if stop.point is None:
+                continue
+            distance['x'] += abs(stop.point[0] - x) if stop.point[0] is not None else 0
+            distance['y'] += abs(stop.point[1] - y)
+            x, y = stop.point[0] if stop.point[0] is not None else x, stop.point[1]
+        return {**distance, 'seconds': route_cost((0, 0), route, cost)}
+
+    return {'arrival_order': travel(arrival), 'planned': travel(planned),
+            'planning_ms': {'p50': percentile(planning_ms, 50), 'max': max(planning_ms)}}
+
+
+def compare(sizes: List[int], batches: int, seed: int, speeds: Tuple[float, float], max_stops: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    results: Dict[str, Any] = {}
+    for size in sizes:
+        runs = [measure(record_batch(size, rng), speeds, max_stops) for _ in range(batches)]
+        before = sum(run['arrival_order']['seconds'] for run in runs)
+        after = sum(run['planned']['seconds'] for run in runs)
+        results[str(size)] = {
+            'arrival_order': {axis: sum(run['arrival_order'][axis] for run in runs) / batches
+                              for axis in ('x', 'y', 'seconds')},
+            'planned': {axis: sum(run['planned'][axis] for run in runs) / batches for axis in ('x', 'y', 'seconds')},
+            'saved_percent': 100 * (before - after) / before if before else 0.0,
+            'planning_ms_max': max(run['planning_ms']['max'] for run in runs)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the travel between the slots of instruction batches in '
+                                                 'arrival order and in the order of the route planner')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 10, 20, 40])
+    parser.add_argument('--batches', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--speed-x', type=float, default=400.0)
+    parser.add_argument('--speed-y', type=float, default=400.0)
+    parser.add_argument('--max-stops', type=int, default=20)
+    args = parser.parse_args()
+
+    json.dump(compare(args.sizes, args.batches, args.seed, (args.speed_x, args.speed_y), args.max_stops),
+              sys.stdout, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# type: ignore
+import json
+import time
+import unittest
+from unittest import mock
+
+from actions.feedback.upload_tracker import UploadTracker
+from actions.memory import Memory
+from common.camera_rpc import CameraRPC
+
+
+@mock.patch('common.config.Config')
+@mock.patch('common.log_event.Logger')
+@mock.patch('common.mqtt_client.MQTT')
+@mock.patch('actions.feedback.feedback_manager.FeedbackManager')
+class UploadTrackerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.memory = Memory()
+        self.instruction = {'instructionId': 'instruction-1', 'type': 'PHOTO'}
+        self.action = {'Str': '101', 'NeedsFeedbackOnSuccess': True}
+
+    def test_given_a_captured_photo_when_the_upload_succeeds_then_success_is_reported(self, mock_feedback, mock_mqtt,
+                                                                                      mock_logger, mock_config):
+        rpc = CameraRPC(mock_mqtt, mock_logger, mock_config, 'top', 'TopCam')
+        tracker = UploadTracker(mock_feedback, self.memory, mock_logger, timeout=5)
+        request = rpc.send('instruction-1', 'take_image', ackOnCapture=True)
+        rpc._on_feedback('topic', json.dumps({'requestId': request.request_id, 'instructionStatus': 'CAPTURED'}))
+
+        tracker.track(rpc, request, self.instruction, self.action, 'HorizontalBotUploadTopCamError')
+        self.assertEqual(1, tracker.pending())
+        mock_feedback.send_to_gateway.assert_not_called()
+
+        rpc._on_feedback('topic', json.dumps({'requestId': request.request_id, 'instructionStatus': 'SUCCESSFUL'}))
+
+        self.assertEqual(0, tracker.pending())
+        self.assertEqual(1, tracker.uploaded)
+        mock_feedback.send_to_gateway.assert_called_once_with(self.instruction, self.action, self.memory,
+                                                              finish_instruction=False)
+
+    def test_given_a_captured_photo_when_no_upload_confirmation_arrives_then_a_failure_is_reported(
+            self, mock_feedback, mock_mqtt, mock_logger, mock_config):
+        rpc = CameraRPC(mock_mqtt, mock_logger, mock_config, 'top', 'TopCam')
+        tracker = UploadTracker(mock_feedback, self.memory, mock_logger, timeout=0.1)
+        request = rpc.send('instruction-1', 'take_image', ackOnCapture=True)
+
+        tracker.track(rpc, request, self.instruction, self.action, 'HorizontalBotUploadTopCamError')
+        time.sleep(0.3)
+
+        self.assertEqual(0, tracker.pending())
+        self.assertEqual(1, tracker.failed)
+        details = mock_feedback.send_to_gateway.call_args.args[3]
+        self.assertEqual('HorizontalBotUploadTopCamError', details['statusCode'])
+        self.assertFalse(mock_feedback.send_to_gateway.call_args.kwargs['finish_instruction'])
+
+    def test_given_an_ended_instruction_then_the_last_confirmed_upload_finishes_it(
+            self, mock_feedback, mock_mqtt, mock_logger, mock_config):
+        rpc = CameraRPC(mock_mqtt, mock_logger, mock_config, 'top', 'TopCam')
+        tracker = UploadTracker(mock_feedback, self.memory, mock_logger, timeout=5)
+        requests = [rpc.send('instruction-1', 'take_image', ackOnCapture=True) for _ in range(2)]
+        for request in requests:
+            tracker.track(rpc, request, self.instruction, self.action, 'HorizontalBotUploadTopCamError')
+        tracker.end_instruction(self.instruction)
+
+        for request in requests:
+            rpc._on_feedback('topic', json.dumps({'requestId': request.request_id,
+                                                  'instructionStatus': 'SUCCESSFUL'}))
+
+        self.assertEqual([False, True], [call.kwargs['finish_instruction']
+                                         for call in mock_feedback.send_to_gateway.call_args_list])
+
+    def test_given_an_upload_confirmed_before_it_is_tracked_then_the_end_of_the_instruction_finishes_it(
+            self, mock_feedback, mock_mqtt, mock_logger, mock_config):
+        rpc = CameraRPC(mock_mqtt, mock_logger, mock_config, 'top', 'TopCam')
+        tracker = UploadTracker(mock_feedback, self.memory, mock_logger, timeout=5)
+        request = rpc.send('instruction-1', 'take_image', ackOnCapture=True)
+        rpc._on_feedback('topic', json.dumps({'requestId': request.request_id, 'instructionStatus': 'SUCCESSFUL'}))
+
+        tracker.track(rpc, request, self.instruction, self.action, 'HorizontalBotUploadTopCamError')
+        self.assertFalse(mock_feedback.send_to_gateway.call_args.kwargs['finish_instruction'])
+        mock_feedback.finish_instruction.assert_not_called()
+
+        tracker.end_instruction(self.instruction)
+        mock_feedback.finish_instruction.assert_called_once_with()
+
+        tracker.end_instruction(self.instruction)
+        mock_feedback.finish_instruction.assert_called_once_with()
@@ -0,0 +1,53 @@
+# type: ignore
+import json
+import unittest
+
+from actions.action_journal import plan_recovery
+
+
+def accepted(instruction_id, *commands):
+    return {'event': 'instruction', 'id': instruction_id,
+            'instruction': json.dumps({'instructionId': instruction_id, 'type': 'WATER'}),
+            'commands': json.dumps([{'Str': command, 'opcode': int(command.split(' ')[0]), 'index': index}
+                                    for index, command in enumerate(commands)])}
+
+
+def started(instruction_id, index, position=''):
+    return {'event': 'start', 'id': instruction_id, 'index': str(index), 'position': position}
+
+
+class ActionJournalTest(unittest.TestCase):
+
+    def test_given_a_reboot_during_a_move_then_the_instruction_resumes_at_the_move(self):
+        recoveries = plan_recovery([accepted('a', '0 16 1 44 1 0 0 80', '1', '16'), started('a', 0),
+                                    started('a', 1, json.dumps({'x': 272, 'y': 300, 'z': 0})),
+                                    accepted('b', '1')])
+
+        self.assertEqual(['a', 'b'], [recovery.instruction['instructionId'] for recovery in recoveries])
+        self.assertFalse(recoveries[0].rollback)
+        self.assertEqual(['1', '16'], [command['Str'] for command in recoveries[0].get_remaining()])
+        self.assertEqual({'x': 272, 'y': 300, 'z': 0}, recoveries[0].position)
+        self.assertEqual(0, recoveries[1].start)
+
+    def test_given_a_reboot_while_watering_then_the_instruction_is_rolled_back(self):
+        recoveries = plan_recovery([accepted('a', '0 16 1 44 1 0 0 80', '2 0 0 1 1 1 1 1.0 400 300 1800', '16'),
+                                    started('a', 0), started('a', 1)])
+
+        self.assertTrue(recoveries[0].rollback)
+        self.assertEqual(1, recoveries[0].start)
+
+    def test_given_ended_cancelled_and_superseded_instructions_then_nothing_is_left_to_recover(self):
+        self.assertEqual([], plan_recovery([accepted('a', '1', '16'), started('a', 0), accepted('b', '1'),
+                                            started('b', 0), {'event': 'end', 'id': 'b'}]))
+        self.assertEqual([], plan_recovery([accepted('a', '1'), accepted('b', '1'), started('a', 0),
+                                            {'event': 'cancel'}]))
+
+    def test_given_instructions_held_by_the_route_planner_then_a_later_queued_one_does_not_end_them(self):
+        held = [dict(accepted(instruction_id, '0 16 1 44 1 0 0 80', '1'), queued='0') for instruction_id in 'abc']
+        recoveries = plan_recovery(held + [{'event': 'queued', 'id': 'c'}, started('c', 0),
+                                           {'event': 'end', 'id': 'c'}, {'event': 'queued', 'id': 'b'},
+                                           started('b', 1)])
+
+        self.assertEqual(['b', 'a'], [recovery.instruction['instructionId'] for recovery in recoveries])
+        self.assertTrue(recoveries[0].interrupted)
+        self.assertEqual((0, False), (recoveries[1].start, recoveries[1].queued))
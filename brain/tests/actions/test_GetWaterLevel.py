@@ -3,9 +3,11 @@ import unittest
 from unittest import mock
 from unittest.mock import call
 
+from actions.instruction_compiler import compile_command
 from actions.memory import Memory
 from actions.commands.get_water_level import GetWaterLevelCommand
 from common.enums import State
+from model.firmware_reply import FirmwareReply
 
 
 @mock.patch('common.serial_manager.SerialManager')
@@ -23,13 +25,13 @@ class GetWaterLevelCommandTest(unittest.TestCase):
 
     def test_send_serial_command(self, mock_serial, mock_feedback, mock_logger, mock_config, mock_redis):
         mock_serial.send.return_value = True
-        mock_serial.receive.return_value = ([b'16', b'2'], [b'16', b'1', b'32'])
+        mock_serial.receive.return_value = (FirmwareReply(b'16 2'), FirmwareReply(b'16 1 32'))
         mock_serial.is_ok.return_value = True
         mock_logger.add_to_event.return_value = True
         mock_redis.update_state.return_value = True
 
-        GetWaterLevelCommand.run({}, {'val': [16]}, self.noop_factory, mock_feedback, self.memory, mock_redis,
-                                 mock_serial, mock_config, mock_logger)
+        GetWaterLevelCommand.run({}, compile_command({'val': [16]}), self.noop_factory, mock_feedback, self.memory,
+                                 mock_redis, mock_serial, mock_config, mock_logger)
 
         mock_serial.send.assert_called_once_with([16])
         mock_serial.receive.assert_called_once()
@@ -40,12 +42,12 @@ class GetWaterLevelCommandTest(unittest.TestCase):
         mock_logger.add_to_event.return_value = True
         mock_redis.update_state.return_value = True
 
-        mock_serial.receive.return_value = ([b'16', b'2'], [b'16', b'1', b'56'])
-        GetWaterLevelCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis,
-                                 mock_serial, mock_config, mock_logger)
-        mock_serial.receive.return_value = ([b'16', b'2'], [b'1', b'1', b'32'])
-        GetWaterLevelCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis,
-                                 mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'16 2'), FirmwareReply(b'16 1 56'))
+        GetWaterLevelCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory,
+                                 mock_redis, mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'16 2'), FirmwareReply(b'1 1 32'))
+        GetWaterLevelCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory,
+                                 mock_redis, mock_serial, mock_config, mock_logger)
 
         assert isinstance(self.memory.pre_weight, int)
         assert isinstance(self.memory.post_weight, int)
@@ -59,15 +61,15 @@ class GetWaterLevelCommandTest(unittest.TestCase):
         mock_logger.add_to_event.return_value = True
         mock_redis.update_state.return_value = True
 
-        mock_serial.receive.return_value = ([b'16', b'2'], [b'16', b'1', b'64'])
-        GetWaterLevelCommand.run({}, {'val': [16]}, self.noop_factory, mock_feedback, self.memory, mock_redis,
-                                 mock_serial, mock_config, mock_logger)
-        mock_serial.receive.return_value = ([b'16', b'2'], [b'1', b'1', b'32'])
-        GetWaterLevelCommand.run({}, {'val': [16]}, self.noop_factory, mock_feedback, self.memory, mock_redis,
-                                 mock_serial, mock_config, mock_logger)
-        mock_serial.receive.return_value = ([b'16', b'2'], [b'1', b'1', b'21'])
-        GetWaterLevelCommand.run({}, {'val': [16]}, self.noop_factory, mock_feedback, self.memory, mock_redis,
-                                 mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'16 2'), FirmwareReply(b'16 1 64'))
+        GetWaterLevelCommand.run({}, compile_command({'val': [16]}), self.noop_factory, mock_feedback, self.memory,
+                                 mock_redis, mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'16 2'), FirmwareReply(b'1 1 32'))
+        GetWaterLevelCommand.run({}, compile_command({'val': [16]}), self.noop_factory, mock_feedback, self.memory,
+                                 mock_redis, mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'16 2'), FirmwareReply(b'1 1 21'))
+        GetWaterLevelCommand.run({}, compile_command({'val': [16]}), self.noop_factory, mock_feedback, self.memory,
+                                 mock_redis, mock_serial, mock_config, mock_logger)
 
         assert isinstance(self.memory.pre_weight, int)
         assert isinstance(self.memory.post_weight, int)
@@ -80,14 +82,14 @@ class GetWaterLevelCommandTest(unittest.TestCase):
         mock_logger.add_to_event.return_value = True
         mock_redis.update_state.return_value = True
 
-        mock_serial.receive.return_value = ([b'16', b'2'], [b'1', b'1', b'32'])
-        GetWaterLevelCommand.run({}, {'val': [16]}, self.noop_factory, mock_feedback, self.memory, mock_redis,
-                                 mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'16 2'), FirmwareReply(b'1 1 32'))
+        GetWaterLevelCommand.run({}, compile_command({'val': [16]}), self.noop_factory, mock_feedback, self.memory,
+                                 mock_redis, mock_serial, mock_config, mock_logger)
         mock_logger.add_to_event.assert_called_with(pre_tank_level=0, post_tank_level=32)
 
-        mock_serial.receive.return_value = ([b'16', b'2'], [b'16', b'1', b'21'])
-        GetWaterLevelCommand.run({}, {'val': [16]}, self.noop_factory, mock_feedback, self.memory, mock_redis,
-                                 mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'16 2'), FirmwareReply(b'16 1 21'))
+        GetWaterLevelCommand.run({}, compile_command({'val': [16]}), self.noop_factory, mock_feedback, self.memory,
+                                 mock_redis, mock_serial, mock_config, mock_logger)
         mock_logger.add_to_event.assert_called_with(pre_tank_level=32, post_tank_level=21)
 
     def test_changing_states(self, mock_serial, mock_feedback, mock_logger, mock_config, mock_redis):
@@ -96,9 +98,9 @@ class GetWaterLevelCommandTest(unittest.TestCase):
         mock_logger.add_to_event.return_value = True
         mock_redis.update_state.return_value = True
 
-        mock_serial.receive.return_value = ([b'16', b'2'], [b'16', b'1', b'26'])
-        GetWaterLevelCommand.run({}, {'val': [16]}, self.noop_factory, mock_feedback, self.memory, mock_redis,
-                                 mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'16 2'), FirmwareReply(b'16 1 26'))
+        GetWaterLevelCommand.run({}, compile_command({'val': [16]}), self.noop_factory, mock_feedback, self.memory,
+                                 mock_redis, mock_serial, mock_config, mock_logger)
         mock_redis.update_state.assert_has_calls([call(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION),
                                                   call(State.remove_state_add_IDLE, State.NON_SENSITIVE_ACTION)],
                                                  any_order=False)
@@ -0,0 +1,50 @@
+import unittest
+
+from actions.instruction_compiler import InstructionCompileError, InstructionCompiler, compile_command
+
+
+def instruction(*commands: str):
+    return {'Instruction': {'instructionId': 'instruction-1', 'type': 'WATER'},
+            'Commands': [{'Str': command} for command in commands]}
+
+
+class InstructionCompilerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.compiler = InstructionCompiler([0, 1, 2, 16, 101])
+
+    def test_given_an_instruction_then_every_command_is_decoded_once(self):
+        _, plan = self.compiler.compile(instruction('0 16 1 44 1 0 0 80', '1', '2 0 0 1 1 1 1 1.0 400 300 1800',
+                                                    '101'))
+
+        self.assertEqual([0, 1, 2, 101], [command['opcode'] for command in plan])
+        self.assertEqual([0, 16, 1, 44, 1, 0, 0, 80], plan[0]['args'])
+        self.assertEqual(['0', '16', '1', '44', '1', '0', '0', '80'], plan[0]['val'])
+        self.assertEqual([2, 0, 0, 1, 1, 1, 1], plan[2]['args'])
+        self.assertEqual({'factor': 1.0, 'distance': 400, 'flow': 300, 'target_weight': 1800}, plan[2]['watering'])
+        self.assertEqual([0, 1, 2, 3], [command['index'] for command in plan])
+        self.assertEqual([False, False, False, True], [command['last'] for command in plan])
+
+    def test_given_moves_without_x_bytes_then_the_x_is_left_to_the_move(self):
+        keep_x = compile_command({'Str': '0 - 44 1 0 0 80'})
+        choose_x = compile_command({'Str': '0 [16_1|200_0] 44 1 0 0 80'})
+
+        self.assertTrue(keep_x['keep_x'])
+        self.assertEqual([0, 0, 0, 44, 1, 0, 0, 80], keep_x['args'])
+        self.assertEqual([272, 200], choose_x['x_choices'])
+        self.assertEqual(7, choose_x['custom_speed_index'])
+
+    def test_given_a_malformed_command_then_the_whole_instruction_is_rejected(self):
+        for commands in (['0 16 1 44 1 0 0 80', '1 x'],
+                         ['0 16 1 44 1 0 0 300'],
+                         ['0 16 1 44'],
+                         ['0 [16_1] 44 1 0 0 80'],
+                         ['2 0 0 1 1 1 1'],
+                         ['2 0 0 1 1 1 1 1.0 400 fast 1800'],
+                         ['42'],
+                         ['']):
+            with self.assertRaises(InstructionCompileError, msg=str(commands)):
+                self.compiler.compile(instruction(*commands))
+
+    def test_given_an_instruction_without_commands_then_it_is_rejected(self):
+        self.assertRaises(InstructionCompileError, self.compiler.compile, {'Instruction': {}, 'Commands': []})
+        self.assertRaises(InstructionCompileError, self.compiler.compile, {'Commands': [{'Str': '1'}]})
@@ -0,0 +1,87 @@
+# type: ignore
+import unittest
+from unittest import mock
+
+from actions.instruction_compiler import InstructionCompiler
+from actions.memory import Memory
+from actions.refill_reorderer import RefillReorderer, get_station_index
+from actions.route_planner import RoutePlanner, Stop, travel_cost
+from actions.station_index import StationIndex
+
+COST = travel_cost(400, 400)
+
+
+def water(instruction_id, x, y):
+    return InstructionCompiler([0, 1]).compile(
+        {'Instruction': {'instructionId': instruction_id, 'type': 'WATER', 'cellId': 1, 'layerId': y, 'slotId': x},
+         'Commands': [{'Str': f'0 {x % 256} {x // 256} {y % 256} {y // 256} 0 0 80'}, {'Str': '1'}]})
+
+
+def refill(stations=('300', '1200')):
+    return InstructionCompiler([20]).compile(
+        {'Instruction': {'instructionId': 'refill', 'type': 'AUTOREFILL', 'workingStations': list(stations)},
+         'Commands': [{'Str': '20 1 0 0 0 0 0'}]})
+
+
+@mock.patch('common.config.Config')
+class RefillReordererTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.memory = Memory()
+
+    def test_given_stations_then_the_nearest_one_is_found_by_bisection(self, mock_config):
+        stations = StationIndex([1200, 300, 2000])
+
+        self.assertEqual([300, 300, 300, 1200, 2000, 2000],
+                         [stations.nearest(y) for y in (0, 300, 750, 760, 1700, 5000)])
+        self.assertIn(1200, stations)
+        self.assertNotIn(1201, stations)
+
+    def test_given_the_same_stations_then_the_index_is_built_once(self, mock_config):
+        mock_config.watering_stations = [500]
+        instruction, _ = refill()
+
+        index = get_station_index(self.memory, mock_config, instruction)
+
+        self.assertIs(index, get_station_index(self.memory, mock_config, refill()[0]))
+        self.assertEqual([500], get_station_index(self.memory, mock_config, {'type': 'AUTOREFILL'}).locations)
+
+    def test_given_recent_rises_of_the_level_then_the_waterings_left_are_predicted(self, mock_config):
+        mock_config.refill_level = 80
+        reorderer = RefillReorderer(self.memory, mock_config, COST)
+        self.assertIsNone(reorderer.get_waterings_left())
+
+        self.memory.tank_level_deltas.extend([10, 1, 14])
+        self.memory.post_tank_level = 40
+
+        self.assertEqual(3, reorderer.get_waterings_left())
+
+    def test_given_a_full_tank_then_the_refill_waits_until_the_route_passes_a_station(self, mock_config):
+        mock_config.refill_level = 80
+        mock_config.watering_stations = []
+        self.memory.tank_level_deltas.extend([10, 10])
+        self.memory.post_tank_level = 40
+        planner = RoutePlanner(['WATER'], COST, refills=RefillReorderer(self.memory, mock_config, COST))
+        planner.add(*refill())
+        for index, y in enumerate((800, 1150, 1500, 1900)):
+            planner.add(*water(str(index), 272, y))
+
+        order = []
+        position = (272, 700)
+        while len(planner):
+            instruction, plan = planner.next(position)
+            order.append(instruction['instructionId'])
+            stop = Stop(instruction, plan, 0)
+            if stop.point is not None:
+                position = stop.point
+
+        self.assertEqual(['0', '1', 'refill', '2', '3'], order)
+
+    def test_given_a_tank_that_runs_out_then_the_refill_goes_before_the_next_watering(self, mock_config):
+        mock_config.refill_level = 80
+        self.memory.tank_level_deltas.extend([10, 10])
+        self.memory.post_tank_level = 75
+        reorderer = RefillReorderer(self.memory, mock_config, COST)
+        route = [Stop(*water(str(index), 272, y), index) for index, y in enumerate((800, 1150, 1500))]
+
+        self.assertEqual(0, reorderer.place((272, 700), Stop(*refill(), 3), route))
@@ -0,0 +1,64 @@
+# type: ignore
+import unittest
+
+from actions.instruction_compiler import InstructionCompiler
+from actions.route_planner import RoutePlanner, Stop, plan_route, route_cost, travel_cost
+
+COST = travel_cost(400, 400)
+
+
+def instruction(instruction_id, x, y, kind='WATER', **fields):
+    return InstructionCompiler([0, 1, 6]).compile(
+        {'Instruction': {'instructionId': instruction_id, 'type': kind, 'cellId': 1, 'layerId': y, 'slotId': x,
+                         **fields},
+         'Commands': [{'Str': f'0 {x % 256} {x // 256} {y % 256} {y // 256} 0 0 80'}, {'Str': '1'}]})
+
+
+def hand_out(planner, position=(0, 0)):
+    order = []
+    while len(planner):
+        released, plan = planner.next(position)
+        order.append(released['instructionId'])
+        position = (plan[0]['args'][1] + plan[0]['args'][2] * 256, plan[0]['args'][3] + plan[0]['args'][4] * 256)
+    return order
+
+
+class RoutePlannerTest(unittest.TestCase):
+
+    def test_given_a_zig_zag_batch_then_the_route_is_shorter_than_the_arrival_order(self):
+        slots = [(2000, 44), (300, 44), (1800, 344), (500, 344), (1600, 44), (700, 344)]
+        stops = [Stop(*instruction(str(index), x, y), index) for index, (x, y) in enumerate(slots)]
+
+        route = plan_route((0, 0), stops, COST)
+
+        self.assertEqual(['1', '3', '5', '4', '2', '0'], [stop.instruction['instructionId'] for stop in route])
+        self.assertLess(route_cost((0, 0), route, COST), route_cost((0, 0), stops, COST) / 2)
+
+    def test_given_instructions_for_the_same_slot_then_they_keep_their_order(self):
+        planner = RoutePlanner(['WATER', 'PHOTO'], COST)
+        planner.add(*instruction('far', 2000, 44))
+        planner.add(*instruction('water', 300, 44))
+        planner.add(*instruction('photo', 300, 44, kind='PHOTO'))
+        planner.add(*instruction('near', 100, 44))
+
+        order = hand_out(planner)
+
+        self.assertLess(order.index('water'), order.index('photo'))
+        self.assertEqual('far', order[-1])
+
+    def test_given_an_instruction_of_another_type_then_the_ones_after_it_wait_for_it(self):
+        planner = RoutePlanner(['WATER'], COST)
+        planner.add(*instruction('far', 2000, 44))
+        planner.add(*instruction('move', 1000, 44, kind='MOVE'))
+        planner.add(*instruction('near', 100, 44))
+
+        self.assertEqual(['far', 'move', 'near'], hand_out(planner))
+
+    def test_given_priorities_and_deadlines_then_they_go_before_the_route(self):
+        planner = RoutePlanner(['WATER'], COST, urgent_sec=60, clock=lambda: 1000.0)
+        planner.add(*instruction('near', 100, 44))
+        planner.add(*instruction('important', 2000, 44, priority=1))
+        planner.add(*instruction('due', 1500, 344, deadline=1030))
+        planner.add(*instruction('later', 1400, 344, deadline=5000))
+
+        self.assertEqual(['due', 'important'], hand_out(planner)[:2])
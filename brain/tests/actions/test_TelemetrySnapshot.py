@@ -0,0 +1,54 @@
+import unittest
+
+from actions.telemetry_snapshot import TelemetrySnapshot
+from model.position import Position
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TelemetrySnapshotTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.snapshot = TelemetrySnapshot(60, self.clock)
+
+    def test_given_no_values_then_they_have_to_be_probed(self):
+        self.assertIsNone(self.snapshot.get_position())
+        self.assertIsNone(self.snapshot.get_tank_level())
+        self.assertIsNone(self.snapshot.get_age())
+
+    def test_given_fresh_values_then_they_are_served_until_the_ttl_expires(self):
+        position = Position(100, 200, 30)
+        self.snapshot.update_position(position)
+        self.snapshot.update_tank_level(42)
+        self.clock.now += 59
+
+        self.assertIs(position, self.snapshot.get_position())
+        self.assertEqual(42, self.snapshot.get_tank_level())
+        self.assertEqual(59, self.snapshot.get_age())
+
+        self.clock.now += 1
+        self.assertIsNone(self.snapshot.get_position())
+        self.assertIsNone(self.snapshot.get_tank_level())
+        self.assertEqual(2, self.snapshot.hits)
+        self.assertEqual(2, self.snapshot.misses)
+
+    def test_given_an_invalidated_snapshot_then_the_values_have_to_be_probed_again(self):
+        self.snapshot.update_position(Position(100, 200, 30))
+        self.snapshot.update_tank_level(42)
+
+        self.snapshot.invalidate()
+
+        self.assertIsNone(self.snapshot.get_position())
+        self.assertIsNone(self.snapshot.get_tank_level())
+
+    def test_given_a_ttl_of_zero_then_values_are_never_served(self):
+        snapshot = TelemetrySnapshot(0, self.clock)
+        snapshot.update_tank_level(42)
+
+        self.assertIsNone(snapshot.get_tank_level())
@@ -0,0 +1,77 @@
+# type: ignore
+import tempfile
+import unittest
+from unittest import mock
+
+from actions.warm_start import WarmStart
+from common.enums import State
+from common.serial_manager import SerialManager
+from simulator.firmware import FirmwareSimulator, LatencyProfile
+
+
+@mock.patch('common.config.Config')
+@mock.patch('common.log_event.Logger')
+@mock.patch('common.redis_client.Redis')
+@mock.patch('actions.feedback.firmware_error_info.FirmwareErrorInfo')
+class WarmStartTest(unittest.TestCase):
+
+    def setUp(self):
+        self.links_dir = tempfile.TemporaryDirectory()
+        self.simulator = FirmwareSimulator(self.links_dir.name, latency=LatencyProfile(1, 0), time_scale=0.01)
+        self.simulator.machine.position.update({'x': 500, 'y': 300, 'z': 20})
+
+    def tearDown(self):
+        self.simulator.stop()
+        self.links_dir.cleanup()
+
+    def connect(self, mock_firmware_error_info, mock_redis, mock_logger, mock_config, persisted):
+        mock_config.serial_name_pattern = self.simulator.pattern
+        mock_config.serial_timeout_probe_sec = 2
+        mock_config.serial_travel_timeouts = False
+        mock_config.serial_timeout_margin = 3
+        mock_config.serial_timeout_right = mock_config.serial_timeout_left = 5
+        mock_config.serial_speed_x = mock_config.serial_speed_y = mock_config.serial_speed_z = 100
+        mock_config.serial_supervisor_interval_sec = 0
+        mock_config.serial_parallel_receive = True
+        mock_config.warm_start = True
+        mock_config.warm_start_check_distance = 50
+        mock_redis.get_position.return_value = persisted
+        serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+        return WarmStart(serial_manager, mock_redis, mock_config, mock_logger), serial_manager
+
+    def test_given_an_idle_robot_at_the_persisted_position_then_homing_is_skipped(self, mock_firmware_error_info, mock_redis, mock_logger, mock_config):  # noqa: E501
+        warm_start, _ = self.connect(mock_firmware_error_info, mock_redis, mock_logger, mock_config, (500, 300, 20))
+        with mock.patch.object(warm_start, '_move', wraps=warm_start._move) as move:
+            position = warm_start.get_trusted_position(State.IDLE)
+
+        self.assertEqual((500, 300, 20), (position.x, position.y, position.z))
+        self.assertEqual([mock.call((450, 250, 0)), mock.call((500, 300, 20))], move.call_args_list)
+        self.assertEqual({'x': 500, 'y': 300, 'z': 20}, self.simulator.machine.position)
+        mock_redis.update_state.assert_called_with(State.remove_state_add_IDLE,
+                                                   State.HOMING_X | State.HOMING_Y | State.HOMING_Z)
+
+    def test_given_boards_that_report_another_position_then_the_robot_is_homed(self, mock_firmware_error_info, mock_redis, mock_logger, mock_config):  # noqa: E501
+        warm_start, _ = self.connect(mock_firmware_error_info, mock_redis, mock_logger, mock_config, (600, 300, 20))
+        with mock.patch.object(warm_start, '_move') as move:
+            self.assertIsNone(warm_start.get_trusted_position(State.IDLE))
+
+        move.assert_not_called()
+
+    def test_given_a_failing_reference_move_then_the_robot_is_homed(self, mock_firmware_error_info, mock_redis, mock_logger, mock_config):  # noqa: E501
+        warm_start, _ = self.connect(mock_firmware_error_info, mock_redis, mock_logger, mock_config,
+                                     (500, 300, 20))
+        self.simulator.right._errors.error_rate = 1.0
+        self.simulator.right._errors.error_codes = [50020]
+
+        self.assertIsNone(warm_start.get_trusted_position(State.IDLE))
+
+    def test_given_a_robot_that_was_busy_then_the_boards_are_not_asked(self, mock_firmware_error_info, mock_redis, mock_logger, mock_config):  # noqa: E501
+        mock_config.warm_start = True
+        mock_redis.get_position.return_value = (500, 300, 20)
+        serial = mock.Mock()
+        warm_start = WarmStart(serial, mock_redis, mock_config, mock_logger)
+
+        self.assertIsNone(warm_start.get_trusted_position(State.MOVING_X))
+        self.assertIsNone(warm_start.get_trusted_position(State.IDLE | State.HANDLING_INSTRUCTION))
+        serial.send.assert_not_called()
+        mock_redis.update_state.assert_not_called()
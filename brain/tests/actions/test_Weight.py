@@ -3,9 +3,11 @@ import unittest
 from unittest import mock
 from unittest.mock import call
 
+from actions.instruction_compiler import compile_command
 from actions.memory import Memory
 from common.enums import State
 from actions.commands.weight import WeightCommand
+from model.firmware_reply import FirmwareReply
 
 
 @mock.patch('common.serial_manager.SerialManager')
@@ -23,28 +25,28 @@ class WeightCommandTest(unittest.TestCase):
 
     def test_send_serial_command(self, mock_serial, mock_feedback, mock_logger, mock_config, mock_redis):
         mock_serial.send.return_value = True
-        mock_serial.receive.return_value = ([b'1', b'1', b'500'], [b'1', b'1', b'600'])
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 500'), FirmwareReply(b'1 1 600'))
         mock_serial.is_ok.return_value = True
         mock_logger.add_to_event.return_value = True
         mock_redis.update_state.return_value = True
         mock_config.weight_offset = 0
 
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
 
         mock_serial.send.assert_called_once_with([1])
         mock_serial.receive.assert_called_once()
 
     def test_calculate_weight_wo_offset(self, mock_serial, mock_feedback, mock_logger, mock_config, mock_redis):
         mock_serial.send.return_value = True
-        mock_serial.receive.return_value = ([b'1', b'1', b'500'], [b'1', b'1', b'600'])
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 500'), FirmwareReply(b'1 1 600'))
         mock_serial.is_ok.return_value = True
         mock_logger.add_to_event.return_value = True
         mock_redis.update_state.return_value = True
         mock_config.weight_offset = 0
 
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
 
         assert isinstance(self.memory.post_weight, int)
         assert self.memory.post_weight == 1100
@@ -52,14 +54,14 @@ class WeightCommandTest(unittest.TestCase):
     def test_calculate_weight_with_negative_offset(self, mock_serial, mock_feedback, mock_logger, mock_config,
                                                    mock_redis):
         mock_serial.send.return_value = True
-        mock_serial.receive.return_value = ([b'1', b'1', b'500'], [b'1', b'1', b'600'])
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 500'), FirmwareReply(b'1 1 600'))
         mock_serial.is_ok.return_value = True
         mock_logger.add_to_event.return_value = True
         mock_redis.update_state.return_value = True
         mock_config.weight_offset = -300
 
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
 
         assert isinstance(self.memory.post_weight, int)
         assert self.memory.post_weight == 800
@@ -67,14 +69,14 @@ class WeightCommandTest(unittest.TestCase):
     def test_calculate_weight_with_positive_offset(self, mock_serial, mock_feedback, mock_logger, mock_config,
                                                    mock_redis):
         mock_serial.send.return_value = True
-        mock_serial.receive.return_value = ([b'1', b'1', b'500'], [b'1', b'1', b'600'])
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 500'), FirmwareReply(b'1 1 600'))
         mock_serial.is_ok.return_value = True
         mock_logger.add_to_event.return_value = True
         mock_redis.update_state.return_value = True
         mock_config.weight_offset = 400
 
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
 
         assert isinstance(self.memory.post_weight, int)
         assert self.memory.pre_weight == 0
@@ -87,12 +89,12 @@ class WeightCommandTest(unittest.TestCase):
         mock_redis.update_state.return_value = True
         mock_config.weight_offset = 0
 
-        mock_serial.receive.return_value = ([b'1', b'1', b'500'], [b'1', b'1', b'600'])
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
-        mock_serial.receive.return_value = ([b'1', b'1', b'700'], [b'1', b'1', b'950'])
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 500'), FirmwareReply(b'1 1 600'))
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 700'), FirmwareReply(b'1 1 950'))
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
 
         assert isinstance(self.memory.pre_weight, int)
         assert isinstance(self.memory.post_weight, int)
@@ -106,15 +108,15 @@ class WeightCommandTest(unittest.TestCase):
         mock_redis.update_state.return_value = True
         mock_config.weight_offset = 0
 
-        mock_serial.receive.return_value = ([b'1', b'1', b'500'], [b'1', b'1', b'600'])
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
-        mock_serial.receive.return_value = ([b'1', b'1', b'700'], [b'1', b'1', b'950'])
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
-        mock_serial.receive.return_value = ([b'1', b'1', b'150'], [b'1', b'1', b'200'])
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 500'), FirmwareReply(b'1 1 600'))
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 700'), FirmwareReply(b'1 1 950'))
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 150'), FirmwareReply(b'1 1 200'))
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
 
         assert isinstance(self.memory.pre_weight, int)
         assert isinstance(self.memory.post_weight, int)
@@ -128,14 +130,14 @@ class WeightCommandTest(unittest.TestCase):
         mock_redis.update_state.return_value = True
         mock_config.weight_offset = 0
 
-        mock_serial.receive.return_value = ([b'1', b'1', b'500'], [b'1', b'1', b'600'])
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 500'), FirmwareReply(b'1 1 600'))
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
         mock_logger.add_to_event.assert_called_with(pre_weight=0, post_weight=1100)
 
-        mock_serial.receive.return_value = ([b'1', b'1', b'700'], [b'1', b'1', b'950'])
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 700'), FirmwareReply(b'1 1 950'))
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
         mock_logger.add_to_event.assert_called_with(pre_weight=1100, post_weight=1650)
 
     def test_changing_states(self, mock_serial, mock_feedback, mock_logger, mock_config, mock_redis):
@@ -145,9 +147,9 @@ class WeightCommandTest(unittest.TestCase):
         mock_redis.update_state.return_value = True
         mock_config.weight_offset = 0
 
-        mock_serial.receive.return_value = ([b'1', b'1', b'500'], [b'1', b'1', b'600'])
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 500'), FirmwareReply(b'1 1 600'))
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
         mock_redis.update_state.assert_has_calls([
             call(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION),
             call(State.remove_state_add_IDLE, State.NON_SENSITIVE_ACTION)
@@ -160,9 +162,9 @@ class WeightCommandTest(unittest.TestCase):
         mock_redis.update_state.return_value = True
         mock_config.weight_offset = 0
 
-        mock_serial.receive.return_value = ([b'1', b'1', b'500'], [b'1', b'1', b'600'])
-        WeightCommand.run({}, {'val': [1]}, self.noop_factory, mock_feedback, self.memory, mock_redis, mock_serial,
-                          mock_config, mock_logger)
+        mock_serial.receive.return_value = (FirmwareReply(b'1 1 500'), FirmwareReply(b'1 1 600'))
+        WeightCommand.run({}, compile_command({'val': [1]}), self.noop_factory, mock_feedback, self.memory, mock_redis,
+                          mock_serial, mock_config, mock_logger)
         mock_redis.update_state.assert_has_calls([
             call(State.add_state_remove_IDLE, State.NON_SENSITIVE_ACTION),
             call(State.remove_state_add_IDLE, State.NON_SENSITIVE_ACTION)
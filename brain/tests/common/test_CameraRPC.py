@@ -0,0 +1,106 @@
+# type: ignore
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from common.camera_rpc import CameraRPC
+
+
+@mock.patch('common.config.Config')
+@mock.patch('common.log_event.Logger')
+@mock.patch('common.mqtt_client.MQTT')
+class CameraRPCTest(unittest.TestCase):
+
+    def reply_later(self, rpc, delay, **overrides):
+        def reply():
+            time.sleep(delay)
+            command = json.loads(rpc._mqtt.send.call_args.args[1])
+            rpc._on_feedback('topic', json.dumps({'instructionId': command['instructionId'],
+                                                  'requestId': command['requestId'],
+                                                  'instructionStatus': 'SUCCESSFUL',
+                                                  'message': 'ok', **overrides}))
+        threading.Thread(target=reply).start()
+
+    def test_given_a_camera_reply_when_it_arrives_then_the_caller_wakes_up_immediately(self, mock_mqtt, mock_logger,
+                                                                                       mock_config):
+        mock_config.stage = 'test'
+        mock_config.robot_id = 1
+        rpc = CameraRPC(mock_mqtt, mock_logger, mock_config, 'top', 'TopCam')
+        mock_mqtt.subscribe.assert_called_once_with('rc/test/robots/1/cameras/top/feedback', rpc._on_feedback)
+
+        self.reply_later(rpc, 0.05)
+        start = time.monotonic()
+        reply = rpc.call('instruction-1', 'open_cam', timeout=5)
+
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual('ok', reply['message'])
+        topic, payload = mock_mqtt.send.call_args.args
+        self.assertEqual('rc/test/robots/1/cameras/top/cmds', topic)
+        self.assertEqual('open_cam', json.loads(payload)['Str'])
+
+    def test_given_a_reply_of_another_request_when_waiting_then_it_is_not_taken(self, mock_mqtt, mock_logger,
+                                                                                mock_config):
+        rpc = CameraRPC(mock_mqtt, mock_logger, mock_config, 'side', 'SideCam')
+
+        self.reply_later(rpc, 0.05, requestId='stale-request')
+        reply = rpc.call('instruction-1', 'take_image', {'view': 'side'}, timeout=0.3)
+
+        self.assertIsNone(reply)
+        self.assertEqual({'view': 'side'}, json.loads(mock_mqtt.send.call_args.args[1])['Metadata'])
+
+    def test_given_a_reply_without_request_id_when_waiting_then_it_is_matched_by_instruction_id(
+            self, mock_mqtt, mock_logger, mock_config):
+        rpc = CameraRPC(mock_mqtt, mock_logger, mock_config, 'top', 'TopCam')
+
+        def reply():
+            time.sleep(0.05)
+            rpc._on_feedback('topic', json.dumps({'instructionId': 'instruction-1', 'instructionStatus': 'FAILED',
+                                                  'message': 'camera busy'}))
+        threading.Thread(target=reply).start()
+
+        self.assertEqual('camera busy', rpc.call('instruction-1', 'close_cam', timeout=5)['message'])
+
+    def test_given_a_reply_without_request_id_when_two_requests_of_the_instruction_are_pending_then_it_is_not_guessed(
+            self, mock_mqtt, mock_logger, mock_config):
+        rpc = CameraRPC(mock_mqtt, mock_logger, mock_config, 'top', 'TopCam')
+        upload = rpc.send('instruction-1', 'take_image', ackOnCapture=True)
+        close = rpc.send('instruction-1', 'close_cam')
+
+        rpc._on_feedback('topic', json.dumps({'instructionId': 'instruction-1', 'instructionStatus': 'SUCCESSFUL'}))
+        self.assertFalse(upload.done.is_set() or close.done.is_set())
+
+        rpc._on_feedback('topic', json.dumps({'instructionId': 'instruction-1', 'Str': 'close_cam',
+                                              'instructionStatus': 'SUCCESSFUL'}))
+        self.assertEqual((False, True), (upload.done.is_set(), close.done.is_set()))
+
+    def test_given_a_captured_acknowledge_when_waiting_for_ack_then_the_request_stays_pending_until_uploaded(
+            self, mock_mqtt, mock_logger, mock_config):
+        rpc = CameraRPC(mock_mqtt, mock_logger, mock_config, 'top', 'TopCam')
+        results = []
+
+        request = rpc.send('instruction-1', 'take_image', {'view': 'top'}, ackOnCapture=True)
+        request.on_done = results.append
+        self.assertTrue(json.loads(mock_mqtt.send.call_args.args[1])['ackOnCapture'])
+        rpc._on_feedback('topic', json.dumps({'requestId': request.request_id, 'instructionStatus': 'CAPTURED'}))
+
+        self.assertEqual('CAPTURED', rpc.wait_for_ack(request, timeout=1)['instructionStatus'])
+        self.assertFalse(request.done.is_set())
+
+        rpc._on_feedback('topic', json.dumps({'requestId': request.request_id, 'instructionStatus': 'SUCCESSFUL'}))
+
+        self.assertTrue(request.done.is_set())
+        self.assertEqual(['SUCCESSFUL'], [reply['instructionStatus'] for reply in results])
+
+    def test_given_a_pending_request_when_released_then_it_is_completed_without_reply(self, mock_mqtt, mock_logger,
+                                                                                      mock_config):
+        rpc = CameraRPC(mock_mqtt, mock_logger, mock_config, 'top', 'TopCam')
+        results = []
+        request = rpc.send('instruction-1', 'take_image')
+        request.on_done = results.append
+
+        rpc.release(request)
+        rpc.release(request)
+
+        self.assertEqual([None], results)
@@ -15,6 +15,7 @@ class LogTest(unittest.TestCase):
     def test_given_a_logger_when_create_an_event_then_zulu_format_is_used(self, mock_config, mock_file_handler):
         mock_config.log_level_file = "DEBUG"
         mock_config.log_level_terminal = "DEBUG"
+        mock_config.log_async = False
         logger = Logger(mock_config)
         logger._get_utc_now = MagicMock()
         logger._get_utc_now.return_value = datetime(2021, 12, 14, 9, 45, 24, 132221)
@@ -28,6 +29,7 @@ class LogTest(unittest.TestCase):
     def test_given_a_logger_when_send_an_event_then_zulu_format_is_used(self, mock_config, mock_file_handler):
         mock_config.log_level_file = "DEBUG"
         mock_config.log_level_terminal = "DEBUG"
+        mock_config.log_async = False
         logger = Logger(mock_config)
         logger._get_utc_now = MagicMock()
         logger._get_utc_now.return_value = datetime(2021, 12, 14, 9, 45, 24, 132221)
@@ -0,0 +1,63 @@
+# type: ignore
+import json
+import unittest
+
+from common.log_event import LogEvent, LogEventSerializer
+
+
+class LogEventTest(unittest.TestCase):
+
+    def test_given_list_items_when_they_are_added_to_a_key_then_the_state_contains_them_in_order(self):
+        event = LogEvent('message', id='instruction-1')
+
+        for serial_in in ['[9]', '[1]']:
+            event.add_to_cached_item(serial_in=serial_in)
+            event.add_to_cached_item(serial_out_left='9 2 0 0')
+            event.add_cached_item_to_key('serial')
+        event.add(level='INFO')
+
+        self.assertEqual({'message': 'message', 'id': 'instruction-1', 'level': 'INFO',
+                          'serial': [{'serial_in': '[9]', 'serial_out_left': '9 2 0 0'},
+                                     {'serial_in': '[1]', 'serial_out_left': '9 2 0 0'}]}, event.get_state())
+        self.assertEqual(event.get_state(), json.loads(str(event)))
+
+    def test_given_a_restored_state_when_items_are_added_then_the_restored_list_is_continued(self):
+        event = LogEvent('message')
+        event.set_state({'message': 'restored', 'serial': [{'serial_in': '[9]'}]})
+
+        event.add_to_cached_item(serial_in='[1]')
+        event.add_cached_item_to_key('serial')
+
+        self.assertEqual([{'serial_in': '[9]'}, {'serial_in': '[1]'}], event.get_state()['serial'])
+
+    def test_given_an_encoded_event_when_items_are_appended_then_only_the_new_items_are_encoded(self):
+        event = LogEvent('message')
+        serializer = LogEventSerializer()
+        event.add_to_cached_item(serial_in='[9]')
+        event.add_cached_item_to_key('serial')
+
+        reset, fields, appended = serializer.encode(event)
+        self.assertTrue(reset)
+        self.assertEqual({'message': 'message'}, json.loads(fields))
+        self.assertEqual({'serial': [json.dumps({'serial_in': '[9]'})]}, appended)
+
+        event.add_to_cached_item(serial_in='[1]')
+        event.add_cached_item_to_key('serial')
+        self.assertEqual((False, None, {'serial': [json.dumps({'serial_in': '[1]'})]}), serializer.encode(event))
+
+        event.add(level='INFO')
+        self.assertEqual((False, json.dumps({'message': 'message', 'level': 'INFO'}), {}), serializer.encode(event))
+
+    def test_given_an_encoded_event_when_a_section_is_replaced_then_everything_is_encoded_again(self):
+        event = LogEvent('message')
+        serializer = LogEventSerializer()
+        event.add_cached_item_to_key('serial')
+        serializer.encode(event)
+
+        event.add(serial=[])
+        reset, fields, appended = serializer.encode(event)
+
+        self.assertTrue(reset)
+        self.assertEqual({'message': 'message', 'serial': []}, json.loads(fields))
+        self.assertEqual({}, appended)
+        self.assertTrue(serializer.encode(LogEvent('next'))[0])
@@ -0,0 +1,82 @@
+# type: ignore
+import json
+import logging
+import os
+import queue
+import tempfile
+import unittest
+from unittest import mock
+
+from common.log_event import Logger, LogQueueHandler
+
+
+def record(name, message):
+    return logging.makeLogRecord({'name': name, 'msg': message, 'levelno': logging.INFO})
+
+
+class TestLogQueueHandler(unittest.TestCase):
+
+    def setUp(self):
+        # Loggers of other tests may carry handlers with mocked levels
+        self.handlers = {name: logging.getLogger(name).handlers[:] for name in ['robot.event', 'robot.system']}
+        for name in self.handlers:
+            logging.getLogger(name).handlers.clear()
+
+    def tearDown(self):
+        for name, handlers in self.handlers.items():
+            logging.getLogger(name).handlers[:] = handlers
+
+    def test_given_a_full_queue_when_dropping_the_oldest_then_the_newest_records_are_kept(self):
+        handler = LogQueueHandler(2, 'drop_oldest')
+
+        for message in ['first', 'second', 'third']:
+            handler.handle(record('robot.system', message))
+
+        self.assertEqual(['second', 'third'], [handler.queue.get_nowait().msg for _ in range(2)])
+        self.assertEqual({'queue_depth': 0, 'dropped': 1, 'dropped_events': 0}, handler.get_metrics())
+
+    def test_given_a_full_queue_when_dropping_the_newest_then_lost_events_are_counted(self):
+        handler = LogQueueHandler(1, 'drop_newest')
+
+        handler.handle(record('robot.system', 'first'))
+        handler.handle(record('robot.event', 'event'))
+
+        self.assertEqual('first', handler.queue.get_nowait().msg)
+        self.assertEqual(1, handler.get_metrics()['dropped_events'])
+
+    def test_given_a_writer_that_takes_the_records_after_a_failed_put_then_the_new_record_is_queued(self):
+        handler = LogQueueHandler(1, 'drop_oldest')
+        handler.handle(record('robot.system', 'first'))
+
+        def taken_by_the_writer():
+            handler.queue.get()
+            raise queue.Empty
+        handler.queue.get_nowait = taken_by_the_writer
+        handler.handle(record('robot.system', 'second'))
+
+        self.assertEqual('second', handler.queue.get().msg)
+        self.assertEqual(0, handler.get_metrics()['dropped'])
+
+    @mock.patch('common.config.Config')
+    def test_given_async_logging_when_an_event_is_sent_then_the_writer_stores_it_as_it_was_sent(self, mock_config):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(f'{root}/logs')
+            mock_config.root = root
+            mock_config.log_level_file = logging.DEBUG
+            mock_config.log_level_terminal = logging.DEBUG
+            mock_config.log_async = True
+            mock_config.log_queue_size = 10
+            mock_config.log_queue_backpressure = 'block'
+            logger = Logger(mock_config)
+            logger.create_event('fake message', id='instruction-1')
+            logger.send_event(logging.INFO)
+            logger.add_to_event(statusCode='AfterSending')
+            logger.close()
+
+            with open(f'{root}/logs/robot.log') as log_file:
+                event = json.loads(log_file.readline())
+
+        self.assertEqual('instruction-1', event['id'])
+        self.assertEqual('INFO', event['level'])
+        self.assertNotIn('statusCode', event)
+        self.assertEqual({'queue_depth': 0, 'dropped': 0, 'dropped_events': 0}, logger.get_metrics())
@@ -0,0 +1,128 @@
+# type: ignore
+import queue
+import threading
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+from common.mqtt_client import MqttPublisher
+
+
+def completed_future() -> Future:
+    future = Future()
+    future.set_result({'packet_id': 1})
+    return future
+
+
+@mock.patch('common.log_event.Logger')
+class MqttPublisherTest(unittest.TestCase):
+
+    def test_given_messages_when_submitted_then_they_are_published_by_the_worker_pool(self, mock_logger):
+        published = []
+        publisher = MqttPublisher(lambda topic, data: published.append((topic, data)) or completed_future(),
+                                  mock_logger, workers=2, queue_size=10)
+
+        for i in range(5):
+            publisher.submit('topic', str(i))
+        publisher.join()
+
+        self.assertEqual(sorted(str(i) for i in range(5)), sorted(data for _, data in published))
+        metrics = publisher.get_metrics()
+        self.assertEqual(0, metrics['queue_depth'])
+        self.assertEqual(5, metrics['publish_latency']['count'])
+        self.assertEqual(0, metrics['dropped'])
+
+    def test_given_a_full_queue_when_dropping_oldest_then_the_newest_messages_survive(self, mock_logger):
+        release = threading.Event()
+        published = []
+
+        def publish(topic, data):
+            release.wait(5)
+            published.append(data)
+            return completed_future()
+
+        publisher = MqttPublisher(publish, mock_logger, workers=1, queue_size=2, backpressure='drop_oldest')
+        publisher.submit('topic', 'in-flight')
+        while publisher.get_metrics()['queue_depth'] != 0:
+            pass
+        for data in ['a', 'b', 'c', 'd']:
+            publisher.submit('topic', data)
+        release.set()
+        publisher.join()
+
+        self.assertEqual(['in-flight', 'c', 'd'], published)
+        self.assertEqual(2, publisher.get_metrics()['dropped'])
+
+    def test_given_a_full_queue_when_dropping_newest_then_the_oldest_messages_survive(self, mock_logger):
+        release = threading.Event()
+        published = []
+
+        def publish(topic, data):
+            release.wait(5)
+            published.append(data)
+            return completed_future()
+
+        publisher = MqttPublisher(publish, mock_logger, workers=1, queue_size=2, backpressure='drop_newest')
+        publisher.submit('topic', 'in-flight')
+        while publisher.get_metrics()['queue_depth'] != 0:
+            pass
+        for data in ['a', 'b', 'c', 'd']:
+            publisher.submit('topic', data)
+        release.set()
+        publisher.join()
+
+        self.assertEqual(['in-flight', 'a', 'b'], published)
+        self.assertEqual(2, publisher.get_metrics()['dropped'])
+
+    def test_given_a_failing_publish_when_submitted_then_it_is_counted_as_failed(self, mock_logger):
+        def publish(topic, data):
+            future = Future()
+            future.set_exception(RuntimeError('offline'))
+            return future
+
+        publisher = MqttPublisher(publish, mock_logger, workers=1, queue_size=2)
+        publisher.submit('topic', 'data')
+        publisher.join()
+
+        self.assertEqual(1, publisher.get_metrics()['failed'])
+
+    def test_given_a_worker_that_takes_the_messages_after_a_failed_put_then_the_new_message_is_queued(self, mock_logger):  # noqa: E501
+        publisher = MqttPublisher(lambda topic, data: completed_future(), mock_logger, workers=0, queue_size=1,
+                                  backpressure='drop_oldest')
+        publisher.submit('first', 'data')
+
+        def taken_by_a_worker():
+            publisher._queue.get()
+            publisher._queue.task_done()
+            raise queue.Empty
+        publisher._queue.get_nowait = taken_by_a_worker
+        publisher.submit('second', 'data')
+
+        self.assertEqual('second', publisher._queue.get()[0])
+        self.assertEqual(0, publisher.get_metrics()['dropped'])
+
+    def test_given_a_full_queue_when_a_message_must_not_be_dropped_then_it_waits_for_room(self, mock_logger):
+        release = threading.Event()
+        published = []
+
+        def publish(topic, data):
+            release.wait(5)
+            published.append(data)
+            return completed_future()
+
+        publisher = MqttPublisher(publish, mock_logger, workers=1, queue_size=1)
+        publisher.submit('topic', 'in-flight')
+        while publisher.get_metrics()['queue_depth'] != 0:
+            pass
+        publisher.submit('topic', 'a')
+        feedback = threading.Thread(target=publisher.submit, args=('topic', 'feedback'), kwargs={'block': True})
+        feedback.start()
+        feedback.join(0.1)
+        self.assertTrue(feedback.is_alive())
+
+        release.set()
+        feedback.join(5)
+        publisher.join()
+
+        self.assertEqual(['in-flight', 'a', 'feedback'], published)
+        self.assertEqual(0, publisher.get_metrics()['dropped'])
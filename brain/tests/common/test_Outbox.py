@@ -0,0 +1,84 @@
+# type: ignore
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+from common.outbox import Outbox, OutboxRelay
+
+
+def published(exception=None):
+    future = Future()
+    if exception is None:
+        future.set_result({})
+    else:
+        future.set_exception(exception)
+    return future
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@mock.patch('common.log_event.Logger')
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'outbox.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_given_appended_messages_when_the_outbox_is_reopened_then_they_are_read_in_order(self, mock_logger):
+        outbox = Outbox(self.path)
+        for number in range(3):
+            outbox.append('topic', f'message {number}')
+        outbox.close()
+
+        outbox = Outbox(self.path)
+        self.assertEqual(['message 0', 'message 1'], [data for _, _, data in outbox.peek(2)])
+        outbox.remove_until(outbox.peek(1)[0][0])
+        self.assertEqual(['message 1', 'message 2'], [data for _, _, data in outbox.peek(10)])
+        outbox.close()
+
+    def test_given_no_connection_when_messages_are_sent_then_they_are_replayed_in_order_once_online(self,
+                                                                                                    mock_logger):
+        sent = []
+        relay = OutboxRelay(Outbox(self.path), lambda topic, data: sent.append(data) or published(), mock_logger,
+                            batch_size=2)
+
+        for number in range(5):
+            relay.submit('topic', f'message {number}')
+        time.sleep(0.05)
+        self.assertEqual([], sent)
+
+        relay.set_online(True)
+        self.assertTrue(wait_until(lambda: relay.get_metrics()['outbox_depth'] == 0))
+        self.assertEqual([f'message {number}' for number in range(5)], sent)
+
+    def test_given_a_failing_publish_when_a_batch_is_sent_then_unconfirmed_messages_are_retried(self, mock_logger):
+        sent = []
+        failures = [ConnectionError('connection lost')]
+
+        def publish(topic, data):
+            sent.append(data)
+            if data == 'message 1' and failures:
+                return published(failures.pop())
+            return published()
+
+        relay = OutboxRelay(Outbox(self.path), publish, mock_logger, batch_size=10, retry_sec=0.01)
+        relay.set_online(True)
+        for number in range(3):
+            relay.submit('topic', f'message {number}')
+
+        self.assertTrue(wait_until(lambda: relay.get_metrics()['outbox_depth'] == 0))
+        self.assertEqual(1, relay.failed_batches)
+        self.assertEqual('message 0', sent[0])
+        self.assertEqual(1, sent.count('message 0'))
+        self.assertEqual(['message 1', 'message 2'], sent[-2:])
@@ -0,0 +1,246 @@
+# type: ignore
+import json
+import time
+import unittest
+from unittest import mock
+
+from redis import BlockingConnectionPool
+
+from common.enums import State
+from common.log_event import LogEvent
+from common.redis_client import CountingConnection, CountingUnixDomainSocketConnection, OpCounter, Redis
+
+
+def configure(mock_config, **options):
+    options = {'redis_socket': '', 'redis_pool_size': 4, 'redis_pool_timeout_sec': 20, 'redis_durability': 'bgsave',
+               **options}
+    for name, value in options.items():
+        setattr(mock_config, name, value)
+
+
+@mock.patch('common.config.Config')
+@mock.patch('common.log_event.Logger')
+@mock.patch('redis.StrictRedis')
+class RedisTest(unittest.TestCase):
+
+    def test_given_a_persisted_state_when_it_is_updated_then_redis_is_read_only_once(self, mock_strict_redis,
+                                                                                     mock_logger, mock_config):
+        mock_config.redis_save_debounce_sec = 10
+        client = mock_strict_redis.return_value
+        client.get.return_value = str(State.IDLE.value)
+        configure(mock_config)
+        redis = Redis(0, mock_config, mock_logger)
+
+        redis.update_state(State.add_state, State.HANDLING_INSTRUCTION)
+        redis.update_state(State.add_state_remove_IDLE, State.MOVING_X)
+        state = redis.update_state(State.remove_state_add_IDLE, State.MOVING_X)
+
+        self.assertEqual(State.IDLE | State.HANDLING_INSTRUCTION, state)
+        self.assertEqual(State.IDLE | State.HANDLING_INSTRUCTION, redis.get_current_state())
+        client.get.assert_called_once_with('state')
+        client.set.assert_called_with('state', (State.IDLE | State.HANDLING_INSTRUCTION).value)
+        client.save.assert_not_called()
+
+    def test_given_many_state_updates_when_the_debounce_window_passes_then_a_single_bgsave_is_issued(
+            self, mock_strict_redis, mock_logger, mock_config):
+        mock_config.redis_save_debounce_sec = 0.1
+        client = mock_strict_redis.return_value
+        client.get.return_value = None
+        configure(mock_config)
+        redis = Redis(0, mock_config, mock_logger)
+
+        self.assertEqual(State.UNKNOWN, redis.get_current_state())
+        for _ in range(10):
+            redis.set_state(State.IDLE)
+        time.sleep(0.3)
+
+        client.bgsave.assert_called_once()
+        client.save.assert_not_called()
+
+    def test_given_a_persisted_log_event_when_items_are_appended_then_only_new_items_are_pushed(
+            self, mock_strict_redis, mock_logger, mock_config):
+        mock_config.redis_save_debounce_sec = 10
+        client = mock_strict_redis.return_value
+        client.smembers.return_value = set()
+        pipe = client.pipeline.return_value
+        event = LogEvent('message')
+        mock_logger.get_log_event.return_value = event
+        configure(mock_config)
+        redis = Redis(0, mock_config, mock_logger)
+
+        event.add_to_cached_item(serial_in='[9]')
+        event.add_cached_item_to_key('serial')
+        redis.set_log_item_state(mock_logger)
+        client.reset_mock()
+
+        event.add_to_cached_item(serial_in='[1]')
+        event.add_cached_item_to_key('serial')
+        redis.set_log_item_state(mock_logger)
+
+        pipe.set.assert_not_called()
+        pipe.delete.assert_not_called()
+        pipe.rpush.assert_called_once_with('log_item:serial', json.dumps({'serial_in': '[1]'}))
+        pipe.execute.assert_called_once()
+        client.rpush.assert_not_called()
+
+    def test_given_a_log_event_with_sections_in_redis_when_it_is_loaded_then_the_sections_are_restored(
+            self, mock_strict_redis, mock_logger, mock_config):
+        client = mock_strict_redis.return_value
+        pipe = client.pipeline.return_value
+        pipe.execute.side_effect = [[json.dumps({'message': 'message'}), {'serial'}],
+                                    [[json.dumps({'serial_in': '[9]'})]]]
+        configure(mock_config)
+        redis = Redis(0, mock_config, mock_logger)
+
+        self.assertTrue(redis.get_log_item_state(mock_logger))
+        mock_logger.set_log_event_state.assert_called_once_with({'message': 'message',
+                                                                 'serial': [{'serial_in': '[9]'}]})
+        pipe.lrange.assert_called_once_with('log_item:serial', 0, -1)
+        self.assertEqual(2, pipe.execute.call_count)
+
+    def test_given_the_commands_of_an_instruction_then_every_command_is_journaled_with_a_single_xadd(
+            self, mock_strict_redis, mock_logger, mock_config):
+        client = mock_strict_redis.return_value
+        configure(mock_config, journal_max_len=100, redis_durability='sync')
+        redis = Redis(0, mock_config, mock_logger)
+        instruction = {'instructionId': 'instruction-1', 'type': 'WATER'}
+
+        redis.set_current_action(instruction, {'Str': '1', 'index': 0})
+        redis.set_position(1, 2, 3)
+        redis.set_current_action(instruction, {'Str': '16', 'index': 1})
+
+        self.assertEqual([mock.call('journal', {'event': 'start', 'id': 'instruction-1', 'index': 0, 'position': ''}),
+                          mock.call('journal', {'event': 'start', 'id': 'instruction-1', 'index': 1,
+                                                'position': json.dumps({'x': 1, 'y': 2, 'z': 3})})],
+                         client.xadd.call_args_list)
+        client.hmset.assert_called_once_with('position', {'x': 1, 'y': 2, 'z': 3})
+        self.assertEqual(3, client.save.call_count)
+        self.assertEqual((instruction, {'Str': '16', 'index': 1}), redis.get_current_action())
+
+    def test_given_a_full_journal_then_only_the_instructions_that_ended_before_the_oldest_unfinished_one_are_trimmed(
+            self, mock_strict_redis, mock_logger, mock_config):
+        client = mock_strict_redis.return_value
+        client.xrange.return_value = [
+            ('1-0', {'event': 'instruction', 'id': 'a'}), ('2-0', {'event': 'start', 'id': 'a', 'index': '0'}),
+            ('3-0', {'event': 'end', 'id': 'a'}), ('4-0', {'event': 'instruction', 'id': 'b'}),
+            ('5-0', {'event': 'instruction', 'id': 'c'}), ('6-0', {'event': 'start', 'id': 'c', 'index': '0'}),
+            ('7-0', {'event': 'end', 'id': 'c'})]
+        configure(mock_config, journal_max_len=2, redis_durability='aof')
+        redis = Redis(0, mock_config, mock_logger)
+
+        redis.journal_end({'instructionId': 'c'})
+        client.xtrim.assert_not_called()
+        redis.journal_queued({'instructionId': 'b'})
+
+        client.xtrim.assert_called_once_with('journal', minid='4-0', approximate=False)
+
+    def test_given_a_journal_after_a_reboot_then_the_current_action_is_the_last_started_command(
+            self, mock_strict_redis, mock_logger, mock_config):
+        client = mock_strict_redis.return_value
+        instruction = {'instructionId': 'instruction-1', 'type': 'WATER'}
+        client.xrange.return_value = [
+            ('1-0', {'event': 'instruction', 'id': 'instruction-1', 'instruction': json.dumps(instruction),
+                     'commands': json.dumps([{'Str': '1'}, {'Str': '16'}])}),
+            ('2-0', {'event': 'start', 'id': 'instruction-1', 'index': '0', 'position': ''}),
+            ('3-0', {'event': 'start', 'id': 'instruction-1', 'index': '1', 'position': ''})]
+        configure(mock_config)
+        redis = Redis(0, mock_config, mock_logger)
+
+        self.assertEqual((instruction, {'Str': '16'}), redis.get_current_action())
+        self.assertEqual((instruction, {'Str': '16'}), redis.get_current_action())
+        client.xrange.assert_called_once_with('journal')
+
+    def test_given_a_redis_socket_then_the_pool_connects_over_it(self, mock_strict_redis, mock_logger, mock_config):
+        configure(mock_config, redis_socket='/tmp/redis.sock', redis_pool_size=2)
+        Redis(3, mock_config, mock_logger)
+
+        pool = mock_strict_redis.call_args.kwargs['connection_pool']
+        self.assertIsInstance(pool, BlockingConnectionPool)
+        self.assertEqual(20, pool.timeout)
+        self.assertIs(CountingUnixDomainSocketConnection, pool.connection_class)
+        self.assertEqual('/tmp/redis.sock', pool.connection_kwargs['path'])
+        self.assertEqual(3, pool.connection_kwargs['db'])
+        self.assertEqual(2, pool.max_connections)
+
+    def test_given_the_sync_durability_then_a_position_change_is_saved_before_it_returns(
+            self, mock_strict_redis, mock_logger, mock_config):
+        client = mock_strict_redis.return_value
+        configure(mock_config, redis_durability='sync')
+        redis = Redis(0, mock_config, mock_logger)
+
+        redis.set_position(1, 2, 3)
+
+        client.save.assert_called_once()
+        client.config_set.assert_not_called()
+
+    def test_given_the_aof_durability_then_redis_fsyncs_every_second_and_is_never_asked_to_save(
+            self, mock_strict_redis, mock_logger, mock_config):
+        client = mock_strict_redis.return_value
+        client.config_get.side_effect = lambda name: {name: 'no'}
+        configure(mock_config, redis_durability='aof', redis_save_debounce_sec=0.05)
+        redis = Redis(0, mock_config, mock_logger)
+
+        redis.set_position(1, 2, 3)
+        redis.set_state(State.IDLE)
+        redis.checkpoint()
+        time.sleep(0.1)
+
+        self.assertEqual([mock.call('appendonly', 'yes'), mock.call('appendfsync', 'everysec')],
+                         client.config_set.call_args_list)
+        client.save.assert_not_called()
+        client.bgsave.assert_not_called()
+
+    def test_given_a_server_that_is_more_durable_already_then_its_settings_are_kept(
+            self, mock_strict_redis, mock_logger, mock_config):
+        client = mock_strict_redis.return_value
+        client.config_get.side_effect = lambda name: {name: {'appendonly': 'yes', 'appendfsync': 'always'}[name]}
+        configure(mock_config, redis_durability='aof')
+        Redis(0, mock_config, mock_logger)
+        configure(mock_config, redis_durability='bgsave')
+        Redis(0, mock_config, mock_logger)
+
+        client.config_set.assert_not_called()
+
+    def test_given_a_known_position_then_an_axis_is_read_without_asking_redis(
+            self, mock_strict_redis, mock_logger, mock_config):
+        client = mock_strict_redis.return_value
+        configure(mock_config, redis_durability='aof')
+        redis = Redis(0, mock_config, mock_logger)
+
+        redis.set_position(1, 2, 3)
+        redis.set_axis_position('x', 4)
+
+        self.assertEqual((4, 2), (redis.get_axis_position('x'), redis.get_axis_position('y')))
+        client.hget.assert_not_called()
+
+    def test_given_the_checkpoint_durability_then_the_changes_are_saved_once_at_the_checkpoint(
+            self, mock_strict_redis, mock_logger, mock_config):
+        client = mock_strict_redis.return_value
+        configure(mock_config, redis_durability='checkpoint', redis_save_debounce_sec=0.05)
+        redis = Redis(0, mock_config, mock_logger)
+
+        redis.set_position(1, 2, 3)
+        redis.set_axis_position('x', 4)
+        redis.set_state(State.IDLE)
+        time.sleep(0.1)
+        client.bgsave.assert_not_called()
+
+        redis.checkpoint()
+        redis.checkpoint()
+
+        client.bgsave.assert_called_once()
+        client.save.assert_not_called()
+
+
+class OpCounterTest(unittest.TestCase):
+    def test_given_single_and_pipelined_commands_then_commands_and_round_trips_are_counted(self):
+        counter = OpCounter()
+        connection = CountingConnection(op_counter=counter)
+        connection._sock = mock.Mock()
+
+        connection.send_command('GET', 'state')
+        connection.send_packed_command(connection.pack_commands([('RPUSH', 'log_item:serial', '{}'),
+                                                                 ('SADD', 'log_item:sections', 'serial')]))
+
+        self.assertEqual({'commands': {'GET': 1, 'RPUSH': 1, 'SADD': 1}, 'total': 3, 'round_trips': 2},
+                         counter.get_metrics())
@@ -0,0 +1,97 @@
+import threading
+import time
+import unittest
+
+from common.Interval import Interval
+from common.scheduler import Scheduler, get_scheduler
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.scheduler = Scheduler('test-scheduler')
+
+    def tearDown(self) -> None:
+        self.scheduler.stop()
+
+    def test_given_one_shot_jobs_then_they_run_once_in_order_of_their_due_time(self):
+        runs = []
+        self.scheduler.schedule(0.2, runs.append, 'late')
+        self.scheduler.schedule(0.1, runs.append, 'early')
+
+        time.sleep(0.4)
+
+        self.assertEqual(['early', 'late'], runs)
+        self.assertEqual(0, self.scheduler.pending())
+
+    def test_given_a_cancelled_job_then_it_does_not_run(self):
+        runs = []
+        job = self.scheduler.schedule(0.1, runs.append, 'cancelled')
+
+        job.cancel()
+        time.sleep(0.2)
+
+        self.assertEqual([], runs)
+
+    def test_given_a_periodic_job_when_it_is_reset_then_the_next_run_moves_without_new_threads(self):
+        runs = []
+        job = self.scheduler.schedule(0.2, runs.append, 'run', period=0.2, name='periodic')
+        threads = threading.active_count()
+
+        for _ in range(5):
+            time.sleep(0.1)
+            job.reset()
+        self.assertEqual([], runs)
+        self.assertEqual(threads, threading.active_count())
+
+        time.sleep(0.5)
+        self.assertEqual(2, len(runs))
+        metrics = self.scheduler.get_metrics()['jobs']['periodic']
+        self.assertEqual(2, metrics['runs'])
+        self.assertLess(metrics['max_drift_ms'], 100)
+
+    def test_given_a_failing_job_then_the_scheduler_goes_on(self):
+        runs = []
+        failing = self.scheduler.schedule(0.05, lambda: 1 / 0)
+        self.scheduler.schedule(0.1, runs.append, 'after')
+
+        time.sleep(0.2)
+
+        self.assertEqual(1, failing.failures)
+        self.assertEqual(['after'], runs)
+
+    def test_given_an_interval_then_it_reports_runs_and_run_time(self):
+        interval = Interval(0.1, time.sleep, lambda: (0.05,), scheduler=self.scheduler)
+        try:
+            time.sleep(0.35)
+        finally:
+            interval.stop()
+
+        metrics = interval.get_metrics()
+        self.assertGreaterEqual(metrics['runs'], 2)
+        self.assertGreaterEqual(metrics['max_runtime_ms'], 50)
+
+    def test_given_an_interval_that_blocks_then_the_other_jobs_still_run_on_time(self):
+        release = threading.Event()
+        interval = Interval(0.05, release.wait, lambda: (1,), scheduler=self.scheduler)
+        runs = []
+        try:
+            self.scheduler.schedule(0.15, runs.append, 'on time')
+            time.sleep(0.25)
+            self.assertEqual(['on time'], runs)
+        finally:
+            release.set()
+            interval.stop()
+
+        self.assertGreaterEqual(interval.get_metrics()['skipped'], 1)
+
+    def test_given_a_stopped_scheduler_then_it_refuses_jobs_and_is_not_shared_anymore(self):
+        job = self.scheduler.schedule(0.1, lambda: None)
+        self.scheduler.stop()
+
+        self.assertRaises(RuntimeError, self.scheduler.schedule, 0.1, lambda: None)
+        self.assertRaises(RuntimeError, job.reset)
+
+        shared = get_scheduler()
+        shared.stop()
+        self.assertIsNot(shared, get_scheduler())
+        self.assertFalse(get_scheduler().stopped)
@@ -1,4 +1,5 @@
 import random
+import time
 import unittest
 from unittest import mock
 from unittest.mock import patch
@@ -6,7 +7,18 @@ from unittest.mock import patch
 import serial
 
 from common.serial_manager import SerialManager
-from model.firmware_error import FirmwareError
+from model.firmware_error import FirmwareError, SerialTimeoutError
+from model.firmware_reply import FirmwareReply
+
+
+def configure(mock_config, probe_sec=0.1):
+    mock_config.serial_timeout_probe_sec = probe_sec
+    mock_config.serial_travel_timeouts = True
+    mock_config.serial_timeout_margin = 2
+    mock_config.serial_timeout_right = mock_config.serial_timeout_left = 5
+    mock_config.serial_speed_x = mock_config.serial_speed_y = mock_config.serial_speed_z = 100
+    mock_config.serial_supervisor_interval_sec = 0
+    mock_config.serial_reconnect_wait_sec = 1
 
 
 @mock.patch('common.config.Config')
@@ -18,39 +30,187 @@ class TestSerialManager(unittest.TestCase):
 
     def test_given_a_error_in_serial_output_when_is_ok_is_called_then_false_is_returned(self, mock_glob, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
         mock_glob.return_value = ['/dev/tty1', '/dev/tty2']
+        configure(mock_config)
 
-        with (patch.object(serial.Serial, "write", return_value=None),
-              patch.object(serial.Serial, "readline", return_value=b'')):
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", return_value=b''):
 
             serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
-            self.assertFalse(serial_manager.is_ok([b'5', b'1', b'50020'], [b'5', b'2', b'50023']))
-            self.assertFalse(serial_manager.is_ok([b'4', b'1', b'50020'], [b'5', b'2', b'50023']))
-            self.assertFalse(serial_manager.is_ok([b'5', b'1', b'50020'], [b'4', b'2', b'50023']))
-            self.assertTrue(serial_manager.is_ok([b'4', b'1', b'50020'], [b'4', b'2', b'50023']))
+            self.assertFalse(serial_manager.is_ok(FirmwareReply(b'5 1 50020'), FirmwareReply(b'5 2 50023')))
+            self.assertFalse(serial_manager.is_ok(FirmwareReply(b'4 1 50020'), FirmwareReply(b'5 2 50023')))
+            self.assertFalse(serial_manager.is_ok(FirmwareReply(b'5 1 50020'), FirmwareReply(b'4 2 50023')))
+            self.assertTrue(serial_manager.is_ok(FirmwareReply(b'4 1 50020'), FirmwareReply(b'4 2 50023')))
 
     def test_given_a_error_in_serial_output_when_get_error_info_is_called_then_a_proper_error_is_returned(self, mock_glob, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
         mock_glob.return_value = ['/dev/tty1', '/dev/tty2']
+        configure(mock_config)
 
-        with (patch.object(serial.Serial, "write", return_value=None),
-              patch.object(serial.Serial, "readline", return_value=b'')):
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", return_value=b''):
             expected_firmware_errors = [FirmwareError(random.randint(5000, 6000), 'Fake error 1', 'Fake error 1'),
                                         FirmwareError(random.randint(5000, 6000), 'Fake error 2', 'Fake error 2')]
 
             mock_firmware_error_info.get_error.side_effect = expected_firmware_errors
 
             serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
-            actual_firmware_errors = serial_manager.get_firmware_error([b'5', b'1', b'50020'], [b'5', b'2', b'50023'])
+            actual_firmware_errors = serial_manager.get_firmware_error(FirmwareReply(b'5 1 50020'),
+                                                                       FirmwareReply(b'5 2 50023'))
             self.assertEqual(expected_firmware_errors, actual_firmware_errors)
 
     def test_given_no_errors_in_serial_output_when_get_error_info_is_called_then_an_empty_list_is_returned(self, mock_glob, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
         mock_glob.return_value = ['/dev/tty1', '/dev/tty2']
+        configure(mock_config)
 
-        with (patch.object(serial.Serial, "write", return_value=None),
-              patch.object(serial.Serial, "readline", return_value=b'')):
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", return_value=b''):
             expected_firmware_errors = []
 
             mock_firmware_error_info.get_error.side_effect = expected_firmware_errors
 
             serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
-            actual_firmware_errors = serial_manager.get_firmware_error([b'4', b'1', b'50020'], [b'3', b'2', b'50023'])
+            actual_firmware_errors = serial_manager.get_firmware_error(FirmwareReply(b'4 1 50020'),
+                                                                       FirmwareReply(b'3 2 50023'))
             self.assertEqual(expected_firmware_errors, actual_firmware_errors)
+
+    def test_given_parallel_receive_when_both_boards_are_slow_then_they_are_read_concurrently(self, mock_glob, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        mock_glob.return_value = ['/dev/tty1', '/dev/tty2']
+        configure(mock_config)
+        mock_config.serial_parallel_receive = True
+
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", return_value=b''):
+            serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+
+        answers = {id(serial_manager._right): b'9 1 120 30\r\n', id(serial_manager._left): b'9 2 450 30\r\n'}
+
+        def slow_readline(port):
+            time.sleep(0.5)
+            return answers[id(port)]
+
+        with patch.object(serial.Serial, "readline", slow_readline):
+            start = time.monotonic()
+            left, right = serial_manager.receive()
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(b'9 2 450 30\r\n', left.raw)
+        self.assertEqual(b'9 1 120 30\r\n', right.raw)
+        self.assertLess(elapsed, 0.9)
+
+    def test_given_pipelining_when_probes_are_requested_then_they_are_written_at_once_and_answered_in_order(self, mock_glob, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        mock_glob.return_value = ['/dev/tty1', '/dev/tty2']
+        configure(mock_config)
+        mock_config.serial_parallel_receive = True
+        mock_config.serial_pipelining = True
+
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", return_value=b''):
+            serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+
+        written = []
+        answers = {id(serial_manager._right): [b'16 1 40\r\n', b'9 1 100 20\r\n'],
+                   id(serial_manager._left): [b'16 2\r\n', b'9 2 300 20\r\n']}
+
+        with patch.object(serial.Serial, "write", lambda port, data: written.append(data)), \
+                patch.object(serial.Serial, "readline", lambda port: answers[id(port)].pop(0)):
+            (water_left, water_right), (position_left, position_right) = serial_manager.request_many([[16], [9]])
+
+        self.assertEqual([bytes([16, 9]), bytes([16, 9])], written)
+        self.assertEqual(40, water_right.get_int(2))
+        self.assertEqual(b'9 2 300 20\r\n', position_left.raw)
+        self.assertEqual(b'9 1 100 20\r\n', position_right.raw)
+
+    def test_given_pipelining_when_an_answer_belongs_to_another_probe_then_it_is_not_ok(self, mock_glob, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        mock_glob.return_value = ['/dev/tty1', '/dev/tty2']
+        configure(mock_config)
+        mock_config.serial_parallel_receive = False
+        mock_config.serial_pipelining = True
+
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", return_value=b''):
+            serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+
+        answers = {id(serial_manager._right): [b'9 1 100 20\r\n', b'5 1 50020\r\n'],
+                   id(serial_manager._left): [b'1 2 700\r\n', b'9 2 300 20\r\n']}
+
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", lambda port: answers[id(port)].pop(0)):
+            (weight_left, weight_right), (position_left, position_right) = serial_manager.request_many([[1], [9]])
+            with self.assertRaises(ValueError):
+                serial_manager.request_many([[9], [0, 1, 0, 1, 0, 0, 0, 80]])
+
+        self.assertFalse(serial_manager.is_ok(weight_left, weight_right))
+        self.assertFalse(serial_manager.is_ok(position_left, position_right))
+        self.assertEqual(b'5 1 50020\r\n', position_right.raw)
+
+        flushed = []
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "reset_input_buffer", lambda port: flushed.append(port), create=True):
+            serial_manager.send([16])
+
+        self.assertEqual([serial_manager._right], flushed)
+
+    def test_given_a_board_that_does_not_answer_when_receiving_then_a_timeout_error_is_returned_in_time(self, mock_glob, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        mock_glob.return_value = ['/dev/tty1', '/dev/tty2']
+        configure(mock_config, probe_sec=0.3)
+        mock_config.serial_parallel_receive = True
+
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", return_value=b'Side: Right version: 1\r\n'):
+            serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+
+        def readline(port):
+            time.sleep(0.05)
+            return b'16 1 40\r\n' if port is serial_manager._right else b''
+
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", readline), \
+                patch.object(serial.Serial, "reset_input_buffer", create=True) as reset_input_buffer:
+            start = time.monotonic()
+            serial_manager.send([16])
+            left, right = serial_manager.receive()
+            elapsed = time.monotonic() - start
+            serial_manager.send([16])
+
+        self.assertTrue(right.ok)
+        self.assertFalse(serial_manager.is_ok(left, right))
+        self.assertLess(elapsed, 0.6)
+        [error] = serial_manager.get_firmware_error(left, right)
+        self.assertIsInstance(error, SerialTimeoutError)
+        self.assertEqual(('left', 16), (error.side, error.code))
+        reset_input_buffer.assert_called_once()
+
+    def test_given_a_board_that_fails_to_write_when_it_is_reconnected_then_the_handshake_runs_on_the_new_devices(self, mock_glob, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        mock_glob.return_value = ['/dev/tty1', '/dev/tty2']
+        configure(mock_config)
+
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", return_value=b'Side: Right version: 1\r\n'):
+            serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+        self.assertTrue(serial_manager.update_devices(['/dev/tty1', '/dev/tty2']))
+
+        with patch.object(serial.Serial, "write", side_effect=serial.SerialException('gone')):
+            serial_manager.send([16])
+        self.assertFalse(serial_manager.update_devices(['/dev/tty1', '/dev/tty2']))
+
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", return_value=b'Side: Left version: 1\r\n'), \
+                patch.object(serial.Serial, "close", create=True):
+            self.assertTrue(serial_manager.reconnect(['/dev/tty3', '/dev/tty4']))
+
+        self.assertEqual(('/dev/tty4', '/dev/tty3'), serial_manager._devices)
+        self.assertTrue(serial_manager.update_devices(['/dev/tty3', '/dev/tty4']))
+        self.assertFalse(serial_manager.update_devices(['/dev/tty3']))
+
+    def test_given_a_board_that_is_plugged_back_under_the_same_name_then_it_is_lost(self, mock_glob, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        mock_glob.return_value = ['/dev/tty1', '/dev/tty2']
+        configure(mock_config)
+        ttys = {'/dev/tty1': mock.Mock(st_rdev=1, st_ino=10), '/dev/tty2': mock.Mock(st_rdev=2, st_ino=20)}
+
+        with patch.object(serial.Serial, "write", return_value=None), \
+                patch.object(serial.Serial, "readline", return_value=b'Side: Right version: 1\r\n'), \
+                patch('os.stat', lambda device: ttys[device]):
+            serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+            self.assertTrue(serial_manager.update_devices(['/dev/tty1', '/dev/tty2']))
+
+            ttys['/dev/tty2'] = mock.Mock(st_rdev=3, st_ino=30)
+            self.assertFalse(serial_manager.update_devices(['/dev/tty1', '/dev/tty2']))
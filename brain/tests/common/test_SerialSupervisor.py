@@ -0,0 +1,54 @@
+# type: ignore
+import time
+import unittest
+from unittest import mock
+
+from common.scheduler import Scheduler
+from common.serial_supervisor import SerialSupervisor
+
+
+@mock.patch('common.log_event.Logger')
+@mock.patch('glob.glob')
+class SerialSupervisorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.scheduler = Scheduler('test-supervisor')
+        self.serial_manager = mock.Mock()
+
+    def tearDown(self) -> None:
+        self.scheduler.stop()
+
+    def test_given_lost_boards_when_both_devices_are_back_then_they_are_reconnected_once(self, mock_glob, mock_logger):  # noqa: E501
+        mock_glob.return_value = ['/dev/ttyUSB0', '/dev/ttyUSB1']
+        self.serial_manager.update_devices.return_value = False
+        self.serial_manager.reconnect.side_effect = lambda devices: time.sleep(0.1) or True
+        supervisor = SerialSupervisor(self.serial_manager, '/dev/ttyUSB*', 10, mock_logger, self.scheduler)
+
+        supervisor.check()
+        supervisor.check()
+        time.sleep(0.2)
+
+        self.serial_manager.reconnect.assert_called_once_with(['/dev/ttyUSB0', '/dev/ttyUSB1'])
+        self.assertEqual(1, supervisor.reconnects)
+
+    def test_given_lost_boards_when_a_device_is_missing_then_it_waits(self, mock_glob, mock_logger):
+        mock_glob.return_value = ['/dev/ttyUSB0']
+        self.serial_manager.update_devices.return_value = False
+        supervisor = SerialSupervisor(self.serial_manager, '/dev/ttyUSB*', 10, mock_logger, self.scheduler)
+
+        supervisor.check()
+        supervisor.check()
+        time.sleep(0.1)
+
+        self.serial_manager.reconnect.assert_not_called()
+        self.assertEqual(1, mock_logger.log_system.call_count)
+
+    def test_given_connected_boards_when_woken_then_it_only_checks_the_devices(self, mock_glob, mock_logger):
+        mock_glob.return_value = ['/dev/ttyUSB0', '/dev/ttyUSB1']
+        self.serial_manager.update_devices.return_value = True
+        supervisor = SerialSupervisor(self.serial_manager, '/dev/ttyUSB*', 10, mock_logger, self.scheduler)
+
+        supervisor.wake()
+        time.sleep(0.1)
+
+        self.serial_manager.update_devices.assert_called_once_with(['/dev/ttyUSB0', '/dev/ttyUSB1'])
+        self.serial_manager.reconnect.assert_not_called()
@@ -0,0 +1,53 @@
+import unittest
+from unittest import mock
+
+from actions.instruction_compiler import compile_command
+from common.serial_timeouts import SerialTimeouts
+from model.firmware_reply import FirmwareReply
+
+
+class SerialTimeoutsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.config = mock.Mock(serial_timeout_probe_sec=2, serial_timeout_margin=2, serial_timeout_right=300,
+                                serial_timeout_left=120, serial_speed_x=400, serial_speed_y=200, serial_speed_z=100,
+                                serial_travel_timeouts=True)
+        self.timeouts = SerialTimeouts(self.config)
+
+    def test_given_probes_and_pauses_then_they_get_short_timeouts(self):
+        self.assertEqual({'right': 2, 'left': 2}, self.timeouts.get_timeouts([16]))
+        self.assertEqual({'right': 7, 'left': 7}, self.timeouts.get_timeouts([3, 5]))
+
+    def test_given_a_move_from_an_unknown_position_then_the_boards_get_their_configured_timeout(self):
+        self.assertEqual({'right': 300, 'left': 120}, self.timeouts.get_timeouts([0, 16, 1, 44, 1, 0, 0, 80]))
+
+    def test_given_a_known_position_then_a_move_gets_its_travel_time_with_a_margin(self):
+        self.timeouts.observe([9], FirmwareReply(b'9 2 300 0\r\n'), FirmwareReply(b'9 1 0 0\r\n'))
+
+        # x: 1000 units at 400 * 0.5 per second, y: 100 units at 200 * 0.5 per second
+        self.assertEqual({'right': 2 + 5 * 2, 'left': 2 + 1 * 2},
+                         self.timeouts.get_timeouts([0, 232, 3, 144, 1, 0, 0, 50]))
+
+        self.timeouts.observe([0, 232, 3, 144, 1, 0, 0, 50], FirmwareReply(b'0 2\r\n'), FirmwareReply(b'0 1\r\n'))
+        self.assertEqual({'x': 1000, 'y': 400, 'z': 0}, self.timeouts.position)
+
+    def test_given_a_literal_move_then_its_speed_is_read_from_the_speed_byte(self):
+        self.timeouts.observe([9], FirmwareReply(b'9 2 0 0\r\n'), FirmwareReply(b'9 1 0 0\r\n'))
+        move = compile_command({'Str': '0 16 1 44 1 0 0 80'})
+
+        # x: 272 units at 400 * 0.8 per second, y: 300 units at 200 * 0.8 per second
+        self.assertEqual({'right': 2 + 0.85 * 2, 'left': 2 + 1.875 * 2}, self.timeouts.get_timeouts(move['args']))
+
+    def test_given_travel_timeouts_are_not_enabled_then_moves_get_the_configured_timeout(self):
+        self.config.serial_travel_timeouts = False
+        timeouts = SerialTimeouts(self.config)
+        timeouts.observe([9], FirmwareReply(b'9 2 300 0\r\n'), FirmwareReply(b'9 1 0 0\r\n'))
+
+        self.assertEqual({'right': 300, 'left': 120}, timeouts.get_timeouts([0, 232, 3, 144, 1, 0, 0, 50]))
+        self.assertEqual({'right': 2, 'left': 2}, timeouts.get_timeouts([9]))
+
+    def test_given_a_failed_move_then_the_position_of_its_axes_is_unknown(self):
+        self.timeouts.observe([9], FirmwareReply(b'9 2 300 0\r\n'), FirmwareReply(b'9 1 0 0\r\n'))
+        self.timeouts.observe([7, 0, 0, 2, 0, 0, 0, 20], FirmwareReply(b'5 2 50023\r\n'), FirmwareReply(b'7 1\r\n'))
+
+        self.assertEqual({'x': 0, 'y': None, 'z': 0}, self.timeouts.position)
+        self.assertEqual({'right': 2, 'left': 120}, self.timeouts.get_timeouts([7, 0, 0, 2, 0, 0, 0, 20]))
@@ -0,0 +1,66 @@
+# type: ignore
+import time
+import unittest
+from unittest import mock
+
+from common.startup import Startup, StartupError
+
+
+@mock.patch('common.log_event.Logger')
+class StartupTest(unittest.TestCase):
+
+    def test_given_independent_steps_then_they_run_at_the_same_time(self, mock_logger):
+        startup = Startup(mock_logger)
+        startup.add('serial', lambda: time.sleep(0.2) or 'serial')
+        startup.add('mqtt', lambda: time.sleep(0.2) or 'mqtt')
+
+        start = time.monotonic()
+        results = startup.run()
+
+        self.assertLess(time.monotonic() - start, 0.35)
+        self.assertEqual({'serial': 'serial', 'mqtt': 'mqtt'}, results)
+        report = startup.get_report()
+        self.assertGreaterEqual(report['sequential_ms'], 400)
+        self.assertLess(report['total_ms'], 350)
+
+    def test_given_a_step_with_requirements_then_it_starts_after_them_with_their_results(self, mock_logger):
+        startup = Startup(mock_logger)
+        startup.add('serial', lambda: time.sleep(0.1) or 'serial')
+        startup.add('redis', lambda: 'redis')
+        startup.add('actions', lambda serial, redis: (serial, redis), requires=['serial', 'redis'])
+
+        results = startup.run()
+
+        self.assertEqual(('serial', 'redis'), results['actions'])
+        steps = startup.get_report()['steps']
+        self.assertGreaterEqual(steps['actions']['start_ms'], steps['serial']['end_ms'])
+
+    def test_given_a_step_that_exits_then_the_startup_exits_with_its_code(self, mock_logger):
+        startup = Startup(mock_logger)
+        startup.add('redis', lambda: exit(-2))
+        startup.add('actions', lambda redis: redis, requires=['redis'])
+
+        with self.assertRaises(SystemExit) as exited:
+            startup.run()
+
+        self.assertEqual(-2, exited.exception.code)
+
+    def test_given_a_failing_step_then_the_steps_that_require_it_fail_too(self, mock_logger):
+        startup = Startup(mock_logger)
+        startup.add('redis', lambda: 1 / 0)
+        startup.add('mqtt', lambda: 'mqtt')
+        startup.add('actions', lambda redis: redis, requires=['redis'])
+
+        with self.assertRaises(StartupError) as error:
+            startup.run()
+
+        self.assertEqual('redis', error.exception.step)
+        self.assertIsInstance(error.exception.error, ZeroDivisionError)
+        self.assertIn('actions not done', startup.get_report_line())
+
+    def test_given_an_unknown_or_duplicate_step_then_it_cannot_be_added(self, mock_logger):
+        startup = Startup(mock_logger)
+        startup.add('serial', lambda: None)
+
+        self.assertRaises(ValueError, startup.add, 'serial', lambda: None)
+        self.assertRaises(ValueError, startup.add, 'actions', lambda redis: None, requires=['redis'])
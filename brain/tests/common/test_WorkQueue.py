@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+
+from common.work_queue import WorkQueue
+
+
+class WorkQueueTest(unittest.TestCase):
+
+    def test_given_queued_items_when_get_is_called_then_they_are_returned_in_fifo_order(self):
+        queue = WorkQueue()
+        queue.put('first')
+        queue.put('second')
+
+        self.assertEqual(2, len(queue))
+        self.assertEqual('first', queue.get())
+        self.assertEqual('second', queue.get())
+        self.assertEqual(0, len(queue))
+
+    def test_given_an_empty_queue_when_get_times_out_then_none_is_returned(self):
+        queue = WorkQueue()
+
+        self.assertIsNone(queue.get(timeout=0.05))
+
+    def test_given_a_waiting_consumer_when_an_item_is_put_then_it_wakes_up_immediately(self):
+        queue = WorkQueue()
+        received = []
+
+        def consume():
+            received.append((queue.get(timeout=5), time.monotonic()))
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        time.sleep(0.1)
+        put_at = time.monotonic()
+        queue.put('instruction')
+        consumer.join(timeout=5)
+
+        self.assertEqual('instruction', received[0][0])
+        self.assertLess(received[0][1] - put_at, 0.5)
+        self.assertEqual(1, queue.latency.count)
+        self.assertLess(queue.latency.last, 0.5)
+
+    def test_given_queued_items_when_cleared_then_the_queue_is_empty(self):
+        queue = WorkQueue()
+        queue.put('first')
+        queue.put('second')
+
+        queue.clear()
+
+        self.assertEqual(0, len(queue))
+        self.assertIsNone(queue.get(timeout=0.01))
+
+    def test_given_a_waiting_consumer_when_an_item_is_put_then_wait_returns_without_taking_it(self):
+        queue = WorkQueue()
+        threading.Timer(0.05, queue.put, args=('item',)).start()
+
+        self.assertTrue(queue.wait(timeout=5))
+        self.assertEqual(1, len(queue))
+        self.assertFalse(WorkQueue().wait(timeout=0.01))
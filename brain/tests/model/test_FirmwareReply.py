@@ -0,0 +1,45 @@
+import unittest
+
+from model.firmware_reply import FirmwareReply
+
+
+class FirmwareReplyTest(unittest.TestCase):
+    def test_given_a_position_answer_then_code_side_and_fields_are_parsed(self):
+        reply = FirmwareReply(b'9 1 12034 -30\r\n')
+
+        self.assertEqual(9, reply.code)
+        self.assertEqual(1, reply.board)
+        self.assertEqual('right', reply.side)
+        self.assertEqual((9, 1, 12034, -30), reply.fields)
+        self.assertEqual(12034, reply.get_int(2))
+        self.assertEqual(-30, reply.get_int(3))
+        self.assertTrue(reply.ok)
+        self.assertFalse(reply.is_error)
+
+    def test_given_an_error_answer_then_it_is_not_ok_and_has_an_error_id(self):
+        reply = FirmwareReply(b'5 2 50023\r\n', 'left')
+
+        self.assertTrue(reply.is_error)
+        self.assertFalse(reply.ok)
+        self.assertEqual(50023, reply.error_id)
+
+    def test_given_an_empty_answer_then_it_is_not_ok(self):
+        reply = FirmwareReply(b'')
+
+        self.assertTrue(reply.is_empty)
+        self.assertFalse(reply.ok)
+        self.assertIsNone(reply.code)
+        self.assertIsNone(reply.error_id)
+
+    def test_given_text_and_decimal_fields_then_they_are_read_on_request(self):
+        reply = FirmwareReply(b'6 2 te.st.01.02 812.5\r\n')
+
+        self.assertEqual((6, 2, None, None), reply.fields)
+        self.assertEqual('te.st.01.02', reply.get_text(2))
+        self.assertEqual(812.5, reply.get_float(3))
+        self.assertEqual(['6', '2', 'te.st.01.02', '812.5'], reply.get_texts())
+        self.assertRaises(ValueError, reply.get_int, 2)
+
+    def test_given_two_replies_then_they_compare_by_their_line(self):
+        self.assertEqual(FirmwareReply(b'9 2 450 30\r\n', 'left'), FirmwareReply(b'9 2 450 30\r\n'))
+        self.assertNotEqual(FirmwareReply(b'9 2 450 30\r\n'), FirmwareReply(b'9 2 451 30\r\n'))
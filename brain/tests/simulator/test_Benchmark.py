@@ -0,0 +1,97 @@
+# type: ignore
+import copy
+import logging
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from simulator.benchmark import RECORDED_INSTRUCTIONS, ThroughputBenchmark, percentile
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        # Loggers of other tests may carry handlers with mocked levels
+        self.handlers = {name: logging.getLogger(name).handlers[:] for name in ['robot.event', 'robot.system']}
+        for name in self.handlers:
+            logging.getLogger(name).handlers.clear()
+
+    def tearDown(self):
+        for name, handlers in self.handlers.items():
+            logging.getLogger(name).handlers[:] = handlers
+
+    def test_given_latencies_when_percentile_is_called_then_the_nearest_rank_is_returned(self):
+        values = [float(value) for value in range(100, 0, -1)]
+        self.assertEqual(50.0, percentile(values, 50))
+        self.assertEqual(95.0, percentile(values, 95))
+        self.assertEqual(100.0, percentile(values, 100))
+        self.assertEqual(0.0, percentile([], 50))
+
+    def test_given_recorded_instructions_when_the_benchmark_runs_then_every_command_is_measured(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            benchmark = ThroughputBenchmark(workdir, time_scale=0.001, serial_latency_ms=0.5, serial_jitter_ms=0,
+                                            camera_capture_ms=1, camera_upload_ms=1)
+            try:
+                results = benchmark.run(RECORDED_INSTRUCTIONS, repetitions=1, timeout=30)
+            finally:
+                benchmark.stop()
+
+        self.assertEqual(len(RECORDED_INSTRUCTIONS), results['throughput']['instructions'])
+        self.assertEqual(sum(len(recorded['Commands']) for recorded in RECORDED_INSTRUCTIONS),
+                         results['throughput']['commands'])
+        self.assertEqual({'MOVE', 'WATER', 'PHOTO', 'VALIDATE', 'AUTOREFILL'}, set(results['instructions']))
+        self.assertEqual(2, results['commands']['WATER_LEVEL']['count'])
+        for category in ['serial', 'redis', 'logging', 'mqtt', 'other']:
+            self.assertIn(category, results['time_split_sec'])
+        self.assertGreater(results['redis_ops'], 0)
+
+    def test_given_a_fresh_snapshot_when_a_move_ran_then_reading_the_idle_telemetry_does_not_ask_the_boards(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            benchmark = ThroughputBenchmark(workdir, time_scale=0.001, serial_latency_ms=0.5, serial_jitter_ms=0,
+                                            config_overrides={'telemetry_ttl_sec': '60'})
+            try:
+                water = next(recorded for recorded in RECORDED_INSTRUCTIONS
+                             if recorded['Instruction']['type'] == 'WATER')
+                benchmark.run([water], repetitions=1, timeout=30)
+                action_manager = benchmark.action_manager
+                with mock.patch.object(benchmark.serial, 'request_many', wraps=benchmark.serial.request_many) as probe:
+                    water_level, position = action_manager.read_idle_telemetry(mock.Mock(), mock.Mock())
+            finally:
+                benchmark.stop()
+
+        probe.assert_not_called()
+        self.assertEqual((272, 250), (position.get().x, position.get().y))
+        self.assertTrue(water_level.isSuccess)
+
+    def test_given_a_queued_instruction_when_the_robot_restarts_after_the_one_before_finished_then_it_still_runs(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            os.makedirs(f'{workdir}/before')
+            os.makedirs(f'{workdir}/after')
+            move = next(recorded for recorded in RECORDED_INSTRUCTIONS if recorded['Instruction']['type'] == 'MOVE')
+            before = ThroughputBenchmark(f'{workdir}/before', time_scale=0.001, serial_latency_ms=0.5,
+                                         serial_jitter_ms=0)
+            try:
+                before.run([move], repetitions=1, timeout=30)
+                # The second instruction was queued, the process stopped before its first command
+                queued = copy.deepcopy(move)
+                queued['Instruction']['instructionId'] = 'queued-1'
+                before.redis.journal_instruction(*before.action_manager._compiler.compile(queued))
+            finally:
+                before.stop()
+
+            after = ThroughputBenchmark(f'{workdir}/after', time_scale=0.001, serial_latency_ms=0.5,
+                                        serial_jitter_ms=0, redis_store=before.redis_store)
+            try:
+                deadline = time.monotonic() + 30
+                while {'event': 'end', 'id': 'queued-1'} not in after.redis.get_journal() \
+                        and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                journal = after.redis.get_journal()
+            finally:
+                after.stop()
+
+        self.assertIn({'event': 'end', 'id': 'queued-1'}, journal)
+        self.assertEqual(1, sum(entry.get('event') == 'instruction' and entry['id'] == 'benchmark-0-0'
+                                for entry in journal))
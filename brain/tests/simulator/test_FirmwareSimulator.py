@@ -0,0 +1,131 @@
+# type: ignore
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from common.serial_manager import SerialManager
+from simulator.firmware import FirmwareSimulator, LatencyProfile
+
+
+@mock.patch('common.config.Config')
+@mock.patch('common.log_event.Logger')
+@mock.patch('actions.feedback.firmware_error_info.FirmwareErrorInfo')
+class TestFirmwareSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.links_dir = tempfile.TemporaryDirectory()
+        self.simulator = FirmwareSimulator(self.links_dir.name, latency=LatencyProfile(1, 0), time_scale=0.01,
+                                           swap_ports=True)
+
+    def tearDown(self):
+        self.simulator.stop()
+        self.links_dir.cleanup()
+
+    def test_given_swapped_ports_when_serial_manager_connects_then_the_handshake_fixes_left_and_right(self, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        mock_config.serial_name_pattern = self.simulator.pattern
+        mock_config.serial_timeout_probe_sec = 2
+        mock_config.serial_timeout_right = mock_config.serial_timeout_left = 5
+        mock_config.serial_supervisor_interval_sec = 0
+        mock_config.serial_parallel_receive = True
+
+        serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+        serial_manager.send([0, 100, 0, 44, 1, 20, 0, 100])
+        left, right = serial_manager.receive()
+        self.assertTrue(serial_manager.is_ok(left, right))
+
+        serial_manager.send([9])
+        left, right = serial_manager.receive()
+        self.assertEqual([b'9', b'1', b'100', b'20'], right.raw.split())
+        self.assertEqual([b'9', b'2', b'300', b'20'], left.raw.split())
+
+    def test_given_an_error_rate_when_commands_are_sent_then_firmware_errors_are_answered(self, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        self.simulator.right._errors.error_rate = 1.0
+        self.simulator.right._errors.error_codes = [50020]
+        mock_config.serial_name_pattern = self.simulator.pattern
+        mock_config.serial_timeout_probe_sec = 2
+        mock_config.serial_timeout_right = mock_config.serial_timeout_left = 5
+        mock_config.serial_supervisor_interval_sec = 0
+        mock_config.serial_parallel_receive = True
+
+        serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+        serial_manager.send([1])
+        left, right = serial_manager.receive()
+        self.assertFalse(serial_manager.is_ok(left, right))
+        self.assertEqual([b'5', b'1', b'50020'], right.raw.split())
+
+    def test_given_pipelining_when_probes_are_requested_then_the_simulator_answers_them_in_order(self, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        mock_config.serial_name_pattern = self.simulator.pattern
+        mock_config.serial_timeout_probe_sec = 2
+        mock_config.serial_timeout_right = mock_config.serial_timeout_left = 5
+        mock_config.serial_supervisor_interval_sec = 0
+        mock_config.serial_parallel_receive = True
+        mock_config.serial_pipelining = True
+
+        serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+        answers = serial_manager.request_many([[1], [16], [9]])
+
+        self.assertEqual([1, 16, 9], [right.code for _, right in answers])
+        self.assertEqual([1, 16, 9], [left.code for left, _ in answers])
+        self.assertEqual(40, answers[1][1].get_int(2))
+
+    def test_given_unplugged_boards_when_they_come_back_then_the_supervisor_reconnects_them(self, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        mock_config.serial_name_pattern = self.simulator.pattern
+        mock_config.serial_timeout_probe_sec = 0.5
+        mock_config.serial_timeout_right = mock_config.serial_timeout_left = 1
+        mock_config.serial_supervisor_interval_sec = 0.2
+        mock_config.serial_reconnect_wait_sec = 10
+        mock_config.serial_parallel_receive = True
+
+        serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+        try:
+            self.simulator.stop()
+            time.sleep(0.5)
+            self.assertFalse(serial_manager.update_devices([]))
+
+            self.simulator = FirmwareSimulator(self.links_dir.name, latency=LatencyProfile(1, 0), time_scale=0.01)
+            deadline = time.monotonic() + 10
+            while serial_manager._supervisor.reconnects == 0 and time.monotonic() < deadline:
+                time.sleep(0.1)
+
+            serial_manager.send([9])
+            left, right = serial_manager.receive()
+        finally:
+            serial_manager._supervisor.stop()
+
+        self.assertEqual(1, serial_manager._supervisor.reconnects)
+        self.assertEqual([b'9', b'1'], right.raw.split()[:2])
+        self.assertEqual([b'9', b'2'], left.raw.split()[:2])
+
+    def test_given_unplugged_boards_when_a_command_is_sent_then_it_waits_for_the_reconnect(self, mock_firmware_error_info, mock_logger, mock_config):  # noqa: E501
+        mock_config.serial_name_pattern = self.simulator.pattern
+        mock_config.serial_timeout_probe_sec = 0.5
+        mock_config.serial_timeout_right = mock_config.serial_timeout_left = 1
+        mock_config.serial_supervisor_interval_sec = 0.2
+        mock_config.serial_reconnect_wait_sec = 10
+        mock_config.serial_parallel_receive = True
+
+        serial_manager = SerialManager(mock_config, mock_logger, mock_firmware_error_info)
+        answers = []
+        try:
+            self.simulator.stop()
+            time.sleep(0.5)
+            self.assertFalse(serial_manager.update_devices([]))
+
+            def probe():
+                serial_manager.send([9])
+                answers.append(serial_manager.receive())
+            command = threading.Thread(target=probe)
+            command.start()
+            time.sleep(0.3)
+            self.assertEqual([], answers)
+
+            self.simulator = FirmwareSimulator(self.links_dir.name, latency=LatencyProfile(1, 0), time_scale=0.01)
+            command.join(10)
+        finally:
+            serial_manager._supervisor.stop()
+
+        left, right = answers[0]
+        self.assertEqual([b'9', b'1'], right.raw.split()[:2])
+        self.assertEqual([b'9', b'2'], left.raw.split()[:2])